@@ -1,43 +1,74 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..auth import authenticate_user, create_access_token, get_password_hash, get_current_user
-from ..database import get_db
+from ..auth import (
+    AuthenticatedUser,
+    authenticate_user,
+    create_access_token,
+    get_current_user,
+    get_password_hash,
+    get_user_by_username,
+)
+from ..database import get_async_db
 from ..models import User
 from ..schemas import TokenOut, UserCreate, UserOut
+from ..services.password_hasher import login_throttle
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/register", response_model=UserOut)
-def register(payload: UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.username == payload.username).first()
+async def register(payload: UserCreate, request: Request, db: AsyncSession = Depends(get_async_db)):
+    _throttle(None, request)
+    existing = await get_user_by_username(db, payload.username)
     if existing:
+        login_throttle.record_failure(None, _client_ip(request))
         raise HTTPException(status_code=409, detail="Username already exists")
     user = User(
         username=payload.username,
-        password_hash=get_password_hash(payload.password),
+        password_hash=await get_password_hash(payload.password),
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
 @router.post("/login", response_model=TokenOut)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login(
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+):
+    _throttle(form_data.username, request)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
+        login_throttle.record_failure(form_data.username, _client_ip(request))
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    login_throttle.reset(form_data.username)
     token = create_access_token(str(user.id))
     return {"access_token": token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=UserOut)
-def me(current_user: User = Depends(get_current_user)):
+async def me(current_user: AuthenticatedUser = Depends(get_current_user)):
     return current_user
+
+
+def _throttle(username: str | None, request: Request) -> None:
+    retry_after = login_throttle.check(username, _client_ip(request))
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts, try again later",
+            headers={"Retry-After": str(max(int(retry_after) + 1, 1))},
+        )
+
+
+def _client_ip(request: Request) -> str | None:
+    return request.client.host if request.client else None
@@ -0,0 +1,65 @@
+import asyncio
+import os
+
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+from ..auth import AuthenticatedUser, create_stream_ticket, get_current_user, get_stream_user
+from ..schemas import StreamTicketOut
+from ..services.auth_cache import STREAM_TICKET_TTL
+from ..services.event_bus import MAIN_AUDIENCE, event_bus
+from .instances import MAIN_OWNER_USERNAME
+
+router = APIRouter(prefix="/events", tags=["events"])
+EVENT_KEEPALIVE_SECONDS = float(os.environ.get("EVENT_KEEPALIVE_SECONDS", "15"))
+RESET_EVENT = "event: reset\ndata: {}\n\n"
+
+
+@router.post("/ticket", response_model=StreamTicketOut)
+async def issue_stream_ticket(current_user: AuthenticatedUser = Depends(get_current_user)):
+    return {"ticket": create_stream_ticket(current_user), "expires_in": STREAM_TICKET_TTL}
+
+
+@router.get("/")
+async def stream_events(
+    request: Request,
+    current_user: AuthenticatedUser = Depends(get_stream_user),
+    last_event_id: str | None = Header(default=None),
+    since: str | None = Query(default=None),
+):
+    last_event_id = last_event_id or since
+    audiences = {current_user.id}
+    if current_user.username == MAIN_OWNER_USERNAME:
+        audiences.add(MAIN_AUDIENCE)
+    subscription = event_bus.subscribe(audiences)
+    backlog = event_bus.replay(last_event_id, audiences) if last_event_id else []
+
+    async def stream():
+        try:
+            last_sequence = 0
+            if backlog is None:
+                yield RESET_EVENT
+            else:
+                for event in backlog:
+                    last_sequence = event.sequence
+                    yield event.encode()
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), EVENT_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    yield RESET_EVENT
+                    return
+                if event.sequence <= last_sequence:
+                    continue
+                yield event.encode()
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
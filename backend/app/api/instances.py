@@ -1,204 +1,388 @@
+import asyncio
 import json
 from pathlib import Path
+from typing import Awaitable, Callable, TypeVar
 
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..database import get_async_db, get_db
 from ..models import Instance
-from ..auth import get_current_user
-from ..models import User
-from ..schemas import InstanceCreate, InstanceOut, InstanceUpdate
-from ..services.main_manager import MainManager
-from ..services.instance_manager import DEFAULT_REPO_URL, InstanceManager
-from ..services.git_manager import list_remote_branches
+from ..auth import AuthenticatedUser, get_current_user
+from ..schemas import ControlCommand, InstanceBulkRequest, InstanceCreate, InstanceOut, InstanceUpdate, JobOut
+from ..services.bulk_actions import start_bulk
+from ..services.control_channel import control_hub
+from ..services.health import health_prober
+from ..services.main_manager import MAIN_SUPERVISOR_KEY, MainManager
+from ..services.metrics import metrics_sampler
+from ..services.instance_manager import (
+    DEFAULT_INSTANCES_DIR,
+    DEFAULT_REPO_URL,
+    AsyncInstanceManager,
+    InstanceManager,
+)
+from ..services.instance_jobs import CREATE_INSTANCE_JOB, UPDATE_INSTANCE_JOB
+from ..services.job_queue import job_queue
+from ..services.log_capture import LOG_DIRNAME, LOG_TAIL_LINES, log_capture
+from ..services.ref_cache import ref_cache
+from ..services.resource_limits import resource_limiter
+from ..services.supervisor import supervisor
+from ..services.instance_files import QR_FILENAME, read_qr, read_wa_number
 
 router = APIRouter(prefix="/instances", tags=["instances"])
 REPO_ROOT = Path(__file__).resolve().parents[3]
 MAIN_OWNER_USERNAME = "miangeldev"
+LOG_FOLLOW_POLL_SECONDS = 15
+T = TypeVar("T")
 
 
 @router.get("/", response_model=list[InstanceOut])
-def list_instances(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def list_instances(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
-    manager = InstanceManager(db)
-    instances = list(manager.list_instances(current_user.id))
+    manager = AsyncInstanceManager(db)
+    instances = await manager.list_instances(current_user.id)
     for instance in instances:
-        _attach_wa_number(instance)
+        _attach_runtime(instance)
     return instances
 
 
 @router.get("/branches")
-def list_branches(current_user: User = Depends(get_current_user)):
+def list_branches(
+    response: Response,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    if_none_match: str | None = Header(default=None),
+):
     try:
-        branches = list_remote_branches(DEFAULT_REPO_URL)
+        snapshot = ref_cache.get(DEFAULT_REPO_URL)
     except RuntimeError as exc:
         raise HTTPException(status_code=502, detail=str(exc)) from exc
-    return {"branches": branches}
+    headers = {"ETag": snapshot.etag, "Cache-Control": "private, no-cache"}
+    if if_none_match and snapshot.etag in {tag.strip() for tag in if_none_match.split(",")}:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return {"branches": snapshot.branches, "tags": snapshot.tags}
 
 
-@router.post("/", response_model=InstanceOut)
+@router.post("/", response_model=JobOut, status_code=202)
 def create_instance(
     payload: InstanceCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    idempotency_key: str | None = Header(default=None),
 ):
-    manager = InstanceManager(db)
-    try:
-        instance = manager.create_instance(payload, owner_id=current_user.id)
-        _attach_wa_number(instance)
-        return instance
-    except FileExistsError as exc:
-        raise HTTPException(status_code=409, detail=str(exc)) from exc
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
-    except RuntimeError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if idempotency_key:
+        existing = job_queue.find_by_key(db, current_user.id, CREATE_INSTANCE_JOB, idempotency_key)
+        if existing:
+            return existing
+    if (
+        db.query(Instance).filter(Instance.name == payload.name).first()
+        or (DEFAULT_INSTANCES_DIR / payload.name).exists()
+    ):
+        raise HTTPException(status_code=409, detail=f"Instance already exists: {payload.name}")
+    _ensure_port_free(db, payload.port)
+    for job in job_queue.active_jobs(db, CREATE_INSTANCE_JOB):
+        if json.loads(job.payload).get("name") == payload.name:
+            raise HTTPException(status_code=409, detail=f"Instance already being created: {payload.name}")
+    return job_queue.submit(
+        db,
+        CREATE_INSTANCE_JOB,
+        payload.model_dump(),
+        owner_id=current_user.id,
+        idempotency_key=idempotency_key,
+    )
 
 
-@router.patch("/{instance_id}", response_model=InstanceOut)
+@router.post("/bulk")
+async def bulk_action(
+    payload: InstanceBulkRequest,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    if not payload.selector.model_fields_set:
+        raise HTTPException(status_code=400, detail="Selector must set ids, version or status")
+    if payload.action == "update-version" and payload.version is None:
+        raise HTTPException(status_code=400, detail="update-version requires a version")
+    results = start_bulk(current_user.id, payload)
+
+    async def stream():
+        async for item in results:
+            yield json.dumps(item) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.patch("/{instance_id}", response_model=JobOut, status_code=202)
 def update_instance(
     instance_id: int,
     payload: InstanceUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    idempotency_key: str | None = Header(default=None),
 ):
     instance = _get_instance_for_user(db, instance_id, current_user.id)
-    manager = InstanceManager(db)
     try:
-        instance = manager.update_instance(instance, payload)
-        _attach_wa_number(instance)
-        return instance
+        InstanceManager(db).validate_update(payload)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if payload.port != instance.port:
+        _ensure_port_free(db, payload.port)
+    return job_queue.submit(
+        db,
+        UPDATE_INSTANCE_JOB,
+        payload.model_dump(mode="json", exclude_unset=True),
+        owner_id=current_user.id,
+        instance_id=instance.id,
+        idempotency_key=idempotency_key,
+    )
 
 
 @router.post("/{instance_id}/start", response_model=InstanceOut)
-def start_instance(
+async def start_instance(
     instance_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
-    instance = _get_instance_for_user(db, instance_id, current_user.id)
-    manager = InstanceManager(db)
-    instance = manager.start_instance(instance)
-    _attach_wa_number(instance)
+    manager = AsyncInstanceManager(db)
+    instance = await _get_owned_instance(manager, instance_id, current_user.id)
+    instance = await _lifecycle(manager.start_instance(instance))
+    _attach_runtime(instance)
     return instance
 
 
 @router.post("/{instance_id}/stop", response_model=InstanceOut)
-def stop_instance(
+async def stop_instance(
     instance_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
-    instance = _get_instance_for_user(db, instance_id, current_user.id)
-    manager = InstanceManager(db)
-    instance = manager.stop_instance(instance)
-    _attach_wa_number(instance)
+    manager = AsyncInstanceManager(db)
+    instance = await _get_owned_instance(manager, instance_id, current_user.id)
+    instance = await _lifecycle(manager.stop_instance(instance))
+    _attach_runtime(instance)
     return instance
 
 
 @router.delete("/{instance_id}")
-def delete_instance(
+async def delete_instance(
     instance_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
-    instance = _get_instance_for_user(db, instance_id, current_user.id)
-    manager = InstanceManager(db)
-    manager.delete_instance(instance)
+    manager = AsyncInstanceManager(db)
+    instance = await _get_owned_instance(manager, instance_id, current_user.id)
+    await _lifecycle(manager.delete_instance(instance))
     return {"status": "deleted"}
 
 
 @router.get("/main/qr")
-def get_main_qr(current_user: User = Depends(get_current_user)):
+async def get_main_qr(current_user: AuthenticatedUser = Depends(get_current_user)):
     _require_main_access(current_user)
-    qr_path = REPO_ROOT / "qr.txt"
-    return _read_qr(qr_path)
+    qr_path = REPO_ROOT / QR_FILENAME
+    return _read_qr(MAIN_SUPERVISOR_KEY, qr_path)
 
 
 @router.get("/main/status")
-def get_main_status(current_user: User = Depends(get_current_user)):
+def get_main_status(current_user: AuthenticatedUser = Depends(get_current_user)):
     _require_main_access(current_user)
     manager = MainManager()
     status = manager.status()
-    status["wa_number"] = _read_wa_number(REPO_ROOT)
+    status["wa_number"] = _channel_value(MAIN_SUPERVISOR_KEY, "wa_number", lambda: read_wa_number(REPO_ROOT))
+    status["health"] = health_prober.current(MAIN_SUPERVISOR_KEY) if status["running"] else None
     return status
 
 
 @router.post("/main/start")
-def start_main(current_user: User = Depends(get_current_user)):
+def start_main(current_user: AuthenticatedUser = Depends(get_current_user)):
     _require_main_access(current_user)
     manager = MainManager()
     return manager.start()
 
 
 @router.post("/main/stop")
-def stop_main(current_user: User = Depends(get_current_user)):
+def stop_main(current_user: AuthenticatedUser = Depends(get_current_user)):
     _require_main_access(current_user)
     manager = MainManager()
     return manager.stop()
 
 
 @router.post("/main/reset")
-def reset_main(current_user: User = Depends(get_current_user)):
+def reset_main(current_user: AuthenticatedUser = Depends(get_current_user)):
     _require_main_access(current_user)
     manager = MainManager()
     return manager.reset()
 
 
+@router.post("/main/control/{command}")
+def control_main(command: ControlCommand, current_user: AuthenticatedUser = Depends(get_current_user)):
+    _require_main_access(current_user)
+    return _control(lambda: control_hub.request(MAIN_SUPERVISOR_KEY, command))
+
+
 @router.get("/{instance_id}/qr")
-def get_instance_qr(
+async def get_instance_qr(
     instance_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
-    instance = _get_instance_for_user(db, instance_id, current_user.id)
-    qr_path = Path(instance.path) / "qr.txt"
-    return _read_qr(qr_path)
+    instance = await _get_owned_instance(AsyncInstanceManager(db), instance_id, current_user.id)
+    qr_path = Path(instance.path) / QR_FILENAME
+    return _read_qr(instance.id, qr_path)
+
+
+@router.get("/{instance_id}/logs")
+async def get_instance_logs(
+    instance_id: int,
+    request: Request,
+    tail: int = Query(default=200, ge=0, le=LOG_TAIL_LINES),
+    follow: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    instance = await _get_owned_instance(AsyncInstanceManager(db), instance_id, current_user.id)
+    log_dir = Path(instance.path) / LOG_DIRNAME
+    if not follow:
+        return {"lines": log_capture.tail(instance.id, log_dir, tail)}
+
+    follower, backlog = log_capture.follow(instance.id, log_dir, tail)
+
+    async def stream():
+        try:
+            for line in backlog:
+                yield line + "\n"
+            while not await request.is_disconnected():
+                try:
+                    line = await asyncio.wait_for(follower.queue.get(), LOG_FOLLOW_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    continue
+                yield line + "\n"
+        finally:
+            follower.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/plain; charset=utf-8",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{instance_id}/metrics")
+async def get_instance_metrics(
+    instance_id: int,
+    resolution: str = Query(default="fine", pattern="^(fine|coarse)$"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    instance = await _get_owned_instance(AsyncInstanceManager(db), instance_id, current_user.id)
+    return {
+        "current": metrics_sampler.current(instance.id),
+        "resolution": resolution,
+        "history": metrics_sampler.history(instance.id, resolution),
+        "limits": {
+            "mode": resource_limiter.mode,
+            "fallback_reason": resource_limiter.fallback_reason,
+            "counters": resource_limiter.counters(instance.id),
+        },
+    }
 
 
 @router.post("/{instance_id}/reset", response_model=InstanceOut)
-def reset_instance_session(
+async def reset_instance_session(
     instance_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    manager = AsyncInstanceManager(db)
+    instance = await _get_owned_instance(manager, instance_id, current_user.id)
+    instance = await _lifecycle(manager.reset_session(instance))
+    _attach_runtime(instance)
+    return instance
+
+
+@router.post("/{instance_id}/wake", response_model=InstanceOut)
+async def wake_instance(
+    instance_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    manager = AsyncInstanceManager(db)
+    instance = await _get_owned_instance(manager, instance_id, current_user.id)
+    instance = await _lifecycle(manager.wake_instance(instance))
+    _attach_runtime(instance)
+    return instance
+
+
+@router.post("/{instance_id}/control/{command}")
+def control_instance(
+    instance_id: int,
+    command: ControlCommand,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
     instance = _get_instance_for_user(db, instance_id, current_user.id)
-    manager = InstanceManager(db)
-    instance = manager.reset_session(instance)
-    _attach_wa_number(instance)
-    return instance
+    if command == "shutdown":
+        manager = InstanceManager(db)
+        return _control(lambda: {"ok": True, "result": {"status": manager.shutdown_instance(instance).status}})
+    return _control(lambda: control_hub.request(instance.id, command))
 
 
-def _read_qr(qr_path: Path):
-    if not qr_path.exists():
-        return Response(status_code=204)
-    qr_value = qr_path.read_text(encoding="utf-8").strip()
+async def _lifecycle(action: Awaitable[T]) -> T:
+    try:
+        return await action
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    except OSError as exc:
+        raise HTTPException(status_code=500, detail=str(exc) or exc.__class__.__name__) from exc
+
+
+def _control(send: Callable[[], dict]) -> dict:
+    try:
+        reply = send()
+    except TimeoutError as exc:
+        raise HTTPException(status_code=504, detail=str(exc)) from exc
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    if not reply.get("ok"):
+        raise HTTPException(status_code=502, detail=reply.get("error") or "Command failed")
+    return reply.get("result") or {}
+
+
+def _channel_value(key: int | str, name: str, fallback: Callable[[], str | None]) -> str | None:
+    channel = control_hub.connected_state(key)
+    if channel and name in channel:
+        return channel[name]
+    return fallback()
+
+
+def _read_qr(key: int | str, qr_path: Path):
+    qr_value = _channel_value(key, "qr", lambda: read_qr(qr_path))
     if not qr_value:
         return Response(status_code=204)
     return {"qr": qr_value}
 
 
-def _attach_wa_number(instance: Instance) -> None:
-    instance.wa_number = _read_wa_number(Path(instance.path))
+def _attach_runtime(instance: Instance) -> None:
+    instance.process_state = supervisor.state(instance.id)
+    instance.restart_ms = supervisor.restart_ms(instance.id)
+    instance.wa_number = _channel_value(instance.id, "wa_number", lambda: read_wa_number(Path(instance.path)))
+    channel = control_hub.connected_state(instance.id)
+    instance.connection = channel.get("connection") if channel else None
+    instance.counters = channel.get("counters") if channel else None
+    metrics = metrics_sampler.current(instance.id)
+    instance.cpu_percent = round(metrics["cpu_percent"], 2) if metrics else None
+    instance.memory_rss = int(metrics["rss_bytes"]) if metrics else None
+    instance.health = health_prober.current(instance.id)
 
 
-def _read_wa_number(instance_path: Path) -> str | None:
-    info_path = instance_path / "wa_info.json"
-    if not info_path.exists():
-        return None
-    try:
-        payload = json.loads(info_path.read_text(encoding="utf-8"))
-    except json.JSONDecodeError:
-        return None
-    number = payload.get("number")
-    if isinstance(number, str) and number.strip():
-        return number.strip()
-    return None
+def _ensure_port_free(db: Session, port: int | None) -> None:
+    if port is not None and db.query(Instance.id).filter(Instance.port == port).first():
+        raise HTTPException(status_code=409, detail=f"Port already assigned: {port}")
 
 
 def _get_instance_for_user(db: Session, instance_id: int, user_id: int) -> Instance:
@@ -212,6 +396,13 @@ def _get_instance_for_user(db: Session, instance_id: int, user_id: int) -> Insta
     return instance
 
 
-def _require_main_access(current_user: User) -> None:
+async def _get_owned_instance(manager: AsyncInstanceManager, instance_id: int, user_id: int) -> Instance:
+    instance = await manager.get_instance(instance_id, user_id)
+    if not instance:
+        raise HTTPException(status_code=404, detail="Instance not found")
+    return instance
+
+
+def _require_main_access(current_user: AuthenticatedUser) -> None:
     if current_user.username != MAIN_OWNER_USERNAME:
         raise HTTPException(status_code=403, detail="Not authorized to access main instance")
@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from ..auth import AuthenticatedUser, auth_cache_stats, get_current_user
+from ..services.control_channel import control_hub
+from ..services.dependency_store import dependency_store
+from ..services.health import health_prober
+from ..services.hibernation import hibernator
+from ..services.instance_files import file_cache
+from ..services.instance_manager import collect_storage, stop_all_instances
+from ..services.metrics import metrics_sampler
+from ..services.port_allocator import port_allocator
+from ..services.reconciler import reconciler
+from ..services.release_store import release_store
+from ..services.ref_cache import ref_cache
+from ..services.warm_pool import warm_pool
+from .instances import MAIN_OWNER_USERNAME
+
+
+def _require_admin(current_user: AuthenticatedUser = Depends(get_current_user)) -> None:
+    if current_user.username != MAIN_OWNER_USERNAME:
+        raise HTTPException(status_code=403, detail="Not authorized to access system endpoints")
+
+
+router = APIRouter(prefix="/system", tags=["system"], dependencies=[Depends(_require_admin)])
+
+
+@router.get("/reconcile")
+def get_reconcile_progress():
+    return reconciler.progress()
+
+
+@router.get("/cache")
+def get_cache_stats():
+    return {"files": file_cache.stats(), "refs": ref_cache.stats(), "auth": auth_cache_stats()}
+
+
+@router.get("/metrics")
+def get_metrics_stats():
+    return metrics_sampler.stats()
+
+
+@router.get("/health")
+def get_health_stats():
+    return health_prober.stats()
+
+
+@router.get("/hibernation")
+def get_hibernation_stats():
+    return hibernator.stats()
+
+
+@router.get("/warm-pool")
+def get_warm_pool_stats():
+    return warm_pool.stats()
+
+
+@router.get("/control")
+def get_control_channel_stats():
+    return control_hub.stats()
+
+
+@router.get("/dependencies")
+def get_dependency_store_stats():
+    return dependency_store.stats()
+
+
+@router.get("/releases")
+def get_release_store_stats():
+    return release_store.stats()
+
+
+@router.get("/ports")
+def get_port_allocator_stats():
+    return port_allocator.stats()
+
+
+@router.post("/gc")
+def collect_unreferenced_storage():
+    return {"removed": collect_storage(), "releases": release_store.stats(), "dependencies": dependency_store.stats()}
+
+
+@router.post("/stop-instances")
+def stop_running_instances():
+    return {"remaining": stop_all_instances(record=True)}
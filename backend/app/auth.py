@@ -1,68 +1,137 @@
 import os
+import secrets
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .database import get_db
+from .database import AsyncSessionLocal
 from .models import User
+from .services.auth_cache import claims_cache, stream_tickets, token_key, user_cache
+from .services.password_hasher import password_hasher
 
 SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-change-me")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", "720"))
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    try:
-        return pwd_context.verify(plain_password, hashed_password)
-    except ValueError:
-        return False
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    id: int
+    username: str
+    created_at: datetime | None
 
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    valid, _ = await password_hasher.verify(plain_password, hashed_password)
+    return valid
 
 
-def authenticate_user(db: Session, username: str, password: str) -> User | None:
-    user = db.query(User).filter(User.username == username).first()
-    if not user or not verify_password(password, user.password_hash):
+async def get_password_hash(password: str) -> str:
+    return await password_hasher.hash(password)
+
+
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> User | None:
+    user = await get_user_by_username(db, username)
+    if not user:
         return None
+    valid, upgraded_hash = await password_hasher.verify(password, user.password_hash)
+    if not valid:
+        return None
+    if upgraded_hash:
+        user.password_hash = upgraded_hash
+        await db.commit()
     return user
 
 
+async def get_user_by_username(db: AsyncSession, username: str) -> User | None:
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
+
+
 def create_access_token(subject: str, expires_delta: timedelta | None = None) -> str:
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode = {"sub": subject, "exp": expire}
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
-) -> User:
-    credentials_exception = HTTPException(
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> AuthenticatedUser:
+    return await _user_from_token(token)
+
+
+def create_stream_ticket(user: AuthenticatedUser) -> str:
+    ticket = secrets.token_urlsafe(32)
+    stream_tickets.put(token_key(ticket), user.id)
+    return ticket
+
+
+async def get_stream_user(ticket: str = Query(...)) -> AuthenticatedUser:
+    user_id = stream_tickets.pop(token_key(ticket))
+    if user_id is None:
+        raise _credentials_exception()
+    return await _load_user(user_id)
+
+
+def auth_cache_stats() -> dict:
+    return {
+        "claims": claims_cache.stats(),
+        "users": user_cache.stats(),
+        "stream_tickets": stream_tickets.stats(),
+    }
+
+
+async def _user_from_token(token: str) -> AuthenticatedUser:
+    credentials_exception = _credentials_exception()
+    key = token_key(token)
+    claims = claims_cache.get(key)
+    if claims is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError as exc:
+            raise credentials_exception from exc
+        try:
+            user_id = int(payload.get("sub"))
+        except (TypeError, ValueError) as exc:
+            raise credentials_exception from exc
+        expires_at = payload.get("exp")
+        claims = (user_id, float(expires_at) if expires_at is not None else None)
+        claims_cache.put(key, claims, None if expires_at is None else claims[1] - time.time())
+    elif claims[1] is not None and claims[1] <= time.time():
+        claims_cache.invalidate(key)
+        raise credentials_exception
+    return await _load_user(claims[0])
+
+
+async def _load_user(user_id: int) -> AuthenticatedUser:
+    user = user_cache.get(user_id)
+    if user is None:
+        async with AsyncSessionLocal() as db:
+            row = await db.get(User, user_id)
+        if row is None:
+            raise _credentials_exception()
+        user = AuthenticatedUser(id=row.id, username=row.username, created_at=row.created_at)
+        user_cache.put(user_id, user)
+    return user
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        subject = payload.get("sub")
-        if subject is None:
-            raise credentials_exception
-    except JWTError as exc:
-        raise credentials_exception from exc
-    try:
-        user_id = int(subject)
-    except (TypeError, ValueError) as exc:
-        raise credentials_exception from exc
-    user = db.query(User).get(user_id)
-    if user is None:
-        raise credentials_exception
-    return user
+
+
+def _invalidate_user(mapper, connection, user: User) -> None:
+    user_cache.invalidate(user.id)
+
+
+event.listen(User, "after_update", _invalidate_user)
+event.listen(User, "after_delete", _invalidate_user)
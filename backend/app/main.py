@@ -1,19 +1,48 @@
 from pathlib import Path
+import threading
 
 from fastapi import FastAPI
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
 from .api.auth import router as auth_router
+from .api.events import router as events_router
 from .api.instances import router as instances_router
-from .database import Base, engine, SessionLocal, ensure_schema
-from .models import Instance
-from .services.instance_manager import InstanceManager
+from .api.jobs import router as jobs_router
+from .api.system import router as system_router
+from .database import Base, SessionLocal, async_engine, engine
+from .migrations import run_migrations
+from .services.instance_jobs import register_instance_jobs
+from .services.control_channel import control_hub
+from .services.git_manager import mirror_fetcher
+from .services.health import health_prober
+from .services.hibernation import hibernator
+from .services.instance_manager import (
+    DEFAULT_REPO_URL,
+    SHUTDOWN_STOP_INSTANCES,
+    collect_storage,
+    handle_process_exit,
+    restart_crashed_instance,
+    stop_all_instances,
+)
+from .services.job_queue import job_queue
+from .services.live_updates import publish_control_state, start_live_updates, stop_live_updates
+from .services.main_manager import MAIN_SUPERVISOR_KEY
+from .services.metrics import metrics_sampler
+from .services.password_hasher import password_hasher
+from .services.port_allocator import port_allocator
+from .services.reconciler import reconciler
+from .services.resource_limits import resource_limiter
+from .services.supervisor import supervisor
+from .services.warm_pool import warm_pool
 
 app = FastAPI(title="TestiBot Backend")
 
 app.include_router(auth_router)
 app.include_router(instances_router)
+app.include_router(jobs_router)
+app.include_router(system_router)
+app.include_router(events_router)
 
 STATIC_DIR = Path(__file__).resolve().parent / "static"
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
@@ -42,12 +71,46 @@ def app_view():
 @app.on_event("startup")
 def startup():
     Base.metadata.create_all(bind=engine)
-    ensure_schema()
+    run_migrations()
+    port_allocator.load()
+    resource_limiter.setup()
+    register_instance_jobs(job_queue)
+    job_queue.start()
+    password_hasher.start()
+    mirror_fetcher.track(DEFAULT_REPO_URL)
+    mirror_fetcher.start()
+    warm_pool.start(DEFAULT_REPO_URL)
+    threading.Thread(target=collect_storage, name="storage-gc", daemon=True).start()
     db = SessionLocal()
     try:
-        manager = InstanceManager(db)
-        instances = db.query(Instance).all()
-        for instance in instances:
-            manager.start_instance(instance)
+        start_live_updates(db)
     finally:
         db.close()
+    control_hub.start(state_handler=publish_control_state)
+    control_hub.listen(MAIN_SUPERVISOR_KEY)
+    supervisor.start(exit_handler=handle_process_exit, restart_handler=restart_crashed_instance)
+    reconciler.start()
+    metrics_sampler.start()
+    health_prober.start()
+    hibernator.start()
+
+
+@app.on_event("shutdown")
+def shutdown():
+    if SHUTDOWN_STOP_INSTANCES:
+        stop_all_instances()
+    job_queue.shutdown()
+    password_hasher.shutdown()
+    mirror_fetcher.stop()
+    warm_pool.stop()
+    supervisor.stop()
+    metrics_sampler.stop()
+    health_prober.stop()
+    hibernator.stop()
+    stop_live_updates()
+    control_hub.stop()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
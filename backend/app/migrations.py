@@ -0,0 +1,130 @@
+from pathlib import Path
+import shutil
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from .database import REPO_ROOT, engine
+
+LEGACY_WARM_POOL_DIR = REPO_ROOT / "instances" / ".warm"
+
+Migration = Callable[[Connection], None]
+
+
+def _columns(conn: Connection, table: str) -> set[str]:
+    return {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})")).fetchall()}
+
+
+def _legacy_instance_columns(conn: Connection) -> None:
+    columns = _columns(conn, "instances")
+    if "owner_id" not in columns:
+        conn.execute(text("ALTER TABLE instances ADD COLUMN owner_id INTEGER"))
+    if "desired_status" not in columns:
+        conn.execute(text("ALTER TABLE instances ADD COLUMN desired_status VARCHAR"))
+        conn.execute(text("UPDATE instances SET desired_status = status"))
+    if "pid_start_time" not in columns:
+        conn.execute(text("ALTER TABLE instances ADD COLUMN pid_start_time INTEGER"))
+        conn.execute(text("ALTER TABLE instances ADD COLUMN pid_cmdline VARCHAR"))
+        conn.execute(text("ALTER TABLE instances ADD COLUMN pid_cwd VARCHAR"))
+    if "restart_count" not in columns:
+        conn.execute(text("ALTER TABLE instances ADD COLUMN last_exit_code INTEGER"))
+        conn.execute(text("ALTER TABLE instances ADD COLUMN restart_count INTEGER DEFAULT 0"))
+
+
+def _owner_indexes(conn: Connection) -> None:
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_instances_owner_id_id ON instances (owner_id, id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_owner_id_id ON jobs (owner_id, id)"))
+
+
+def _resource_limit_columns(conn: Connection) -> None:
+    columns = _columns(conn, "instances")
+    for column in ("memory_max_mb", "cpu_weight", "cpu_quota_percent", "pids_max", "nice", "ionice_level"):
+        if column not in columns:
+            conn.execute(text(f"ALTER TABLE instances ADD COLUMN {column} INTEGER"))
+
+
+def _release_column(conn: Connection) -> None:
+    if "release" not in _columns(conn, "instances"):
+        conn.execute(text("ALTER TABLE instances ADD COLUMN release VARCHAR"))
+
+
+def _downtime_column(conn: Connection) -> None:
+    if "last_downtime_ms" not in _columns(conn, "instances"):
+        conn.execute(text("ALTER TABLE instances ADD COLUMN last_downtime_ms INTEGER"))
+
+
+def _port_index(conn: Connection) -> None:
+    conn.execute(
+        text(
+            "UPDATE instances SET port = NULL WHERE port IS NOT NULL AND id NOT IN "
+            "(SELECT MIN(id) FROM instances WHERE port IS NOT NULL GROUP BY port)"
+        )
+    )
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_instances_port ON instances (port)"))
+
+
+def _hibernation_columns(conn: Connection) -> None:
+    columns = _columns(conn, "instances")
+    if "idle_timeout_minutes" not in columns:
+        conn.execute(text("ALTER TABLE instances ADD COLUMN idle_timeout_minutes INTEGER"))
+        conn.execute(text("ALTER TABLE instances ADD COLUMN hibernated_at DATETIME"))
+        conn.execute(text("ALTER TABLE instances ADD COLUMN wake_at DATETIME"))
+        conn.execute(text("ALTER TABLE instances ADD COLUMN pending_wakes INTEGER DEFAULT 0"))
+
+
+def _legacy_warm_pool(conn: Connection) -> None:
+    shutil.rmtree(LEGACY_WARM_POOL_DIR, ignore_errors=True)
+
+
+def _env_ports(conn: Connection) -> None:
+    rows = conn.execute(text("SELECT env_path, port FROM instances WHERE env_path IS NOT NULL")).fetchall()
+    for env_path, port in rows:
+        env_file = Path(env_path)
+        try:
+            lines = env_file.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            continue
+        synced = [line for line in lines if not line.startswith("PORT=")]
+        if port is not None:
+            synced.append(f"PORT={port}")
+        if synced != lines:
+            env_file.write_text("\n".join(synced) + "\n", encoding="utf-8")
+
+
+def _job_key_scope(conn: Connection) -> None:
+    old_constraint = "UNIQUE (owner_id, idempotency_key)"
+    table_sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'jobs'")).scalar()
+    if not table_sql or old_constraint not in table_sql:
+        return
+    index_sqls = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'jobs' AND sql IS NOT NULL")
+    ).scalars().all()
+    conn.execute(text("ALTER TABLE jobs RENAME TO jobs_old"))
+    conn.execute(text(table_sql.replace(old_constraint, "UNIQUE (owner_id, kind, idempotency_key)")))
+    conn.execute(text("INSERT INTO jobs SELECT * FROM jobs_old"))
+    conn.execute(text("DROP TABLE jobs_old"))
+    for index_sql in index_sqls:
+        conn.execute(text(index_sql))
+
+
+MIGRATIONS: list[Migration] = [
+    _legacy_instance_columns,
+    _owner_indexes,
+    _resource_limit_columns,
+    _release_column,
+    _downtime_column,
+    _port_index,
+    _hibernation_columns,
+    _legacy_warm_pool,
+    _env_ports,
+    _job_key_scope,
+]
+
+
+def run_migrations() -> None:
+    with engine.begin() as conn:
+        version = conn.execute(text("PRAGMA user_version")).scalar() or 0
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(conn)
+            conn.execute(text(f"PRAGMA user_version = {number}"))
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .database import Base
@@ -20,18 +20,63 @@ class User(Base):
 
 class Instance(Base):
     __tablename__ = "instances"
+    __table_args__ = (
+        Index("ix_instances_owner_id_id", "owner_id", "id"),
+        Index("ix_instances_port", "port", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String, unique=True, index=True)
     status: Mapped[str] = mapped_column(String, default="stopped")
+    desired_status: Mapped[str] = mapped_column(String, default="stopped")
     path: Mapped[str] = mapped_column(String)
     env_path: Mapped[str] = mapped_column(String)
     version: Mapped[str | None] = mapped_column(String, nullable=True)
+    release: Mapped[str | None] = mapped_column(String, nullable=True)
     port: Mapped[int | None] = mapped_column(Integer, nullable=True)
     pid: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    pid_start_time: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    pid_cmdline: Mapped[str | None] = mapped_column(String, nullable=True)
+    pid_cwd: Mapped[str | None] = mapped_column(String, nullable=True)
+    last_exit_code: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    restart_count: Mapped[int] = mapped_column(Integer, default=0)
+    last_downtime_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    idle_timeout_minutes: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    hibernated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    wake_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    pending_wakes: Mapped[int] = mapped_column(Integer, default=0)
+    memory_max_mb: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    cpu_weight: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    cpu_quota_percent: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    pids_max: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    nice: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    ionice_level: Mapped[int | None] = mapped_column(Integer, nullable=True)
     owner_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("users.id"), index=True, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     last_started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     owner = relationship("User", back_populates="instances")
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "kind", "idempotency_key"),
+        Index("ix_jobs_owner_id_id", "owner_id", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    kind: Mapped[str] = mapped_column(String)
+    status: Mapped[str] = mapped_column(String, default="queued", index=True)
+    phase: Mapped[str | None] = mapped_column(String, nullable=True)
+    progress: Mapped[int] = mapped_column(Integer, default=0)
+    payload: Mapped[str] = mapped_column(Text, default="{}")
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    idempotency_key: Mapped[str | None] = mapped_column(String, nullable=True)
+    instance_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("instances.id"), nullable=True)
+    owner_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("users.id"), index=True, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
@@ -1,22 +1,45 @@
 from datetime import datetime
+from typing import Literal
 
 from pydantic import BaseModel, Field
 
 
-class InstanceBase(BaseModel):
+class InstanceLimits(BaseModel):
+    memory_max_mb: int | None = Field(default=None, ge=16)
+    cpu_weight: int | None = Field(default=None, ge=1, le=10000)
+    cpu_quota_percent: int | None = Field(default=None, ge=1)
+    pids_max: int | None = Field(default=None, ge=1)
+    nice: int | None = Field(default=None, ge=-20, le=19)
+    ionice_level: int | None = Field(default=None, ge=0, le=7)
+
+
+class InstanceBase(InstanceLimits):
     name: str
     version: str | None = None
     port: int | None = None
+    idle_timeout_minutes: int | None = Field(default=None, ge=1)
 
 
 class InstanceCreate(InstanceBase):
     repo_url: str
 
 
-class InstanceUpdate(BaseModel):
+class InstanceUpdate(InstanceLimits):
     status: str | None = None
     version: str | None = None
     port: int | None = None
+    idle_timeout_minutes: int | None = Field(default=None, ge=1)
+    wake_at: datetime | None = None
+
+
+class InstanceHealth(BaseModel):
+    status: str
+    connection: str | None = None
+    heartbeat_age: float | None = None
+    port_open: bool | None = None
+    paired: bool = False
+    qr_pending: bool = False
+    checked_at: float
 
 
 class InstanceOut(InstanceBase):
@@ -24,8 +47,22 @@ class InstanceOut(InstanceBase):
     status: str
     path: str
     env_path: str
+    release: str | None = None
     pid: int | None
+    process_state: str | None = None
+    restart_count: int | None = 0
+    restart_ms: float | None = None
+    last_downtime_ms: int | None = None
+    hibernated_at: datetime | None = None
+    wake_at: datetime | None = None
+    pending_wakes: int | None = 0
+    last_exit_code: int | None = None
     wa_number: str | None = None
+    cpu_percent: float | None = None
+    memory_rss: int | None = None
+    health: InstanceHealth | None = None
+    connection: str | None = None
+    counters: dict[str, int] | None = None
     created_at: datetime
     updated_at: datetime
     last_started_at: datetime | None
@@ -34,6 +71,38 @@ class InstanceOut(InstanceBase):
         from_attributes = True
 
 
+class InstanceSelector(BaseModel):
+    ids: list[int] | None = None
+    version: str | None = None
+    status: str | None = None
+
+
+class InstanceBulkRequest(BaseModel):
+    selector: InstanceSelector
+    action: Literal["start", "stop", "restart", "update-version", "reset"]
+    version: str | None = None
+
+
+ControlCommand = Literal["ping", "logout", "shutdown"]
+
+
+class JobOut(BaseModel):
+    id: int
+    kind: str
+    status: str
+    phase: str | None
+    progress: int
+    instance_id: int | None
+    error: str | None
+    created_at: datetime
+    updated_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+
+    class Config:
+        from_attributes = True
+
+
 class UserCreate(BaseModel):
     username: str = Field(min_length=3, max_length=50)
     password: str = Field(min_length=6, max_length=128)
@@ -51,3 +120,8 @@ class UserOut(BaseModel):
 class TokenOut(BaseModel):
     access_token: str
     token_type: str
+
+
+class StreamTicketOut(BaseModel):
+    ticket: str
+    expires_in: float
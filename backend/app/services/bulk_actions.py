@@ -0,0 +1,134 @@
+import asyncio
+import os
+from typing import AsyncIterator
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import AsyncSessionLocal, SessionLocal
+from ..models import Instance, Job
+from ..schemas import InstanceBulkRequest
+from .instance_jobs import UPDATE_INSTANCE_JOB
+from .instance_manager import AsyncInstanceManager
+from .job_queue import job_queue
+
+BULK_CONCURRENCY = int(os.environ.get("BULK_CONCURRENCY", "8"))
+BULK_JOB_POLL_SECONDS = 0.5
+FINISHED_JOB_STATUSES = ("succeeded", "failed")
+
+_running: set[asyncio.Task] = set()
+
+
+def start_bulk(owner_id: int, request: InstanceBulkRequest) -> AsyncIterator[dict]:
+    queue: asyncio.Queue[dict] = asyncio.Queue()
+    task = asyncio.create_task(_execute(queue, owner_id, request))
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    return _drain(queue)
+
+
+async def _drain(queue: asyncio.Queue) -> AsyncIterator[dict]:
+    while True:
+        item = await queue.get()
+        yield item
+        if item.get("done"):
+            return
+
+
+async def _execute(queue: asyncio.Queue, owner_id: int, request: InstanceBulkRequest) -> None:
+    counts = {"matched": 0, "succeeded": 0, "failed": 0}
+    try:
+        async with AsyncSessionLocal() as db:
+            manager = AsyncInstanceManager(db)
+            selector = request.selector
+            instances = await manager.select_instances(owner_id, selector.ids, selector.version, selector.status)
+            counts["matched"] = len(instances)
+            if request.action == "update-version":
+                results = _update_versions(db, instances, owner_id, request.version)
+            else:
+                results = _apply(db, manager, instances, request.action)
+            async for item in results:
+                counts["succeeded" if item["ok"] else "failed"] += 1
+                await queue.put(item)
+    except Exception as exc:
+        await queue.put({"done": True, **counts, "error": str(exc) or exc.__class__.__name__})
+        return
+    await queue.put({"done": True, **counts})
+
+
+async def _apply(
+    db: AsyncSession,
+    manager: AsyncInstanceManager,
+    instances: list[Instance],
+    action: str,
+) -> AsyncIterator[dict]:
+    step = {
+        "start": manager.processes.apply_start,
+        "stop": manager.processes.apply_stop,
+        "restart": manager.processes.apply_restart,
+        "reset": manager.processes.apply_reset,
+    }[action]
+    semaphore = asyncio.Semaphore(max(BULK_CONCURRENCY, 1))
+
+    async def run(instance: Instance) -> tuple[Instance, Instance, Exception | None]:
+        async with semaphore:
+            snapshot, error = await manager.run_step(instance, step)
+            return instance, snapshot, error
+
+    for next_result in asyncio.as_completed([run(instance) for instance in instances]):
+        instance, snapshot, error = await next_result
+        manager.absorb(instance, snapshot)
+        await manager.commit()
+        if error is not None and not isinstance(error, (OSError, RuntimeError, ValueError)):
+            raise error
+        yield {
+            "id": instance.id,
+            "name": instance.name,
+            "ok": error is None,
+            "status": instance.status,
+            "pid": instance.pid,
+            "error": None if error is None else str(error) or error.__class__.__name__,
+        }
+
+
+async def _update_versions(
+    db: AsyncSession,
+    instances: list[Instance],
+    owner_id: int,
+    version: str | None,
+) -> AsyncIterator[dict]:
+    payload = {"version": version}
+    job_ids = await asyncio.to_thread(
+        _submit_updates,
+        [(payload, instance.id) for instance in instances],
+        owner_id,
+    )
+    names = {instance.id: instance.name for instance in instances}
+    pending = set(job_ids)
+    while pending:
+        await asyncio.sleep(BULK_JOB_POLL_SECONDS)
+        result = await db.execute(
+            select(Job.id, Job.instance_id, Job.status, Job.error).where(
+                Job.id.in_(pending),
+                Job.status.in_(FINISHED_JOB_STATUSES),
+            )
+        )
+        finished = result.all()
+        await db.rollback()
+        for job_id, instance_id, status, error in finished:
+            pending.discard(job_id)
+            yield {
+                "id": instance_id,
+                "name": names.get(instance_id),
+                "ok": status == "succeeded",
+                "job_id": job_id,
+                "error": error,
+            }
+
+
+def _submit_updates(items: list[tuple[dict, int]], owner_id: int) -> list[int]:
+    db = SessionLocal()
+    try:
+        return [job.id for job in job_queue.submit_many(db, UPDATE_INSTANCE_JOB, items, owner_id=owner_id)]
+    finally:
+        db.close()
@@ -0,0 +1,260 @@
+from dataclasses import dataclass, field
+import itertools
+import json
+import os
+from pathlib import Path
+import selectors
+import socket
+import threading
+import time
+from typing import Callable, Hashable
+
+from ..database import DATA_DIR
+
+CONTROL_DIR = DATA_DIR / "control"
+CONTROL_REQUEST_TIMEOUT = float(os.environ.get("CONTROL_REQUEST_TIMEOUT", "5"))
+CONTROL_MAX_FRAME = 65536
+
+StateHandler = Callable[[Hashable, dict], None]
+
+
+@dataclass(eq=False)
+class ControlConnection:
+    key: Hashable
+    sock: socket.socket
+    buffer: bytes = b""
+    connected_at: float = field(default_factory=time.time)
+
+
+class ControlHub:
+    def __init__(self, root: Path = CONTROL_DIR) -> None:
+        self.root = root
+        self.state_handler: StateHandler | None = None
+        self._selector = selectors.DefaultSelector()
+        self._listeners: dict[Hashable, socket.socket] = {}
+        self._connections: dict[Hashable, ControlConnection] = {}
+        self._states: dict[Hashable, dict] = {}
+        self._waiting: set[int] = set()
+        self._replies: dict[int, dict] = {}
+        self._request_ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._replied = threading.Condition(self._lock)
+        self._send_lock = threading.Lock()
+        self._pending: list[Callable[[], None]] = []
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._counters = {"messages": 0, "requests": 0}
+
+    def start(self, state_handler: StateHandler | None = None) -> None:
+        self.state_handler = state_handler
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="control-hub", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            keys = list(self._listeners)
+        for key in keys:
+            self.close(key)
+        self._stop.set()
+        self._wake()
+
+    def path(self, key: Hashable) -> Path:
+        return self.root / f"{key}.sock"
+
+    def listen(self, key: Hashable) -> Path:
+        path = self.path(key)
+        with self._lock:
+            if key in self._listeners:
+                return path
+            self.root.mkdir(parents=True, exist_ok=True)
+            path.unlink(missing_ok=True)
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(str(path))
+            os.chmod(path, 0o600)
+            listener.listen(4)
+            listener.setblocking(False)
+            self._listeners[key] = listener
+            self._defer(lambda: self._selector.register(listener, selectors.EVENT_READ, ("listener", key)))
+        return path
+
+    def close(self, key: Hashable) -> None:
+        with self._lock:
+            listener = self._listeners.pop(key, None)
+            connection = self._connections.get(key)
+            self._states.pop(key, None)
+            if listener is None and connection is None:
+                return
+            if listener is not None:
+                self.path(key).unlink(missing_ok=True)
+                self._defer(lambda: self._close_socket(listener))
+            if connection is not None:
+                self._defer(lambda: self._disconnect(connection))
+
+    def state(self, key: Hashable) -> dict | None:
+        with self._lock:
+            state = self._states.get(key)
+            return dict(state) if state else None
+
+    def connected_state(self, key: Hashable) -> dict | None:
+        state = self.state(key)
+        return state if state and state.get("connected") else None
+
+    def request(self, key: Hashable, command: str, timeout: float = CONTROL_REQUEST_TIMEOUT) -> dict:
+        with self._lock:
+            connection = self._connections.get(key)
+            if connection is None:
+                raise RuntimeError("Control channel not connected")
+            request_id = next(self._request_ids)
+            self._waiting.add(request_id)
+            self._counters["requests"] += 1
+        frame = json.dumps({"type": "command", "id": request_id, "command": command}).encode() + b"\n"
+        try:
+            try:
+                with self._send_lock:
+                    connection.sock.sendall(frame)
+            except OSError as exc:
+                raise RuntimeError(f"Control channel send failed: {exc}") from exc
+            with self._replied:
+                if not self._replied.wait_for(lambda: request_id in self._replies, timeout):
+                    raise TimeoutError(f"No reply to {command} within {timeout:g}s")
+                return self._replies.pop(request_id)
+        finally:
+            with self._lock:
+                self._waiting.discard(request_id)
+                self._replies.pop(request_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "listeners": len(self._listeners),
+                "connected": len(self._connections),
+                **self._counters,
+            }
+
+    def _defer(self, operation: Callable[[], None]) -> None:
+        with self._lock:
+            self._pending.append(operation)
+        self._wake()
+
+    def _wake(self) -> None:
+        try:
+            self._wake_w.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                pending, self._pending = self._pending, []
+            for operation in pending:
+                try:
+                    operation()
+                except (KeyError, ValueError, OSError):
+                    continue
+            for key, _ in self._selector.select():
+                if key.data is None:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                elif key.data[0] == "listener":
+                    self._accept(key.data[1], key.fileobj)
+                else:
+                    self._read(key.data[1])
+
+    def _accept(self, key: Hashable, listener: socket.socket) -> None:
+        try:
+            sock, _ = listener.accept()
+        except (BlockingIOError, OSError):
+            return
+        sock.setblocking(False)
+        connection = ControlConnection(key=key, sock=sock)
+        with self._lock:
+            previous = self._connections.get(key)
+            self._connections[key] = connection
+        if previous is not None:
+            self._disconnect(previous, notify=False)
+        self._selector.register(sock, selectors.EVENT_READ, ("connection", connection))
+
+    def _read(self, connection: ControlConnection) -> None:
+        try:
+            data = connection.sock.recv(CONTROL_MAX_FRAME)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._disconnect(connection)
+            return
+        connection.buffer += data
+        *frames, connection.buffer = connection.buffer.split(b"\n")
+        if len(connection.buffer) > CONTROL_MAX_FRAME:
+            self._disconnect(connection)
+            return
+        for frame in frames:
+            try:
+                message = json.loads(frame)
+            except ValueError:
+                continue
+            if isinstance(message, dict):
+                self._handle(connection, message)
+
+    def _handle(self, connection: ControlConnection, message: dict) -> None:
+        kind = message.pop("type", None)
+        if kind == "reply":
+            with self._replied:
+                if message.get("id") in self._waiting:
+                    self._replies[message["id"]] = message
+                    self._replied.notify_all()
+            return
+        if kind not in ("hello", "state"):
+            return
+        with self._lock:
+            if self._connections.get(connection.key) is not connection:
+                return
+            self._counters["messages"] += 1
+            state = self._states.setdefault(connection.key, {})
+            changes = {name: value for name, value in message.items() if state.get(name) != value}
+            if not state.get("connected"):
+                changes["connected"] = True
+            state.update(message, connected=True, updated_at=time.time())
+        if changes:
+            self._notify(connection.key, changes)
+
+    def _disconnect(self, connection: ControlConnection, notify: bool = True) -> None:
+        with self._lock:
+            current = self._connections.get(connection.key) is connection
+            if current:
+                del self._connections[connection.key]
+                state = self._states.get(connection.key)
+                if state is not None:
+                    state["connected"] = False
+        self._close_socket(connection.sock)
+        if current and notify:
+            self._notify(connection.key, {"connected": False})
+
+    def _close_socket(self, sock: socket.socket) -> None:
+        try:
+            self._selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        sock.close()
+
+    def _notify(self, key: Hashable, changes: dict) -> None:
+        if self.state_handler is None:
+            return
+        try:
+            self.state_handler(key, changes)
+        except Exception:
+            pass
+
+
+control_hub = ControlHub()
@@ -0,0 +1,159 @@
+import hashlib
+import os
+from pathlib import Path
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from typing import Iterable
+
+from ..database import DATA_DIR
+
+DEPENDENCY_STORE_DIR = DATA_DIR / "node_modules_store"
+DEPENDENCY_STORE_ENABLED = os.environ.get("DEPENDENCY_STORE_ENABLED", "1") == "1"
+DEPENDENCY_STORE_GC_GRACE = int(os.environ.get("DEPENDENCY_STORE_GC_GRACE", str(24 * 3600)))
+NPM_COMMAND = shlex.split(os.environ.get("NPM_COMMAND", "npm"))
+MANIFEST_FILES = ("package.json", "package-lock.json", "npm-shrinkwrap.json")
+LOCK_FILES = ("package-lock.json", "npm-shrinkwrap.json")
+COMPLETE_MARKER = ".complete"
+MODULES_DIRNAME = "node_modules"
+
+
+class DependencyStore:
+    def __init__(self, root: Path = DEPENDENCY_STORE_DIR, enabled: bool = DEPENDENCY_STORE_ENABLED) -> None:
+        self.root = root
+        self.enabled = enabled
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._counters = {"hits": 0, "installs": 0, "links": 0, "collected": 0}
+        self._runtime: str | None = None
+
+    def provision(self, instance_path: Path) -> str | None:
+        if not self.enabled or not (instance_path / "package.json").exists():
+            return None
+        key = self.key_for(instance_path)
+        entry = self.root / key
+        with self._lock_for(key):
+            if (entry / COMPLETE_MARKER).exists():
+                self._count("hits")
+            else:
+                self._install(instance_path, entry)
+                self._count("installs")
+            (entry / COMPLETE_MARKER).touch()
+            self._link(instance_path / MODULES_DIRNAME, entry / MODULES_DIRNAME)
+        return key
+
+    def key_for(self, instance_path: Path) -> str:
+        digest = hashlib.sha256()
+        digest.update(self._node_runtime().encode("utf-8"))
+        for name in MANIFEST_FILES:
+            path = instance_path / name
+            if path.exists():
+                digest.update(name.encode("utf-8") + b"\0")
+                digest.update(path.read_bytes())
+        return digest.hexdigest()[:32]
+
+    def collect(self, instance_paths: Iterable[Path]) -> int:
+        if not self.root.exists():
+            return 0
+        referenced = set()
+        for instance_path in instance_paths:
+            target = _link_target(Path(instance_path) / MODULES_DIRNAME)
+            if target is not None and target.parent.parent == self.root:
+                referenced.add(target.parent.name)
+        removed = 0
+        for entry in self.root.iterdir():
+            if entry.name in referenced or not _expired(entry):
+                continue
+            with self._lock_for(entry.name):
+                if not _expired(entry):
+                    continue
+                shutil.rmtree(entry, ignore_errors=True)
+            removed += 1
+        self._count("collected", removed)
+        return removed
+
+    def stats(self) -> dict:
+        entries = [entry.name for entry in self.root.iterdir()] if self.root.exists() else []
+        return {"enabled": self.enabled, "entries": len(entries), **self._counters}
+
+    def _install(self, instance_path: Path, entry: Path) -> None:
+        staging = self.root / f"{entry.name}.{uuid.uuid4().hex[:8]}.tmp"
+        staging.mkdir(parents=True)
+        try:
+            for name in MANIFEST_FILES:
+                if (instance_path / name).exists():
+                    shutil.copy2(instance_path / name, staging / name)
+            has_lock = any((staging / name).exists() for name in LOCK_FILES)
+            action = ["ci"] if has_lock else ["install", "--no-package-lock"]
+            result = subprocess.run(
+                [*NPM_COMMAND, *action, "--omit=dev", "--no-audit", "--no-fund"],
+                cwd=str(staging),
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode != 0:
+                raise RuntimeError(f"Dependency install failed: {result.stderr.strip()[-500:]}")
+            (staging / MODULES_DIRNAME).mkdir(exist_ok=True)
+            (staging / COMPLETE_MARKER).touch()
+            if entry.exists():
+                shutil.rmtree(entry)
+            os.rename(staging, entry)
+        except (OSError, RuntimeError):
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    def _link(self, link_path: Path, target: Path) -> None:
+        if link_path.is_dir() and not link_path.is_symlink():
+            return
+        if _link_target(link_path) == target:
+            return
+        temporary = link_path.with_name(f".{link_path.name}.{uuid.uuid4().hex[:8]}")
+        os.symlink(target, temporary, target_is_directory=True)
+        os.replace(temporary, link_path)
+        self._count("links")
+
+    def _node_runtime(self) -> str:
+        if self._runtime is None:
+            try:
+                self._runtime = subprocess.run(
+                    ["node", "-p", "process.version + ' ' + process.versions.modules + ' ' + process.arch"],
+                    capture_output=True,
+                    text=True,
+                ).stdout.strip()
+            except OSError:
+                self._runtime = ""
+        return self._runtime
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[key] = lock
+            return lock
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._locks_guard:
+            self._counters[name] += amount
+
+
+def _expired(entry: Path) -> bool:
+    marker = entry / COMPLETE_MARKER
+    try:
+        last_used = marker.stat().st_mtime if marker.exists() else entry.stat().st_mtime
+    except FileNotFoundError:
+        return False
+    return time.time() - last_used >= DEPENDENCY_STORE_GC_GRACE
+
+
+def _link_target(link_path: Path) -> Path | None:
+    try:
+        return Path(os.readlink(link_path))
+    except OSError:
+        return None
+
+
+dependency_store = DependencyStore()
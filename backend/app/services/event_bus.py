@@ -0,0 +1,100 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+import json
+import os
+import threading
+import time
+from typing import Any, Hashable
+
+EVENT_HISTORY_SIZE = int(os.environ.get("EVENT_HISTORY_SIZE", "2000"))
+EVENT_QUEUE_SIZE = int(os.environ.get("EVENT_QUEUE_SIZE", "500"))
+MAIN_AUDIENCE = "main"
+
+
+@dataclass(frozen=True)
+class Event:
+    id: str
+    type: str
+    audience: Hashable
+    data: dict[str, Any]
+
+    @property
+    def sequence(self) -> int:
+        return int(self.id.rsplit("-", 1)[1])
+
+    def encode(self) -> str:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, default=str)}\n\n"
+
+
+class Subscription:
+    def __init__(self, bus: "EventBus", loop: asyncio.AbstractEventLoop, audiences: set[Hashable]) -> None:
+        self.bus = bus
+        self.loop = loop
+        self.audiences = audiences
+        self.queue: asyncio.Queue[Event | None] = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, event: Event) -> None:
+        if event.audience not in self.audiences:
+            return
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: Event) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self, history_size: int = EVENT_HISTORY_SIZE) -> None:
+        self.boot_id = format(int(time.time()), "x")
+        self._counter = 0
+        self._history: deque[Event] = deque(maxlen=history_size)
+        self._subscribers: set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event_type: str, data: dict[str, Any], audience: Hashable) -> Event:
+        with self._lock:
+            self._counter += 1
+            event = Event(id=f"{self.boot_id}-{self._counter}", type=event_type, audience=audience, data=data)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.offer(event)
+        return event
+
+    def subscribe(self, audiences: set[Hashable]) -> Subscription:
+        subscription = Subscription(self, asyncio.get_running_loop(), audiences)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def replay(self, last_event_id: str, audiences: set[Hashable]) -> list[Event] | None:
+        boot_id, _, counter = last_event_id.partition("-")
+        if boot_id != self.boot_id or not counter.isdigit():
+            return None
+        last = int(counter)
+        with self._lock:
+            if last > self._counter:
+                return None
+            events = list(self._history)
+        if events and events[0].sequence > last + 1:
+            return None
+        return [event for event in events if event.sequence > last and event.audience in audiences]
+
+
+event_bus = EventBus()
@@ -0,0 +1,143 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+from pathlib import Path
+from typing import Callable
+
+FILE_WATCH_POLL_INTERVAL = float(os.environ.get("FILE_WATCH_POLL_INTERVAL", "1.0"))
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_IGNORED = 0x00008000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+FileCallback = Callable[[Path], None]
+
+
+class FileWatcher:
+    def __init__(self, poll_interval: float = FILE_WATCH_POLL_INTERVAL) -> None:
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._watches: dict[Path, tuple[frozenset[str], FileCallback]] = {}
+        self._descriptors: dict[int, Path] = {}
+        self._directory_descriptors: dict[Path, int] = {}
+        self._signatures: dict[Path, tuple[int, int] | None] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._libc = None
+        self._inotify_fd: int | None = None
+        self._init_inotify()
+
+    def watch(self, directory: Path, names: set[str], callback: FileCallback) -> None:
+        directory = Path(directory)
+        with self._lock:
+            self._watches[directory] = (frozenset(names), callback)
+            for name in names:
+                self._signatures[directory / name] = _signature(directory / name)
+            if self._inotify_fd is not None and directory not in self._directory_descriptors:
+                descriptor = self._libc.inotify_add_watch(
+                    self._inotify_fd,
+                    os.fsencode(directory),
+                    WATCH_MASK,
+                )
+                if descriptor >= 0:
+                    self._descriptors[descriptor] = directory
+                    self._directory_descriptors[directory] = descriptor
+
+    def unwatch(self, directory: Path) -> None:
+        directory = Path(directory)
+        with self._lock:
+            names, _ = self._watches.pop(directory, (frozenset(), None))
+            for name in names:
+                self._signatures.pop(directory / name, None)
+            descriptor = self._directory_descriptors.pop(directory, None)
+            if descriptor is not None:
+                self._descriptors.pop(descriptor, None)
+                self._libc.inotify_rm_watch(self._inotify_fd, descriptor)
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        target = self._run_inotify if self._inotify_fd is not None else self._run_polling
+        self._thread = threading.Thread(target=target, name="file-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _init_inotify(self) -> None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return
+        if fd < 0:
+            return
+        self._libc = libc
+        self._inotify_fd = fd
+
+    def _run_inotify(self) -> None:
+        poller = select.poll()
+        poller.register(self._inotify_fd, select.POLLIN)
+        while not self._stop.is_set():
+            if not poller.poll(self.poll_interval * 1000):
+                continue
+            try:
+                buffer = os.read(self._inotify_fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            changed: set[Path] = set()
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(buffer):
+                descriptor, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+                offset += EVENT_HEADER.size
+                name = buffer[offset : offset + length].rstrip(b"\0").decode("utf-8", "replace")
+                offset += length
+                if mask & IN_IGNORED:
+                    continue
+                with self._lock:
+                    directory = self._descriptors.get(descriptor)
+                if directory is not None and name:
+                    changed.add(directory / name)
+            for path in changed:
+                self._dispatch(path)
+
+    def _run_polling(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            with self._lock:
+                paths = list(self._signatures.items())
+            for path, previous in paths:
+                current = _signature(path)
+                if current != previous:
+                    self._dispatch(path)
+
+    def _dispatch(self, path: Path) -> None:
+        with self._lock:
+            watch = self._watches.get(path.parent)
+            if watch is None or path.name not in watch[0]:
+                return
+            self._signatures[path] = _signature(path)
+            callback = watch[1]
+        try:
+            callback(path)
+        except Exception:
+            return
+
+
+def _signature(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+file_watcher = FileWatcher()
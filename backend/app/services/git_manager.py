@@ -1,36 +1,188 @@
+import hashlib
+import os
 import shutil
 import subprocess
+import threading
 from pathlib import Path
+from typing import Callable
 
+from ..database import DATA_DIR
+from .instance_files import HEARTBEAT_FILENAME, QR_FILENAME, WA_INFO_FILENAME
 
-def clone_repo(repo_url: str, destination: Path, version: str | None = None) -> None:
+MIRRORS_DIR = DATA_DIR / "mirrors"
+RUNTIME_FILES = {HEARTBEAT_FILENAME, QR_FILENAME, WA_INFO_FILENAME, "auth_info.json"}
+MIRROR_FETCH_INTERVAL = int(os.environ.get("MIRROR_FETCH_INTERVAL", "300"))
+
+_mirror_locks: dict[str, threading.Lock] = {}
+_mirror_locks_guard = threading.Lock()
+
+
+def clone_repo(
+    repo_url: str,
+    destination: Path,
+    version: str | None = None,
+    report: Callable[[str, int], None] | None = None,
+) -> None:
     if destination.exists():
         raise FileExistsError(f"Destination already exists: {destination}")
     destination.parent.mkdir(parents=True, exist_ok=True)
+    if _is_local_repo(repo_url):
+        clone_command = ["git", "clone", repo_url, str(destination)]
+    else:
+        clone_command = ["git", "clone", "--shared", str(ensure_mirror(repo_url)), str(destination)]
     try:
-        subprocess.run(["git", "clone", repo_url, str(destination)], check=True)
+        subprocess.run(clone_command, check=True)
     except subprocess.CalledProcessError as exc:
         raise RuntimeError(f"Failed to clone repo: {repo_url}") from exc
     if version:
-        try:
-            subprocess.run(["git", "checkout", version], check=True, cwd=str(destination))
-        except subprocess.CalledProcessError as exc:
-            raise ValueError(f"Version not found: {version}") from exc
+        if report:
+            report("checkout", 60)
+        _checkout(destination, version, repo_url)
     if _is_local_repo(repo_url) and not version:
         _apply_worktree_overrides(Path(repo_url).expanduser().resolve(), destination)
 
 
-def update_repo(destination: Path, version: str | None = None) -> None:
-    if not destination.exists():
-        raise FileNotFoundError(f"Destination does not exist: {destination}")
-    subprocess.run(["git", "fetch", "--all", "--tags"], check=True, cwd=str(destination))
-    if version:
+def resolve_version(repo_url: str, version: str | None = None) -> str | None:
+    source = Path(repo_url).expanduser().resolve() if _is_local_repo(repo_url) else mirror_path(repo_url)
+    if not source.exists():
+        return None
+    result = subprocess.run(
+        ["git", "rev-parse", "--verify", "--quiet", f"{version or 'HEAD'}^{{commit}}"],
+        cwd=str(source),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() or None
+
+
+def resolve_commit(repo_url: str, version: str | None = None) -> str:
+    if not _is_local_repo(repo_url):
+        ensure_mirror(repo_url)
+    sha = resolve_version(repo_url, version)
+    if sha is None and not _is_local_repo(repo_url):
+        refresh_mirror(repo_url)
+        sha = resolve_version(repo_url, version)
+    if sha is None:
+        raise ValueError(f"Version not found: {version}")
+    return sha
+
+
+def worktree_digest(repo_url: str) -> str | None:
+    if not _is_local_repo(repo_url):
+        return None
+    source = Path(repo_url).expanduser().resolve()
+    diff = subprocess.check_output(["git", "diff", "HEAD", "--binary"], cwd=str(source))
+    untracked = subprocess.check_output(
+        ["git", "ls-files", "--others", "--exclude-standard"],
+        cwd=str(source),
+        text=True,
+    )
+    digest = hashlib.sha1(diff)
+    dirty = bool(diff)
+    for rel_path in sorted(filter(None, untracked.splitlines())):
+        path = source / rel_path
+        if _should_skip_untracked(rel_path) or not path.is_file():
+            continue
+        digest.update(rel_path.encode("utf-8") + b"\0" + path.read_bytes())
+        dirty = True
+    return digest.hexdigest()[:12] if dirty else None
+
+
+def mirror_path(repo_url: str) -> Path:
+    digest = hashlib.sha1(repo_url.encode("utf-8")).hexdigest()[:12]
+    name = repo_url.rstrip("/").rsplit("/", 1)[-1].removesuffix(".git") or "repo"
+    return MIRRORS_DIR / f"{name}-{digest}.git"
+
+
+def ensure_mirror(repo_url: str) -> Path:
+    path = mirror_path(repo_url)
+    if (path / "HEAD").exists():
+        return path
+    with _mirror_lock(repo_url):
+        if (path / "HEAD").exists():
+            return path
+        staging = path.with_name(path.name + ".tmp")
+        if staging.exists():
+            shutil.rmtree(staging)
+        MIRRORS_DIR.mkdir(parents=True, exist_ok=True)
         try:
-            subprocess.run(["git", "checkout", version], check=True, cwd=str(destination))
+            subprocess.run(["git", "clone", "--mirror", repo_url, str(staging)], check=True)
+            # Instances borrow objects from the mirror through alternates, so
+            # the mirror must never prune objects that a deleted ref pointed to.
+            subprocess.run(["git", "config", "gc.pruneExpire", "never"], check=True, cwd=str(staging))
         except subprocess.CalledProcessError as exc:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise RuntimeError(f"Failed to mirror repo: {repo_url}") from exc
+        staging.rename(path)
+    return path
+
+
+def refresh_mirror(repo_url: str) -> None:
+    path = mirror_path(repo_url)
+    if not (path / "HEAD").exists():
+        ensure_mirror(repo_url)
+        return
+    try:
+        subprocess.run(["git", "remote", "update", "--prune"], check=True, cwd=str(path))
+    except subprocess.CalledProcessError as exc:
+        raise RuntimeError(f"Failed to refresh mirror: {repo_url}") from exc
+
+
+class MirrorFetcher:
+    def __init__(self, interval: int = MIRROR_FETCH_INTERVAL) -> None:
+        self.interval = interval
+        self._repo_urls: set[str] = set()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def track(self, repo_url: str) -> None:
+        if not _is_local_repo(repo_url):
+            self._repo_urls.add(repo_url)
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mirror-fetcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            for repo_url in list(self._repo_urls):
+                try:
+                    refresh_mirror(repo_url)
+                except RuntimeError:
+                    continue
+            self._stop.wait(self.interval)
+
+
+def _mirror_lock(repo_url: str) -> threading.Lock:
+    with _mirror_locks_guard:
+        lock = _mirror_locks.get(repo_url)
+        if lock is None:
+            lock = threading.Lock()
+            _mirror_locks[repo_url] = lock
+        return lock
+
+
+def _checkout(destination: Path, version: str, repo_url: str) -> None:
+    try:
+        subprocess.run(["git", "checkout", version], check=True, cwd=str(destination))
+        return
+    except subprocess.CalledProcessError as exc:
+        if _is_local_repo(repo_url) or not mirror_path(repo_url).exists():
             raise ValueError(f"Version not found: {version}") from exc
-    else:
-        subprocess.run(["git", "pull", "--ff-only"], check=True, cwd=str(destination))
+    try:
+        refresh_mirror(repo_url)
+        subprocess.run(["git", "fetch", "origin", "--tags", "--prune"], check=True, cwd=str(destination))
+        subprocess.run(["git", "checkout", version], check=True, cwd=str(destination))
+    except (RuntimeError, subprocess.CalledProcessError) as exc:
+        raise ValueError(f"Version not found: {version}") from exc
 
 
 def _is_local_repo(repo_url: str) -> bool:
@@ -87,39 +239,59 @@ def _should_skip_untracked(rel_path: str) -> bool:
     }
     if parts[0] in ignored_roots:
         return True
+    if len(parts) == 1 and parts[0] in RUNTIME_FILES:
+        return True
     if parts[0:3] == ("backend", "app", "data"):
         return True
     return False
 
 
-def list_remote_branches(repo_url: str) -> list[str]:
+def list_remote_refs(repo_url: str) -> tuple[list[str], list[str]]:
     if _is_local_repo(repo_url):
-        try:
-            output = subprocess.check_output(
-                ["git", "for-each-ref", "--format=%(refname:short)", "refs/heads"],
-                cwd=str(Path(repo_url).expanduser().resolve()),
-                text=True,
-            )
-        except subprocess.CalledProcessError as exc:
-            raise RuntimeError(f"Failed to list branches: {repo_url}") from exc
-        branches = [line.strip() for line in output.splitlines() if line.strip()]
-        return sorted(set(branches))
+        return _list_local_refs(Path(repo_url).expanduser().resolve(), repo_url)
+    mirror = mirror_path(repo_url)
+    if (mirror / "HEAD").exists():
+        return _list_local_refs(mirror, repo_url)
 
     try:
         output = subprocess.check_output(
-            ["git", "ls-remote", "--heads", repo_url],
+            ["git", "ls-remote", "--heads", "--tags", repo_url],
             text=True,
         )
     except subprocess.CalledProcessError as exc:
         raise RuntimeError(f"Failed to list branches: {repo_url}") from exc
 
-    branches = []
+    branches = set()
+    tags = set()
     for line in output.splitlines():
         parts = line.strip().split()
         if len(parts) != 2:
             continue
         ref = parts[1]
-        if not ref.startswith("refs/heads/"):
-            continue
-        branches.append(ref.replace("refs/heads/", "", 1))
-    return sorted(set(branches))
+        if ref.startswith("refs/heads/"):
+            branches.add(ref.replace("refs/heads/", "", 1))
+        elif ref.startswith("refs/tags/"):
+            tags.add(ref.replace("refs/tags/", "", 1).removesuffix("^{}"))
+    return sorted(branches), sorted(tags)
+
+
+def _list_local_refs(repo_path: Path, repo_url: str) -> tuple[list[str], list[str]]:
+    try:
+        output = subprocess.check_output(
+            ["git", "for-each-ref", "--format=%(refname)", "refs/heads", "refs/tags"],
+            cwd=str(repo_path),
+            text=True,
+        )
+    except subprocess.CalledProcessError as exc:
+        raise RuntimeError(f"Failed to list branches: {repo_url}") from exc
+    branches = set()
+    tags = set()
+    for ref in filter(None, (line.strip() for line in output.splitlines())):
+        if ref.startswith("refs/heads/"):
+            branches.add(ref.replace("refs/heads/", "", 1))
+        elif ref.startswith("refs/tags/"):
+            tags.add(ref.replace("refs/tags/", "", 1))
+    return sorted(branches), sorted(tags)
+
+
+mirror_fetcher = MirrorFetcher()
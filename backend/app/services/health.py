@@ -0,0 +1,189 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+from pathlib import Path
+import socket
+import threading
+import time
+from typing import Hashable
+
+from ..database import SessionLocal
+from ..models import Instance
+from .control_channel import control_hub
+from .instance_files import QR_FILENAME, WA_INFO_FILENAME, read_heartbeat
+from .live_updates import publish_health
+from .main_manager import MAIN_SUPERVISOR_KEY, REPO_ROOT
+from .supervisor import ProcessSupervisor, supervisor as default_supervisor
+
+HEALTH_INTERVAL = float(os.environ.get("HEALTH_INTERVAL", "15"))
+HEALTH_CONCURRENCY = int(os.environ.get("HEALTH_CONCURRENCY", "16"))
+HEALTH_HEARTBEAT_STALE = float(os.environ.get("HEALTH_HEARTBEAT_STALE", "45"))
+HEALTH_PORT_TIMEOUT = float(os.environ.get("HEALTH_PORT_TIMEOUT", "1"))
+HEALTH_PORT_HOST = "127.0.0.1"
+
+
+class HealthProber:
+    def __init__(
+        self,
+        interval: float = HEALTH_INTERVAL,
+        concurrency: int = HEALTH_CONCURRENCY,
+        process_supervisor: ProcessSupervisor | None = None,
+    ) -> None:
+        self.interval = interval
+        self.concurrency = max(concurrency, 1)
+        self.supervisor = process_supervisor or default_supervisor
+        self._table: dict[Hashable, dict] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._last_pass = {"targets": 0, "duration_ms": 0.0, "unhealthy": 0}
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="health-prober", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def current(self, key: Hashable) -> dict | None:
+        with self._lock:
+            health = self._table.get(key)
+            return dict(health) if health else None
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._table.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts: dict[str, int] = {}
+            for health in self._table.values():
+                counts[health["status"]] = counts.get(health["status"], 0) + 1
+            return {
+                "interval": self.interval,
+                "concurrency": self.concurrency,
+                "statuses": counts,
+                "last_pass": dict(self._last_pass),
+            }
+
+    def probe_all(self) -> None:
+        started = time.perf_counter()
+        targets = self._targets()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="health") as pool:
+            results = list(
+                pool.map(
+                    lambda target: probe(target[2], target[3], control_hub.connected_state(target[0])),
+                    targets,
+                )
+            )
+        changed = []
+        with self._lock:
+            for key in [key for key in self._table if key not in {target[0] for target in targets}]:
+                del self._table[key]
+            for (key, owner_id, _, _), health in zip(targets, results):
+                previous = self._table.get(key)
+                self._table[key] = health
+                if previous is None or previous["status"] != health["status"]:
+                    changed.append((key, owner_id, health))
+            self._last_pass = {
+                "targets": len(targets),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                "unhealthy": sum(1 for health in results if health["status"] != "healthy"),
+            }
+        for key, owner_id, health in changed:
+            publish_health(None if key == MAIN_SUPERVISOR_KEY else key, owner_id, health)
+
+    def _targets(self) -> list[tuple[Hashable, int | None, Path, int | None]]:
+        running = {key for key, entry in self.supervisor.snapshot().items() if entry["state"] == "running"}
+        db = SessionLocal()
+        try:
+            rows = db.query(Instance.id, Instance.owner_id, Instance.path, Instance.port).filter(
+                Instance.status == "running"
+            )
+            targets = [(row.id, row.owner_id, Path(row.path), row.port) for row in rows if row.id in running]
+        finally:
+            db.close()
+        if MAIN_SUPERVISOR_KEY in running:
+            targets.append((MAIN_SUPERVISOR_KEY, None, REPO_ROOT, None))
+        return targets
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.probe_all()
+            except Exception:
+                continue
+
+
+def probe(path: Path, port: int | None, channel: dict | None = None) -> dict:
+    now = time.time()
+    heartbeat = read_heartbeat(path)
+    heartbeat_age = max(now - heartbeat[0], 0.0) if heartbeat else None
+    connection = heartbeat[1].get("connection") if heartbeat else None
+    if not isinstance(connection, str):
+        connection = None
+    port_open = None
+    if port is not None:
+        port_open, port_connection = _probe_port(port)
+        connection = port_connection or connection
+    if channel and channel.get("connection"):
+        connection = channel["connection"]
+    qr_pending = (path / QR_FILENAME).exists()
+    responsive = bool(port_open) or (heartbeat_age is not None and heartbeat_age <= HEALTH_HEARTBEAT_STALE)
+    if not responsive:
+        status = "unresponsive"
+    elif connection == "open":
+        status = "healthy"
+    elif qr_pending:
+        status = "pairing"
+    else:
+        status = "disconnected"
+    return {
+        "status": status,
+        "connection": connection,
+        "heartbeat_age": round(heartbeat_age, 1) if heartbeat_age is not None else None,
+        "port_open": port_open,
+        "paired": (path / WA_INFO_FILENAME).exists(),
+        "qr_pending": qr_pending,
+        "checked_at": now,
+    }
+
+
+def _probe_port(port: int) -> tuple[bool, str | None]:
+    try:
+        conn = socket.create_connection((HEALTH_PORT_HOST, port), timeout=HEALTH_PORT_TIMEOUT)
+    except OSError:
+        return False, None
+    data = b""
+    deadline = time.monotonic() + HEALTH_PORT_TIMEOUT
+    with conn:
+        while len(data) < 4096:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            conn.settimeout(remaining)
+            try:
+                chunk = conn.recv(4096 - len(data))
+            except OSError:
+                break
+            if not chunk:
+                break
+            data += chunk
+            connection = _parse_connection(data)
+            if connection is not None:
+                return True, connection
+    return True, _parse_connection(data)
+
+
+def _parse_connection(data: bytes) -> str | None:
+    try:
+        connection = json.loads(data).get("connection")
+    except (ValueError, AttributeError):
+        return None
+    return connection if isinstance(connection, str) else None
+
+
+health_prober = HealthProber()
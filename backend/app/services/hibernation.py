@@ -0,0 +1,100 @@
+from datetime import datetime, timezone
+import os
+from pathlib import Path
+import threading
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models import Instance
+from .control_channel import control_hub
+from .instance_files import read_heartbeat
+from .instance_manager import InstanceManager
+
+HIBERNATION_INTERVAL = float(os.environ.get("HIBERNATION_INTERVAL", "60"))
+
+
+class Hibernator:
+    def __init__(self, interval: float = HIBERNATION_INTERVAL) -> None:
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._counters = {"hibernations": 0, "wakes": 0, "errors": 0}
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="hibernator", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> dict:
+        db = SessionLocal()
+        try:
+            hibernated = db.query(Instance).filter(Instance.status == "hibernated").count()
+        finally:
+            db.close()
+        with self._lock:
+            return {"interval": self.interval, "hibernated": hibernated, **self._counters}
+
+    def sweep(self) -> None:
+        db = SessionLocal()
+        try:
+            manager = InstanceManager(db)
+            now = datetime.utcnow()
+            idle_candidates = db.query(Instance).filter(
+                Instance.status == "running",
+                Instance.idle_timeout_minutes.isnot(None),
+            )
+            for instance in idle_candidates.all():
+                if idle_seconds(instance, now) < instance.idle_timeout_minutes * 60:
+                    continue
+                self._apply(db, manager.hibernate_instance, instance, "hibernations")
+            due = db.query(Instance).filter(Instance.status == "hibernated", Instance.wake_at <= now)
+            for instance in due.all():
+                self._apply(db, manager.start_instance, instance, "wakes")
+        finally:
+            db.close()
+
+    def _apply(
+        self,
+        db: Session,
+        action: Callable[[Instance], Instance],
+        instance: Instance,
+        counter: str,
+    ) -> None:
+        try:
+            action(instance)
+        except (OSError, RuntimeError):
+            db.rollback()
+            counter = "errors"
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception:
+                continue
+
+
+def idle_seconds(instance: Instance, now: datetime) -> float:
+    last = instance.last_started_at or instance.updated_at or now
+    channel = control_hub.connected_state(instance.id)
+    if channel and "lastActivity" in channel:
+        activity = channel["lastActivity"]
+    else:
+        heartbeat = read_heartbeat(Path(instance.path))
+        activity = heartbeat[1].get("lastActivity") if heartbeat else None
+    if isinstance(activity, (int, float)):
+        last = max(last, datetime.fromtimestamp(activity / 1000, timezone.utc).replace(tzinfo=None))
+    return (now - last).total_seconds()
+
+
+hibernator = Hibernator()
@@ -0,0 +1,105 @@
+from collections import OrderedDict
+import json
+import os
+from pathlib import Path
+import threading
+from typing import Any, Callable
+
+QR_FILENAME = "qr.txt"
+WA_INFO_FILENAME = "wa_info.json"
+HEARTBEAT_FILENAME = "heartbeat"
+FILE_CACHE_SIZE = int(os.environ.get("FILE_CACHE_SIZE", "4096"))
+
+
+class FileCache:
+    def __init__(self, max_entries: int = FILE_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.absent = 0
+        self._entries: OrderedDict[tuple[Path, Callable], tuple[tuple[int, int], Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, loader: Callable[[Path], Any]) -> Any:
+        key = (path, loader)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(key, None)
+                self.absent += 1
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        try:
+            value = loader(path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._entries[key] = (signature, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, path: Path) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                del self._entries[key]
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "absent": self.absent,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+def read_qr(qr_path: Path) -> str | None:
+    return file_cache.get(qr_path, _load_qr)
+
+
+def read_wa_number(instance_path: Path) -> str | None:
+    return file_cache.get(instance_path / WA_INFO_FILENAME, _load_wa_number)
+
+
+def read_heartbeat(instance_path: Path) -> tuple[float, dict] | None:
+    heartbeat_path = instance_path / HEARTBEAT_FILENAME
+    try:
+        mtime = heartbeat_path.stat().st_mtime
+        payload = json.loads(heartbeat_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(payload, dict):
+        return None
+    return mtime, payload
+
+
+def _load_qr(qr_path: Path) -> str | None:
+    qr_value = qr_path.read_text(encoding="utf-8").strip()
+    return qr_value or None
+
+
+def _load_wa_number(info_path: Path) -> str | None:
+    try:
+        payload = json.loads(info_path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return None
+    number = payload.get("number")
+    if isinstance(number, str) and number.strip():
+        return number.strip()
+    return None
+
+
+file_cache = FileCache()
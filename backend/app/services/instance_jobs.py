@@ -0,0 +1,47 @@
+import json
+import threading
+
+from sqlalchemy.orm import Session
+
+from ..models import Instance, Job
+from ..schemas import InstanceCreate, InstanceUpdate
+from .instance_manager import InstanceManager
+from .job_queue import JobQueue, ProgressCallback
+
+CREATE_INSTANCE_JOB = "create_instance"
+UPDATE_INSTANCE_JOB = "update_instance"
+
+_instance_locks: dict[int, threading.Lock] = {}
+_instance_locks_guard = threading.Lock()
+
+
+def register_instance_jobs(queue: JobQueue) -> None:
+    queue.register(CREATE_INSTANCE_JOB, run_create_instance)
+    queue.register(UPDATE_INSTANCE_JOB, run_update_instance)
+
+
+def run_create_instance(db: Session, job: Job, report: ProgressCallback) -> int | None:
+    payload = InstanceCreate.model_validate(json.loads(job.payload))
+    manager = InstanceManager(db)
+    instance = manager.create_instance(payload, owner_id=job.owner_id, report=report)
+    return instance.id
+
+
+def run_update_instance(db: Session, job: Job, report: ProgressCallback) -> int | None:
+    payload = InstanceUpdate.model_validate(json.loads(job.payload))
+    with _lock_for(job.instance_id):
+        instance = db.query(Instance).get(job.instance_id)
+        if instance is None:
+            raise ValueError("Instance not found")
+        manager = InstanceManager(db)
+        instance = manager.update_instance(instance, payload, report=report)
+    return instance.id
+
+
+def _lock_for(instance_id: int) -> threading.Lock:
+    with _instance_locks_guard:
+        lock = _instance_locks.get(instance_id)
+        if lock is None:
+            lock = threading.Lock()
+            _instance_locks[instance_id] = lock
+        return lock
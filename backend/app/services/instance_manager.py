@@ -1,26 +1,54 @@
-from datetime import datetime
+import asyncio
+from datetime import datetime, timezone
 import os
 from pathlib import Path
 import shutil
-from typing import Iterable
+import time
+from typing import Callable, Iterable
 
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from ..database import SessionLocal
 from ..models import Instance
 from ..schemas import InstanceCreate, InstanceUpdate
-from .git_manager import clone_repo, update_repo
+from .control_channel import control_hub
+from .dependency_store import dependency_store
+from .health import health_prober
+from .live_updates import publish_process_state
+from .log_capture import LOG_DIRNAME, log_capture
+from .metrics import metrics_sampler
+from .port_allocator import port_allocator
 from .process_manager import ProcessManager
+from .release_store import RELEASE_ENTRYPOINT, release_store
+from .resource_limits import LIMIT_FIELDS, ResourceLimits, resource_limiter
+from .supervisor import ProcessSupervisor, supervisor as default_supervisor
+from .warm_pool import warm_pool
 
 REPO_ROOT = Path(__file__).resolve().parents[3]
 DEFAULT_INSTANCES_DIR = REPO_ROOT / "instances"
 DEFAULT_START_COMMAND = ["node", "index.js"]
+SUPERVISOR_EXIT_WAIT = 2.0
+UPDATE_PROBATION_SECONDS = float(os.environ.get("UPDATE_PROBATION_SECONDS", "5"))
+HIBERNATION_WAKE_REQUESTS = int(os.environ.get("HIBERNATION_WAKE_REQUESTS", "1"))
+SHUTDOWN_STOP_INSTANCES = os.environ.get("SHUTDOWN_STOP_INSTANCES", "0") == "1"
+SHUTDOWN_STOP_DEADLINE = float(os.environ.get("SHUTDOWN_STOP_DEADLINE", "15"))
 DEFAULT_REPO_URL = os.environ.get("REPO_URL", "https://github.com/miangeldev/TestiBot.git")
+_ASYNC_WRITE_LOCK = asyncio.Lock()
+_COLUMN_KEYS = tuple(attr.key for attr in inspect(Instance).column_attrs)
 
 
 class InstanceManager:
-    def __init__(self, db: Session, process_manager: ProcessManager | None = None) -> None:
+    def __init__(
+        self,
+        db: Session | None,
+        process_manager: ProcessManager | None = None,
+        supervisor: ProcessSupervisor | None = None,
+    ) -> None:
         self.db = db
         self.process_manager = process_manager or ProcessManager()
+        self.supervisor = supervisor or default_supervisor
 
     def list_instances(self, owner_id: int | None = None) -> Iterable[Instance]:
         query = self.db.query(Instance)
@@ -28,110 +56,363 @@ class InstanceManager:
             query = query.filter(Instance.owner_id == owner_id)
         return query.all()
 
-    def create_instance(self, payload: InstanceCreate, owner_id: int | None = None) -> Instance:
+    def create_instance(
+        self,
+        payload: InstanceCreate,
+        owner_id: int | None = None,
+        report: Callable[[str, int], None] | None = None,
+    ) -> Instance:
+        report = report or _noop_report
+        started = time.monotonic()
         instances_dir = DEFAULT_INSTANCES_DIR
         instance_path = instances_dir / payload.name
         env_path = instance_path / ".env"
 
-        clone_repo(DEFAULT_REPO_URL, instance_path, payload.version)
-        self._write_env(env_path, payload.name, payload.version, payload.port)
-
-        instance = Instance(
-            name=payload.name,
-            status="stopped",
-            path=str(instance_path),
-            env_path=str(env_path),
-            version=payload.version,
-            port=payload.port,
-            owner_id=owner_id,
-            updated_at=datetime.utcnow(),
-        )
-        self.db.add(instance)
-        self.db.commit()
+        if instance_path.exists():
+            raise FileExistsError(f"Destination already exists: {instance_path}")
+        if payload.port is None:
+            port = port_allocator.allocate()
+        else:
+            port_allocator.reserve(payload.port)
+            port = payload.port
+        created = False
+        try:
+            report("release", 10)
+            release, built = release_store.ensure(DEFAULT_REPO_URL, payload.version, report=report)
+            instance_path.mkdir(parents=True)
+            created = True
+            report("env", 80)
+            self._write_env(env_path, payload.name, payload.version, port)
+
+            instance = Instance(
+                name=payload.name,
+                status="stopped",
+                path=str(instance_path),
+                env_path=str(env_path),
+                version=payload.version,
+                release=release,
+                port=port,
+                idle_timeout_minutes=payload.idle_timeout_minutes,
+                owner_id=owner_id,
+                updated_at=datetime.utcnow(),
+                **payload.model_dump(include=set(LIMIT_FIELDS)),
+            )
+            self.db.add(instance)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            port_allocator.release(port)
+            if created:
+                shutil.rmtree(instance_path, ignore_errors=True)
+            raise
         self.db.refresh(instance)
+        warm_pool.record_create(time.monotonic() - started, not built)
         return instance
 
     def start_instance(self, instance: Instance) -> Instance:
+        self.apply_start(instance)
+        self.db.commit()
+        self.db.refresh(instance)
+        return instance
+
+    def apply_start(self, instance: Instance, restart: bool = True) -> None:
+        instance.desired_status = "running"
+        self._clear_hibernation(instance)
+        self.supervisor.reset(instance.id)
         if instance.pid:
-            if self.process_manager.is_running(instance.pid):
+            if self.owns_process(instance):
                 if instance.status != "running":
                     instance.status = "running"
-                    instance.updated_at = datetime.utcnow()
-                    self.db.commit()
-                    self.db.refresh(instance)
-                return instance
-            instance.pid = None
+                if instance.pid_start_time is None:
+                    self.record_process(instance, instance.pid)
+                self.adopt(instance)
+                instance.updated_at = datetime.utcnow()
+                return
+            self.clear_process(instance)
+
+        self.record_process(instance, self.launch(instance, restart=restart))
+        instance.status = "running"
+        instance.last_started_at = datetime.utcnow()
+        instance.updated_at = datetime.utcnow()
 
+    def launch(self, instance: Instance, restart: bool = True) -> int:
+        limits = ResourceLimits.from_instance(instance)
         process = self.process_manager.start_process(
-            DEFAULT_START_COMMAND,
+            self._start_command(instance),
             cwd=Path(instance.path),
             env_path=Path(instance.env_path),
+            env_overrides={
+                **resource_limiter.spawn_env(limits),
+                "CONTROL_SOCKET": str(control_hub.listen(instance.id)),
+            },
+            capture_output=True,
+            preexec_fn=resource_limiter.spawn_hook(instance.id, limits),
+        )
+        resource_limiter.confirm(instance.id, process.pid, limits)
+        log_capture.attach(instance.id, process, Path(instance.path) / LOG_DIRNAME)
+        self.supervisor.watch(
+            instance.id,
+            process.pid,
+            process,
+            restart=restart,
+            on_exit=self._exit_callback(instance),
         )
-        instance.pid = process.pid
+        return process.pid
+
+    def _start_command(self, instance: Instance) -> list[str]:
+        if instance.release is None:
+            return DEFAULT_START_COMMAND
+        entrypoint = release_store.path(instance.release) / RELEASE_ENTRYPOINT
+        if not entrypoint.exists():
+            raise FileNotFoundError(f"Release not found: {instance.release}")
+        return [DEFAULT_START_COMMAND[0], str(entrypoint)]
+
+    def adopt(self, instance: Instance) -> None:
+        control_hub.listen(instance.id)
+        if self.supervisor.pid(instance.id) != instance.pid:
+            self.supervisor.watch(instance.id, instance.pid, on_exit=self._exit_callback(instance))
+
+    def restart_crashed(self, instance: Instance) -> Instance:
+        self.clear_process(instance)
+        self.record_process(instance, self.launch(instance))
         instance.status = "running"
+        instance.restart_count = (instance.restart_count or 0) + 1
         instance.last_started_at = datetime.utcnow()
         instance.updated_at = datetime.utcnow()
         self.db.commit()
         self.db.refresh(instance)
         return instance
 
-    def stop_instance(self, instance: Instance) -> Instance:
-        if instance.pid:
-            self.process_manager.stop_process(instance.pid)
-        instance.status = "stopped"
+    def owns_process(self, instance: Instance) -> bool:
+        if not instance.pid:
+            return False
+        if self.supervisor.pid(instance.id) == instance.pid:
+            return True
+        if instance.pid_start_time is None:
+            return self.process_manager.matches(instance.pid, cwd=instance.path)
+        return self.process_manager.matches(
+            instance.pid,
+            start_time=instance.pid_start_time,
+            cmdline=instance.pid_cmdline,
+            cwd=instance.pid_cwd,
+        )
+
+    def record_process(self, instance: Instance, pid: int) -> None:
+        for field, value in self.process_fields(pid).items():
+            setattr(instance, field, value)
+
+    def process_fields(self, pid: int) -> dict:
+        fingerprint = self.process_manager.fingerprint(pid, settle_timeout=0.5)
+        return {
+            "pid": pid,
+            "pid_start_time": fingerprint.start_time if fingerprint else None,
+            "pid_cmdline": fingerprint.cmdline if fingerprint else None,
+            "pid_cwd": fingerprint.cwd if fingerprint else None,
+        }
+
+    def clear_process(self, instance: Instance) -> None:
         instance.pid = None
-        instance.updated_at = datetime.utcnow()
+        instance.pid_start_time = None
+        instance.pid_cmdline = None
+        instance.pid_cwd = None
+
+    def stop_instance(self, instance: Instance) -> Instance:
+        self.apply_stop(instance)
         self.db.commit()
         self.db.refresh(instance)
         return instance
 
-    def reset_session(self, instance: Instance) -> Instance:
-        if instance.pid:
-            self.process_manager.stop_process(instance.pid)
+    def apply_stop(self, instance: Instance) -> None:
+        self._stop_owned_process(instance)
+        self.mark_stopped(instance)
+
+    def mark_stopped(self, instance: Instance) -> None:
         instance.status = "stopped"
-        instance.pid = None
+        instance.desired_status = "stopped"
+        self.clear_process(instance)
+        self._clear_hibernation(instance)
+        instance.updated_at = datetime.utcnow()
 
-        self._clear_auth(Path(instance.path))
+    def shutdown_instance(self, instance: Instance) -> Instance:
+        self.supervisor.expect_exit(instance.id)
+        control_hub.request(instance.id, "shutdown")
+        self.supervisor.wait_exit(instance.id, SUPERVISOR_EXIT_WAIT)
+        return self.stop_instance(instance)
+
+    def hibernate_instance(self, instance: Instance) -> Instance:
+        self.apply_hibernate(instance)
+        self.db.commit()
+        self.db.refresh(instance)
+        return instance
+
+    def apply_hibernate(self, instance: Instance) -> None:
+        self._stop_owned_process(instance)
+        instance.status = "hibernated"
+        instance.desired_status = "hibernated"
+        self.clear_process(instance)
+        instance.hibernated_at = datetime.utcnow()
+        instance.pending_wakes = 0
         instance.updated_at = datetime.utcnow()
+
+    def apply_wake_request(self, instance: Instance) -> None:
+        if instance.status != "hibernated":
+            return
+        instance.pending_wakes = (instance.pending_wakes or 0) + 1
+        if instance.pending_wakes >= HIBERNATION_WAKE_REQUESTS:
+            self.apply_start(instance)
+        else:
+            instance.updated_at = datetime.utcnow()
+
+    def _clear_hibernation(self, instance: Instance) -> None:
+        instance.hibernated_at = None
+        instance.wake_at = None
+        instance.pending_wakes = 0
+
+    def reset_session(self, instance: Instance) -> Instance:
+        self.apply_reset(instance)
         self.db.commit()
         self.db.refresh(instance)
+        return instance
 
-        return self.start_instance(instance)
+    def apply_restart(self, instance: Instance) -> None:
+        self.apply_stop(instance)
+        self.apply_start(instance)
 
-    def update_instance(self, instance: Instance, payload: InstanceUpdate) -> Instance:
-        if payload.status and payload.status not in ("running", "stopped"):
+    def apply_reset(self, instance: Instance) -> None:
+        self._stop_owned_process(instance)
+        instance.status = "stopped"
+        self.clear_process(instance)
+        self._clear_auth(Path(instance.path))
+        self.apply_start(instance)
+
+    def validate_update(self, payload: InstanceUpdate) -> None:
+        if payload.status and payload.status not in ("running", "stopped", "hibernated"):
             raise ValueError(f"Invalid status: {payload.status}")
+
+    def update_instance(
+        self,
+        instance: Instance,
+        payload: InstanceUpdate,
+        report: Callable[[str, int], None] | None = None,
+    ) -> Instance:
+        report = report or _noop_report
+        self.validate_update(payload)
         desired_status = payload.status or instance.status
         version_changed = payload.version is not None and payload.version != instance.version
         port_changed = payload.port is not None and payload.port != instance.port
         changed = version_changed or port_changed
+        settings_changed = self._apply_limits(instance, payload)
+        settings_changed = self._apply_idle_policy(instance, payload) or settings_changed
 
         if not changed:
             if desired_status == "running" and instance.status != "running":
+                report("start", 50)
                 return self.start_instance(instance)
-            if desired_status == "stopped" and instance.status == "running":
+            if desired_status == "stopped" and instance.status in ("running", "hibernated"):
                 return self.stop_instance(instance)
+            if desired_status == "hibernated" and instance.status == "running":
+                return self.hibernate_instance(instance)
+            if settings_changed:
+                instance.updated_at = datetime.utcnow()
+                self.db.commit()
+                self.db.refresh(instance)
             return instance
 
-        if instance.status == "running":
-            self.stop_instance(instance)
+        if port_changed:
+            port_allocator.reserve(payload.port)
+        previous_port = instance.port
+        try:
+            self._apply_update(instance, payload, desired_status, version_changed, port_changed, report)
+        except Exception:
+            if port_changed:
+                port_allocator.release(payload.port)
+            raise
+        if port_changed:
+            port_allocator.release(previous_port)
+        return instance
 
+    def _apply_update(
+        self,
+        instance: Instance,
+        payload: InstanceUpdate,
+        desired_status: str,
+        version_changed: bool,
+        port_changed: bool,
+        report: Callable[[str, int], None],
+    ) -> None:
+        previous = (instance.release, instance.version, instance.port)
+        release = instance.release
         if version_changed:
-            update_repo(Path(instance.path), payload.version)
-            instance.version = payload.version
+            report("release", 20)
+            release, _ = release_store.ensure(DEFAULT_REPO_URL, payload.version, report=report)
+            report("validate", 60)
+            release_store.validate(release)
+        version = payload.version if version_changed else instance.version
+        port = payload.port if port_changed else instance.port
 
-        if port_changed:
-            instance.port = payload.port
+        report("env", 70)
+        self._write_env(Path(instance.env_path), instance.name, version, port)
+        was_running = instance.status == "running"
+        stop_started = time.monotonic()
+        try:
+            if was_running:
+                self.apply_stop(instance)
+            instance.release, instance.version, instance.port = release, version, port
+            if desired_status == "running":
+                report("start", 85)
+                self.apply_start(instance, restart=False)
+                downtime = time.monotonic() - stop_started
+                self._check_probation(instance)
+                if was_running:
+                    instance.last_downtime_ms = int(downtime * 1000)
+        except (OSError, RuntimeError) as exc:
+            self._rollback(instance, previous, was_running)
+            raise RuntimeError(f"Update failed and was rolled back: {exc}") from exc
 
+        instance.updated_at = datetime.utcnow()
+        self.db.commit()
+        self.db.refresh(instance)
+
+    def _check_probation(self, instance: Instance) -> None:
+        if self.supervisor.wait_exit(instance.id, UPDATE_PROBATION_SECONDS):
+            raise RuntimeError(f"New version exited within {UPDATE_PROBATION_SECONDS:g}s")
+        self.supervisor.enable_restart(instance.id)
+
+    def _rollback(self, instance: Instance, previous: tuple, was_running: bool) -> None:
+        self._stop_owned_process(instance)
+        self.clear_process(instance)
+        instance.release, instance.version, instance.port = previous
         self._write_env(Path(instance.env_path), instance.name, instance.version, instance.port)
+        instance.status = "stopped"
+        if was_running:
+            self.apply_start(instance)
         instance.updated_at = datetime.utcnow()
         self.db.commit()
         self.db.refresh(instance)
 
-        if desired_status == "running":
-            return self.start_instance(instance)
+    def _apply_limits(self, instance: Instance, payload: InstanceUpdate) -> bool:
+        changed = False
+        for field in LIMIT_FIELDS:
+            if field in payload.model_fields_set and getattr(payload, field) != getattr(instance, field):
+                setattr(instance, field, getattr(payload, field))
+                changed = True
+        if changed:
+            pid = instance.pid if instance.status == "running" else None
+            resource_limiter.update(instance.id, pid, ResourceLimits.from_instance(instance))
+        return changed
 
-        return instance
+    def _apply_idle_policy(self, instance: Instance, payload: InstanceUpdate) -> bool:
+        changed = False
+        if "idle_timeout_minutes" in payload.model_fields_set:
+            changed = payload.idle_timeout_minutes != instance.idle_timeout_minutes
+            instance.idle_timeout_minutes = payload.idle_timeout_minutes
+        if "wake_at" in payload.model_fields_set:
+            wake_at = payload.wake_at
+            if wake_at is not None and wake_at.tzinfo is not None:
+                wake_at = wake_at.astimezone(timezone.utc).replace(tzinfo=None)
+            changed = changed or wake_at != instance.wake_at
+            instance.wake_at = wake_at
+        return changed
 
     def _write_env(self, env_path: Path, name: str, version: str | None, port: int | None) -> None:
         env_lines = [
@@ -144,13 +425,32 @@ class InstanceManager:
         env_path.write_text("\n".join(env_lines) + "\n", encoding="utf-8")
 
     def delete_instance(self, instance: Instance) -> None:
-        if instance.pid:
-            self.process_manager.stop_process(instance.pid)
+        self.remove_files(instance)
+        self.db.delete(instance)
+        self.db.commit()
+
+    def remove_files(self, instance: Instance) -> None:
+        self._stop_owned_process(instance)
+        log_capture.discard(instance.id)
+        metrics_sampler.discard(instance.id)
+        health_prober.discard(instance.id)
+        resource_limiter.remove(instance.id)
+        self.supervisor.forget(instance.id)
+        port_allocator.release(instance.port)
         instance_path = Path(instance.path)
         if instance_path.exists():
             shutil.rmtree(instance_path)
-        self.db.delete(instance)
-        self.db.commit()
+
+    def _exit_callback(self, instance: Instance) -> Callable[[int | None], None]:
+        instance_id, owner_id = instance.id, instance.owner_id
+        return lambda exit_code: publish_process_state(instance_id, owner_id)
+
+    def _stop_owned_process(self, instance: Instance) -> None:
+        self.supervisor.expect_exit(instance.id)
+        control_hub.close(instance.id)
+        if self.owns_process(instance):
+            self.process_manager.stop_process(instance.pid)
+            self.supervisor.wait_exit(instance.id, SUPERVISOR_EXIT_WAIT)
 
     def _clear_auth(self, instance_path: Path) -> None:
         auth_dir = instance_path / "auth_info"
@@ -160,3 +460,174 @@ class InstanceManager:
             target = instance_path / filename
             if target.exists():
                 target.unlink()
+
+
+class AsyncInstanceManager:
+    def __init__(
+        self,
+        db: AsyncSession,
+        process_manager: ProcessManager | None = None,
+        supervisor: ProcessSupervisor | None = None,
+    ) -> None:
+        self.db = db
+        self.processes = InstanceManager(None, process_manager, supervisor)
+
+    async def list_instances(self, owner_id: int | None = None) -> list[Instance]:
+        query = select(Instance)
+        if owner_id is not None:
+            query = query.where(Instance.owner_id == owner_id)
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+
+    async def select_instances(
+        self,
+        owner_id: int,
+        ids: list[int] | None = None,
+        version: str | None = None,
+        status: str | None = None,
+    ) -> list[Instance]:
+        query = select(Instance).where(Instance.owner_id == owner_id)
+        if ids is not None:
+            query = query.where(Instance.id.in_(ids))
+        if version is not None:
+            query = query.where(Instance.version == version if version else Instance.version.is_(None))
+        if status is not None:
+            query = query.where(Instance.status == status)
+        result = await self.db.execute(query.order_by(Instance.id))
+        return list(result.scalars().all())
+
+    async def get_instance(self, instance_id: int, owner_id: int) -> Instance | None:
+        result = await self.db.execute(
+            select(Instance).where(Instance.id == instance_id, Instance.owner_id == owner_id)
+        )
+        return result.scalars().first()
+
+    async def start_instance(self, instance: Instance) -> Instance:
+        return await self._apply_and_commit(instance, self.processes.apply_start)
+
+    async def stop_instance(self, instance: Instance) -> Instance:
+        return await self._apply_and_commit(instance, self.processes.apply_stop)
+
+    async def wake_instance(self, instance: Instance) -> Instance:
+        return await self._apply_and_commit(instance, self.processes.apply_wake_request)
+
+    async def reset_session(self, instance: Instance) -> Instance:
+        return await self._apply_and_commit(instance, self.processes.apply_reset)
+
+    async def delete_instance(self, instance: Instance) -> None:
+        await asyncio.to_thread(self.processes.remove_files, _detached(instance))
+        await self.db.delete(instance)
+        await self.commit()
+
+    async def commit(self) -> None:
+        async with _ASYNC_WRITE_LOCK:
+            await self.db.commit()
+
+    async def apply(self, instance: Instance, step: Callable[[Instance], None]) -> None:
+        snapshot, error = await self.run_step(instance, step)
+        self.absorb(instance, snapshot)
+        if error is not None:
+            raise error
+
+    async def run_step(
+        self,
+        instance: Instance,
+        step: Callable[[Instance], None],
+    ) -> tuple[Instance, Exception | None]:
+        snapshot = _detached(instance)
+        try:
+            await asyncio.to_thread(step, snapshot)
+        except Exception as exc:
+            return snapshot, exc
+        return snapshot, None
+
+    def absorb(self, instance: Instance, snapshot: Instance) -> None:
+        for key in _COLUMN_KEYS:
+            value = getattr(snapshot, key)
+            if value != getattr(instance, key):
+                setattr(instance, key, value)
+
+    async def _apply_and_commit(self, instance: Instance, step: Callable[[Instance], None]) -> Instance:
+        try:
+            await self.apply(instance, step)
+        finally:
+            await self.commit()
+        return instance
+
+
+def handle_process_exit(instance_id: int, exit_code: int | None, state: str) -> None:
+    db = SessionLocal()
+    try:
+        instance = db.query(Instance).get(instance_id)
+        if instance is None:
+            return
+        instance.last_exit_code = exit_code
+        instance.status = state
+        if state == "crashed":
+            InstanceManager(db).clear_process(instance)
+        instance.updated_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+
+def restart_crashed_instance(instance_id: int) -> None:
+    db = SessionLocal()
+    try:
+        instance = db.query(Instance).get(instance_id)
+        if instance is None:
+            default_supervisor.expect_exit(instance_id)
+            return
+        manager = InstanceManager(db)
+        if instance.desired_status != "running":
+            manager.supervisor.expect_exit(instance_id)
+            return
+        manager.restart_crashed(instance)
+    finally:
+        db.close()
+
+
+def collect_storage() -> dict[str, int]:
+    db = SessionLocal()
+    try:
+        rows = db.query(Instance.path, Instance.release).all()
+    finally:
+        db.close()
+    releases = {release for _, release in rows if release is not None} | set(warm_pool.releases())
+    removed = {"releases": release_store.collect(releases)}
+    paths = [Path(path) for path, release in rows if release is None] + release_store.releases()
+    removed["dependencies"] = dependency_store.collect(paths)
+    return removed
+
+
+def stop_all_instances(deadline: float = SHUTDOWN_STOP_DEADLINE, record: bool = False) -> list[int]:
+    running = {
+        key: entry["pid"]
+        for key, entry in default_supervisor.snapshot().items()
+        if isinstance(key, int) and entry["state"] == "running"
+    }
+    for key in running:
+        default_supervisor.expect_exit(key)
+    remaining = ProcessManager().stop_many(list(running.values()), time.monotonic() + deadline)
+    if record and running:
+        _record_stopped(list(running))
+    return remaining
+
+
+def _record_stopped(instance_ids: list[int]) -> None:
+    db = SessionLocal()
+    try:
+        manager = InstanceManager(db)
+        for instance in db.query(Instance).filter(Instance.id.in_(instance_ids)):
+            manager.mark_stopped(instance)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _detached(instance: Instance) -> Instance:
+    return Instance(**{key: getattr(instance, key) for key in _COLUMN_KEYS})
+
+
+def _noop_report(phase: str, progress: int) -> None:
+    return None
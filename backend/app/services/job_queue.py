@@ -0,0 +1,183 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+import os
+from typing import Any, Callable
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models import Job
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+ACTIVE_JOB_STATUSES = ("queued", "running")
+
+ProgressCallback = Callable[[str, int], None]
+JobHandler = Callable[[Session, Job, ProgressCallback], int | None]
+
+
+class JobQueue:
+    def __init__(self, workers: int = JOB_WORKERS) -> None:
+        self.workers = workers
+        self._handlers: dict[str, JobHandler] = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    def start(self) -> None:
+        db = SessionLocal()
+        try:
+            interrupted = db.query(Job).filter(Job.status == "running").all()
+            for job in interrupted:
+                job.status = "failed"
+                job.error = "Interrupted by backend restart"
+                job.finished_at = datetime.utcnow()
+                job.updated_at = datetime.utcnow()
+            db.commit()
+            queued = [job.id for job in db.query(Job).filter(Job.status == "queued").order_by(Job.id)]
+        finally:
+            db.close()
+        for job_id in queued:
+            self._executor.submit(self._run, job_id)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(
+        self,
+        db: Session,
+        kind: str,
+        payload: dict[str, Any],
+        owner_id: int | None = None,
+        instance_id: int | None = None,
+        idempotency_key: str | None = None,
+    ) -> Job:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if idempotency_key:
+            existing = self.find_by_key(db, owner_id, kind, idempotency_key)
+            if existing:
+                return existing
+        job = Job(
+            kind=kind,
+            status="queued",
+            payload=json.dumps(payload),
+            owner_id=owner_id,
+            instance_id=instance_id,
+            idempotency_key=idempotency_key,
+            updated_at=datetime.utcnow(),
+        )
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            existing = self.find_by_key(db, owner_id, kind, idempotency_key)
+            if existing:
+                return existing
+            raise
+        db.refresh(job)
+        self._executor.submit(self._run, job.id)
+        return job
+
+    def submit_many(
+        self,
+        db: Session,
+        kind: str,
+        items: list[tuple[dict[str, Any], int | None]],
+        owner_id: int | None = None,
+    ) -> list[Job]:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        jobs = [
+            Job(
+                kind=kind,
+                status="queued",
+                payload=json.dumps(payload),
+                owner_id=owner_id,
+                instance_id=instance_id,
+                updated_at=datetime.utcnow(),
+            )
+            for payload, instance_id in items
+        ]
+        db.add_all(jobs)
+        db.commit()
+        for job in jobs:
+            self._executor.submit(self._run, job.id)
+        return jobs
+
+    def find_by_key(self, db: Session, owner_id: int | None, kind: str, idempotency_key: str) -> Job | None:
+        return (
+            db.query(Job)
+            .filter(Job.owner_id == owner_id, Job.kind == kind, Job.idempotency_key == idempotency_key)
+            .first()
+        )
+
+    def active_jobs(self, db: Session, kind: str) -> list[Job]:
+        return db.query(Job).filter(Job.kind == kind, Job.status.in_(ACTIVE_JOB_STATUSES)).all()
+
+    def _run(self, job_id: int) -> None:
+        db = SessionLocal()
+        try:
+            job = db.query(Job).get(job_id)
+            if job is None or job.status != "queued":
+                return
+            handler = self._handlers.get(job.kind)
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            job.updated_at = datetime.utcnow()
+            db.commit()
+            if handler is None:
+                self._finish(job_id, "failed", error=f"Unknown job kind: {job.kind}")
+                return
+            try:
+                instance_id = handler(db, job, lambda phase, progress: self._report(job_id, phase, progress))
+            except Exception as exc:
+                db.rollback()
+                self._finish(job_id, "failed", error=str(exc) or exc.__class__.__name__)
+                return
+            self._finish(job_id, "succeeded", instance_id=instance_id)
+        finally:
+            db.close()
+
+    def _report(self, job_id: int, phase: str, progress: int) -> None:
+        db = SessionLocal()
+        try:
+            job = db.query(Job).get(job_id)
+            if job is None:
+                return
+            job.phase = phase
+            job.progress = max(0, min(100, progress))
+            job.updated_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+    def _finish(
+        self,
+        job_id: int,
+        status: str,
+        error: str | None = None,
+        instance_id: int | None = None,
+    ) -> None:
+        db = SessionLocal()
+        try:
+            job = db.query(Job).get(job_id)
+            if job is None:
+                return
+            job.status = status
+            job.error = error
+            if status == "succeeded":
+                job.progress = 100
+            if instance_id is not None:
+                job.instance_id = instance_id
+            job.finished_at = datetime.utcnow()
+            job.updated_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+
+job_queue = JobQueue()
@@ -0,0 +1,212 @@
+from datetime import datetime
+from pathlib import Path
+import threading
+from typing import Callable, Hashable
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from ..database import SessionLocal
+from ..models import Instance
+from .event_bus import MAIN_AUDIENCE, event_bus
+from .file_watcher import file_watcher
+from .instance_files import QR_FILENAME, WA_INFO_FILENAME, file_cache, read_qr, read_wa_number
+from .supervisor import supervisor
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+WATCHED_FILES = {QR_FILENAME, WA_INFO_FILENAME}
+INSTANCE_DELTA_FIELDS = (
+    "status",
+    "desired_status",
+    "pid",
+    "version",
+    "port",
+    "restart_count",
+    "last_exit_code",
+    "last_started_at",
+    "hibernated_at",
+    "wake_at",
+    "pending_wakes",
+    "updated_at",
+)
+PENDING_KEY = "live_updates_pending"
+
+_last_values: dict[Path, str | None] = {}
+_last_values_lock = threading.Lock()
+
+
+def start_live_updates(db: Session) -> None:
+    if not event.contains(Instance, "after_update", _on_instance_update):
+        event.listen(Instance, "after_insert", _on_instance_insert)
+        event.listen(Instance, "after_update", _on_instance_update)
+        event.listen(Instance, "after_delete", _on_instance_delete)
+        event.listen(Session, "after_commit", _on_commit)
+        event.listen(Session, "after_rollback", _on_rollback)
+    for instance in db.query(Instance).all():
+        watch_instance_files(instance.id, instance.owner_id, Path(instance.path))
+    _remember(REPO_ROOT)
+    file_watcher.watch(REPO_ROOT, WATCHED_FILES, _on_main_file)
+    file_watcher.start()
+
+
+def stop_live_updates() -> None:
+    file_watcher.stop()
+
+
+def publish_main_status(running: bool, pid: int | None) -> None:
+    event_bus.publish("main_status", {"running": running, "pid": pid}, MAIN_AUDIENCE)
+
+
+def publish_instance_delta(instance_id: int, owner_id: int | None, values: dict) -> None:
+    delta = {
+        field: value.isoformat() if isinstance(value, datetime) else value
+        for field, value in values.items()
+        if field in INSTANCE_DELTA_FIELDS
+    }
+    if not delta:
+        return
+    delta["id"] = instance_id
+    delta["process_state"] = supervisor.state(instance_id)
+    event_bus.publish("instance", delta, owner_id)
+
+
+def publish_process_state(instance_id: int, owner_id: int | None) -> None:
+    event_bus.publish(
+        "instance",
+        {"id": instance_id, "process_state": supervisor.state(instance_id)},
+        owner_id,
+    )
+
+
+def publish_health(instance_id: int | None, owner_id: int | None, health: dict) -> None:
+    if instance_id is None:
+        event_bus.publish("main_status", {"health": health}, MAIN_AUDIENCE)
+    else:
+        event_bus.publish("instance", {"id": instance_id, "health": health}, owner_id)
+
+
+def publish_control_state(key: Hashable, changes: dict) -> None:
+    if not changes.keys() & {"qr", "wa_number", "connection", "connected"}:
+        return
+    if isinstance(key, int):
+        db = SessionLocal()
+        try:
+            row = db.query(Instance.owner_id, Instance.path).filter(Instance.id == key).first()
+        finally:
+            db.close()
+        if row is None:
+            return
+        directory, audience, qr_event, status_event = Path(row.path), row.owner_id, "qr", "instance"
+        ident = {"id": key}
+    else:
+        directory, audience, qr_event, status_event = REPO_ROOT, MAIN_AUDIENCE, "main_qr", "main_status"
+        ident = {}
+    if "qr" in changes and _changed(directory / QR_FILENAME, changes["qr"]):
+        event_bus.publish(qr_event, {**ident, "qr": changes["qr"]}, audience)
+    delta = {}
+    if "wa_number" in changes and _changed(directory / WA_INFO_FILENAME, changes["wa_number"]):
+        delta["wa_number"] = changes["wa_number"]
+    if "connection" in changes:
+        delta["connection"] = changes["connection"]
+    if changes.get("connected") is False:
+        delta["connection"] = None
+    if delta:
+        event_bus.publish(status_event, {**ident, **delta}, audience)
+
+
+def watch_instance_files(instance_id: int, owner_id: int | None, instance_path: Path) -> None:
+    def on_change(path: Path) -> None:
+        file_cache.invalidate(path)
+        if path.name == QR_FILENAME:
+            value = read_qr(path)
+            if _changed(path, value):
+                event_bus.publish("qr", {"id": instance_id, "qr": value}, owner_id)
+        else:
+            value = read_wa_number(instance_path)
+            if _changed(path, value):
+                event_bus.publish("instance", {"id": instance_id, "wa_number": value}, owner_id)
+
+    if instance_path.is_dir():
+        _remember(instance_path)
+        file_watcher.watch(instance_path, WATCHED_FILES, on_change)
+
+
+def _on_main_file(path: Path) -> None:
+    file_cache.invalidate(path)
+    if path.name == QR_FILENAME:
+        value = read_qr(path)
+        if _changed(path, value):
+            event_bus.publish("main_qr", {"qr": value}, MAIN_AUDIENCE)
+    else:
+        value = read_wa_number(REPO_ROOT)
+        if _changed(path, value):
+            event_bus.publish("main_status", {"wa_number": value}, MAIN_AUDIENCE)
+
+
+def _remember(directory: Path) -> None:
+    with _last_values_lock:
+        _last_values[directory / QR_FILENAME] = read_qr(directory / QR_FILENAME)
+        _last_values[directory / WA_INFO_FILENAME] = read_wa_number(directory)
+
+
+def _changed(path: Path, value: str | None) -> bool:
+    with _last_values_lock:
+        if path in _last_values and _last_values[path] == value:
+            return False
+        _last_values[path] = value
+        return True
+
+
+def _defer(instance: Instance, publish: Callable[[], None]) -> None:
+    session = object_session(instance)
+    if session is None:
+        publish()
+        return
+    session.info.setdefault(PENDING_KEY, []).append(publish)
+
+
+def _on_commit(session: Session) -> None:
+    for publish in session.info.pop(PENDING_KEY, []):
+        try:
+            publish()
+        except Exception:
+            continue
+
+
+def _on_rollback(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
+
+
+def _on_instance_insert(mapper, connection, instance: Instance) -> None:
+    instance_id, owner_id, instance_path = instance.id, instance.owner_id, Path(instance.path)
+
+    def publish() -> None:
+        watch_instance_files(instance_id, owner_id, instance_path)
+        event_bus.publish("instance_created", {"id": instance_id}, owner_id)
+
+    _defer(instance, publish)
+
+
+def _on_instance_update(mapper, connection, instance: Instance) -> None:
+    state = inspect(instance)
+    values = {
+        field: getattr(instance, field)
+        for field in INSTANCE_DELTA_FIELDS
+        if state.attrs[field].history.has_changes()
+    }
+    if values:
+        instance_id, owner_id = instance.id, instance.owner_id
+        _defer(instance, lambda: publish_instance_delta(instance_id, owner_id, values))
+
+
+def _on_instance_delete(mapper, connection, instance: Instance) -> None:
+    instance_id, owner_id, instance_path = instance.id, instance.owner_id, Path(instance.path)
+
+    def publish() -> None:
+        file_watcher.unwatch(instance_path)
+        with _last_values_lock:
+            for filename in WATCHED_FILES:
+                _last_values.pop(instance_path / filename, None)
+        event_bus.publish("instance_deleted", {"id": instance_id}, owner_id)
+
+    _defer(instance, publish)
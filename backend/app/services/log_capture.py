@@ -0,0 +1,247 @@
+import asyncio
+from collections import deque
+import os
+from pathlib import Path
+import selectors
+import subprocess
+import threading
+from typing import Hashable
+
+LOG_DIRNAME = "logs"
+LOG_FILENAME = "output.log"
+LOG_MAX_BYTES = int(os.environ.get("INSTANCE_LOG_MAX_BYTES", str(1024 * 1024)))
+LOG_BACKUPS = int(os.environ.get("INSTANCE_LOG_BACKUPS", "3"))
+LOG_TAIL_LINES = int(os.environ.get("INSTANCE_LOG_TAIL_LINES", "500"))
+LOG_MAX_LINE_BYTES = int(os.environ.get("INSTANCE_LOG_MAX_LINE_BYTES", "8192"))
+LOG_FOLLOW_QUEUE_SIZE = int(os.environ.get("INSTANCE_LOG_FOLLOW_QUEUE_SIZE", "1000"))
+READ_CHUNK = 64 * 1024
+
+
+class LogFollower:
+    def __init__(self, log: "InstanceLog", loop: asyncio.AbstractEventLoop) -> None:
+        self.log = log
+        self.loop = loop
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=LOG_FOLLOW_QUEUE_SIZE)
+        self.dropped = 0
+
+    def offer(self, lines: list[str]) -> None:
+        self.loop.call_soon_threadsafe(self._put, lines)
+
+    def _put(self, lines: list[str]) -> None:
+        for line in lines:
+            try:
+                self.queue.put_nowait(line)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    def close(self) -> None:
+        with self.log.lock:
+            self.log.followers.discard(self)
+
+
+class InstanceLog:
+    def __init__(self, log_dir: Path) -> None:
+        self.log_dir = log_dir
+        self.lines: deque[str] = deque(maxlen=LOG_TAIL_LINES)
+        self.followers: set[LogFollower] = set()
+        self.lock = threading.Lock()
+        self._partial = b""
+        self._file = None
+        self._size = 0
+        self._writers = 0
+
+    @property
+    def path(self) -> Path:
+        return self.log_dir / LOG_FILENAME
+
+    def open(self) -> None:
+        self._writers += 1
+        if self._file is None:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "ab")
+            self._size = self._file.tell()
+
+    def close(self) -> None:
+        self.feed(b"", final=True)
+        self._writers = max(self._writers - 1, 0)
+        if self._writers == 0 and self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def feed(self, data: bytes, final: bool = False) -> None:
+        if data:
+            self._write(data)
+        buffer = self._partial + data
+        chunks = buffer.split(b"\n")
+        self._partial = chunks.pop()
+        if len(self._partial) > LOG_MAX_LINE_BYTES or (final and self._partial):
+            chunks.append(self._partial)
+            self._partial = b""
+        if not chunks:
+            return
+        lines = [
+            chunk[:LOG_MAX_LINE_BYTES].rstrip(b"\r").decode("utf-8", "replace")
+            for chunk in chunks
+        ]
+        with self.lock:
+            self.lines.extend(lines)
+            followers = list(self.followers)
+        for follower in followers:
+            follower.offer(lines)
+
+    def _write(self, data: bytes) -> None:
+        if self._file is None:
+            return
+        if self._size + len(data) > LOG_MAX_BYTES and self._size > 0:
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for index in range(LOG_BACKUPS - 1, 0, -1):
+            source = self.log_dir / f"{LOG_FILENAME}.{index}"
+            if source.exists():
+                os.replace(source, self.log_dir / f"{LOG_FILENAME}.{index + 1}")
+        if LOG_BACKUPS > 0:
+            os.replace(self.path, self.log_dir / f"{LOG_FILENAME}.1")
+        else:
+            self.path.unlink(missing_ok=True)
+        self._file = open(self.path, "ab")
+        self._size = 0
+
+
+class LogCapture:
+    def __init__(self) -> None:
+        self._logs: dict[Hashable, InstanceLog] = {}
+        self._streams: dict[int, tuple[InstanceLog, object]] = {}
+        self._lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        self._pending: list[int] = []
+        self._thread: threading.Thread | None = None
+
+    def attach(self, key: Hashable, process: subprocess.Popen, log_dir: Path) -> None:
+        if process.stdout is None:
+            return
+        with self._lock:
+            log = self._log(key, log_dir)
+            stream = process.stdout
+            fd = stream.fileno()
+            os.set_blocking(fd, False)
+            self._streams[fd] = (log, stream)
+            self._pending.append(fd)
+            self._ensure_thread()
+        self._wake()
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._logs.pop(key, None)
+
+    def tail(self, key: Hashable, log_dir: Path, lines: int) -> list[str]:
+        lines = max(lines, 0)
+        with self._lock:
+            log = self._logs.get(key)
+        if log is not None:
+            with log.lock:
+                buffered = list(log.lines)
+            return buffered[-lines:] if lines else []
+        return _read_tail(log_dir / LOG_FILENAME, lines)
+
+    def follow(self, key: Hashable, log_dir: Path, lines: int) -> tuple[LogFollower, list[str]]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            log = self._log(key, log_dir)
+        follower = LogFollower(log, loop)
+        with log.lock:
+            log.followers.add(follower)
+            buffered = list(log.lines)
+        return follower, buffered[-lines:] if lines > 0 else []
+
+    def _log(self, key: Hashable, log_dir: Path) -> InstanceLog:
+        log = self._logs.get(key)
+        if log is None or log.log_dir != log_dir:
+            log = InstanceLog(log_dir)
+            log.lines.extend(_read_tail(log_dir / LOG_FILENAME, LOG_TAIL_LINES))
+            self._logs[key] = log
+        return log
+
+    def _ensure_thread(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="log-capture", daemon=True)
+        self._thread.start()
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wake_w, b"\0")
+        except BlockingIOError:
+            pass
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                pending = [(fd, self._streams[fd][0]) for fd in self._pending]
+                self._pending.clear()
+            for fd, log in pending:
+                try:
+                    log.open()
+                except OSError:
+                    pass
+                self._selector.register(fd, selectors.EVENT_READ)
+            for key, _ in self._selector.select():
+                fd = key.fd
+                if fd == self._wake_r:
+                    try:
+                        while os.read(self._wake_r, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                self._drain(fd)
+
+    def _drain(self, fd: int) -> None:
+        with self._lock:
+            log, stream = self._streams[fd]
+        try:
+            data = os.read(fd, READ_CHUNK)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if data:
+            log.feed(data)
+            return
+        self._selector.unregister(fd)
+        with self._lock:
+            self._streams.pop(fd, None)
+        log.close()
+        stream.close()
+
+
+def _read_tail(path: Path, lines: int) -> list[str]:
+    if lines <= 0:
+        return []
+    try:
+        with open(path, "rb") as handle:
+            handle.seek(0, os.SEEK_END)
+            position = handle.tell()
+            data = b""
+            while position > 0 and data.count(b"\n") <= lines:
+                step = min(READ_CHUNK, position)
+                position -= step
+                handle.seek(position)
+                data = handle.read(step) + data
+    except FileNotFoundError:
+        return []
+    return [
+        line[:LOG_MAX_LINE_BYTES].rstrip(b"\r").decode("utf-8", "replace")
+        for line in data.splitlines()[-lines:]
+    ]
+
+
+log_capture = LogCapture()
@@ -1,8 +1,12 @@
 import shutil
+import subprocess
 from pathlib import Path
 
 from ..database import DATA_DIR
+from .control_channel import control_hub
+from .live_updates import publish_main_status
 from .process_manager import ProcessManager
+from .supervisor import ProcessSupervisor, supervisor as default_supervisor
 
 REPO_ROOT = Path(__file__).resolve().parents[3]
 MAIN_PID_PATH = DATA_DIR / "main.pid"
@@ -12,17 +16,29 @@ MAIN_AUTH_DIR = REPO_ROOT / "auth_info"
 MAIN_QR_PATH = REPO_ROOT / "qr.txt"
 MAIN_WA_INFO_PATH = REPO_ROOT / "wa_info.json"
 MAIN_AUTH_FILE = REPO_ROOT / "auth_info.json"
+MAIN_SUPERVISOR_KEY = "main"
 
 
 class MainManager:
-    def __init__(self, process_manager: ProcessManager | None = None) -> None:
+    def __init__(
+        self,
+        process_manager: ProcessManager | None = None,
+        supervisor: ProcessSupervisor | None = None,
+    ) -> None:
         self.process_manager = process_manager or ProcessManager()
+        self.supervisor = supervisor or default_supervisor
 
     def status(self) -> dict[str, int | bool | None]:
-        pid = self._read_pid()
-        if pid and not self.process_manager.is_running(pid):
+        pid = self.supervisor.pid(MAIN_SUPERVISOR_KEY)
+        if pid:
+            return {"running": True, "pid": pid}
+        channel = control_hub.connected_state(MAIN_SUPERVISOR_KEY)
+        pid = channel.get("pid") if channel else self._read_pid()
+        if pid and not self._owns(pid):
             self._clear_pid()
             pid = None
+        if pid:
+            self._supervise(pid)
         return {"running": bool(pid), "pid": pid}
 
     def start(self) -> dict[str, int | bool | None]:
@@ -33,16 +49,23 @@ class MainManager:
             MAIN_COMMAND,
             cwd=REPO_ROOT,
             env_path=MAIN_ENV_PATH,
-            env_overrides={"BACKEND_DISABLED": "1"},
+            env_overrides={
+                "BACKEND_DISABLED": "1",
+                "CONTROL_SOCKET": str(control_hub.listen(MAIN_SUPERVISOR_KEY)),
+            },
         )
         self._write_pid(process.pid)
+        self._supervise(process.pid, process)
+        publish_main_status(True, process.pid)
         return {"running": True, "pid": process.pid}
 
     def stop(self) -> dict[str, int | bool | None]:
+        self.supervisor.expect_exit(MAIN_SUPERVISOR_KEY)
         pid = self._read_pid()
-        if pid:
+        if pid and self._owns(pid):
             self.process_manager.stop_process(pid)
         self._clear_pid()
+        publish_main_status(False, None)
         return {"running": False, "pid": None}
 
     def reset(self) -> dict[str, int | bool | None]:
@@ -54,6 +77,21 @@ class MainManager:
                 target.unlink()
         return self.start()
 
+    def _supervise(self, pid: int, process: subprocess.Popen | None = None) -> None:
+        self.supervisor.watch(
+            MAIN_SUPERVISOR_KEY,
+            pid,
+            process,
+            restart=False,
+            on_exit=lambda exit_code: publish_main_status(False, None),
+        )
+
+    def _owns(self, pid: int) -> bool:
+        if not self.process_manager.matches(pid, cwd=str(REPO_ROOT)):
+            return False
+        fingerprint = self.process_manager.fingerprint(pid)
+        return fingerprint is None or "--main" in fingerprint.cmdline.split()
+
     def _read_pid(self) -> int | None:
         if not MAIN_PID_PATH.exists():
             return None
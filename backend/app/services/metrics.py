@@ -0,0 +1,197 @@
+from array import array
+import os
+import threading
+import time
+from typing import Hashable
+
+from .supervisor import ProcessSupervisor, supervisor as default_supervisor
+
+METRICS_INTERVAL = float(os.environ.get("METRICS_INTERVAL", "5"))
+METRICS_HISTORY = int(os.environ.get("METRICS_HISTORY", "720"))
+METRICS_DOWNSAMPLE = int(os.environ.get("METRICS_DOWNSAMPLE", "12"))
+METRICS_COARSE_HISTORY = int(os.environ.get("METRICS_COARSE_HISTORY", "720"))
+METRIC_FIELDS = ("timestamp", "cpu_percent", "rss_bytes", "read_bytes_per_sec", "write_bytes_per_sec")
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class MetricRing:
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(capacity, 1)
+        self.columns = [array("d", bytes(8 * self.capacity)) for _ in METRIC_FIELDS]
+        self.head = 0
+        self.count = 0
+
+    def append(self, values: tuple[float, ...]) -> None:
+        for column, value in zip(self.columns, values):
+            column[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def export(self) -> dict[str, list[float]]:
+        start = (self.head - self.count) % self.capacity
+        result = {}
+        for name, column in zip(METRIC_FIELDS, self.columns):
+            if start + self.count <= self.capacity:
+                values = column[start : start + self.count]
+            else:
+                values = column[start:] + column[: self.head]
+            result[name] = values.tolist()
+        return result
+
+
+class MetricSeries:
+    def __init__(self) -> None:
+        self.fine = MetricRing(METRICS_HISTORY)
+        self.coarse = MetricRing(METRICS_COARSE_HISTORY)
+        self.current: tuple[float, ...] | None = None
+        self._sums = array("d", bytes(8 * len(METRIC_FIELDS)))
+        self._pending = 0
+
+    def add(self, values: tuple[float, ...]) -> None:
+        self.current = values
+        self.fine.append(values)
+        sums = self._sums
+        for index, value in enumerate(values):
+            sums[index] += value
+        self._pending += 1
+        if self._pending >= METRICS_DOWNSAMPLE:
+            averaged = [total / self._pending for total in sums]
+            averaged[0] = values[0]
+            self.coarse.append(tuple(averaged))
+            for index in range(len(sums)):
+                sums[index] = 0.0
+            self._pending = 0
+
+
+class MetricsSampler:
+    def __init__(
+        self,
+        interval: float = METRICS_INTERVAL,
+        process_supervisor: ProcessSupervisor | None = None,
+    ) -> None:
+        self.interval = interval
+        self.supervisor = process_supervisor or default_supervisor
+        self._series: dict[Hashable, MetricSeries] = {}
+        self._previous: dict[Hashable, tuple[int, int, float, float, float]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._last_pass = {"processes": 0, "duration_ms": 0.0, "per_process_us": 0.0}
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def current(self, key: Hashable) -> dict[str, float] | None:
+        with self._lock:
+            series = self._series.get(key)
+            if series is None or series.current is None or key not in self._previous:
+                return None
+            return dict(zip(METRIC_FIELDS, series.current))
+
+    def history(self, key: Hashable, resolution: str = "fine") -> dict:
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                return {name: [] for name in METRIC_FIELDS}
+            ring = series.coarse if resolution == "coarse" else series.fine
+            return ring.export()
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._series.pop(key, None)
+            self._previous.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "interval": self.interval,
+                "series": len(self._series),
+                "last_pass": dict(self._last_pass),
+            }
+
+    def sample(self) -> None:
+        started = time.perf_counter()
+        pids = {key: entry["pid"] for key, entry in self.supervisor.snapshot().items() if entry["state"] == "running"}
+        now = time.time()
+        readings = {}
+        for key, pid in pids.items():
+            reading = _read_process(pid)
+            if reading is not None:
+                readings[key] = reading
+        with self._lock:
+            for key in list(self._previous):
+                if key not in readings:
+                    del self._previous[key]
+            for key, (start_time, ticks, rss_pages, read_bytes, write_bytes) in readings.items():
+                previous = self._previous.get(key)
+                self._previous[key] = (start_time, ticks, now, read_bytes, write_bytes)
+                if previous is None or previous[0] != start_time or now <= previous[2]:
+                    continue
+                elapsed = now - previous[2]
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = MetricSeries()
+                series.add(
+                    (
+                        now,
+                        (ticks - previous[1]) / CLOCK_TICKS / elapsed * 100,
+                        float(rss_pages * PAGE_SIZE),
+                        max(read_bytes - previous[3], 0) / elapsed,
+                        max(write_bytes - previous[4], 0) / elapsed,
+                    )
+                )
+            duration = time.perf_counter() - started
+            self._last_pass = {
+                "processes": len(readings),
+                "duration_ms": round(duration * 1000, 3),
+                "per_process_us": round(duration * 1_000_000 / len(readings), 1) if readings else 0.0,
+            }
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception:
+                continue
+
+
+def _read_process(pid: int) -> tuple[int, int, int, float, float] | None:
+    base = f"/proc/{pid}/"
+    try:
+        stat = _read(base + "stat")
+        statm = _read(base + "statm")
+    except OSError:
+        return None
+    fields = stat[stat.rfind(b")") + 2 :].split()
+    if len(fields) < 20 or fields[0] in (b"Z", b"X"):
+        return None
+    read_bytes = write_bytes = 0.0
+    try:
+        for line in _read(base + "io").splitlines():
+            if line.startswith(b"read_bytes:"):
+                read_bytes = float(line[11:])
+            elif line.startswith(b"write_bytes:"):
+                write_bytes = float(line[12:])
+    except OSError:
+        pass
+    return int(fields[19]), int(fields[11]) + int(fields[12]), int(statm.split()[1]), read_bytes, write_bytes
+
+
+def _read(path: str) -> bytes:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, 4096)
+    finally:
+        os.close(fd)
+
+
+metrics_sampler = MetricsSampler()
@@ -0,0 +1,126 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import threading
+import time
+from typing import Hashable
+
+from passlib.hash import pbkdf2_sha256
+
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_ROUNDS = int(os.environ.get("PASSWORD_HASH_ROUNDS", str(pbkdf2_sha256.default_rounds)))
+LOGIN_USER_ATTEMPTS = int(os.environ.get("LOGIN_USER_ATTEMPTS", "5"))
+LOGIN_IP_ATTEMPTS = int(os.environ.get("LOGIN_IP_ATTEMPTS", "20"))
+LOGIN_WINDOW_SECONDS = float(os.environ.get("LOGIN_WINDOW_SECONDS", "60"))
+
+
+def _hash(password: str, rounds: int) -> str:
+    return pbkdf2_sha256.using(rounds=rounds).hash(password)
+
+
+def _verify(password: str, hashed_password: str, rounds: int) -> tuple[bool, str | None]:
+    try:
+        if not pbkdf2_sha256.verify(password, hashed_password):
+            return False, None
+    except ValueError:
+        return False, None
+    if pbkdf2_sha256.from_string(hashed_password).rounds != rounds:
+        return True, _hash(password, rounds)
+    return True, None
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, rounds: int = PASSWORD_HASH_ROUNDS) -> None:
+        self.workers = max(workers, 1)
+        self.rounds = rounds
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        self._pool()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def hash(self, password: str) -> str:
+        return await asyncio.get_running_loop().run_in_executor(self._pool(), _hash, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> tuple[bool, str | None]:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._pool(),
+            _verify,
+            password,
+            hashed_password,
+            self.rounds,
+        )
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+
+class LoginThrottle:
+    def __init__(
+        self,
+        user_attempts: int = LOGIN_USER_ATTEMPTS,
+        ip_attempts: int = LOGIN_IP_ATTEMPTS,
+        window: float = LOGIN_WINDOW_SECONDS,
+    ) -> None:
+        self.user_attempts = user_attempts
+        self.ip_attempts = ip_attempts
+        self.window = window
+        self._attempts: dict[Hashable, deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def check(self, username: str | None, ip: str | None) -> float | None:
+        now = time.monotonic()
+        with self._lock:
+            retry_after = None
+            for key, limit in self._keys(username, ip):
+                attempts = self._prune(key, now)
+                if limit > 0 and len(attempts) >= limit:
+                    wait = attempts[0] + self.window - now
+                    retry_after = max(retry_after or 0, wait)
+            return retry_after
+
+    def record_failure(self, username: str | None, ip: str | None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for key, _ in self._keys(username, ip):
+                self._attempts.setdefault(key, deque()).append(now)
+
+    def reset(self, username: str) -> None:
+        with self._lock:
+            self._attempts.pop(("user", username.lower()), None)
+
+    def _keys(self, username: str | None, ip: str | None) -> list[tuple[Hashable, int]]:
+        keys = []
+        if username:
+            keys.append((("user", username.lower()), self.user_attempts))
+        if ip:
+            keys.append((("ip", ip), self.ip_attempts))
+        return keys
+
+    def _prune(self, key: Hashable, now: float) -> deque[float]:
+        attempts = self._attempts.get(key)
+        if attempts is None:
+            return deque()
+        while attempts and now - attempts[0] > self.window:
+            attempts.popleft()
+        if not attempts:
+            self._attempts.pop(key, None)
+        return attempts
+
+
+password_hasher = PasswordHasher()
+login_throttle = LoginThrottle()
@@ -0,0 +1,93 @@
+from collections import deque
+import os
+import socket
+import threading
+
+from ..database import SessionLocal
+from ..models import Instance
+
+INSTANCE_PORT_MIN = int(os.environ.get("INSTANCE_PORT_MIN", "30000"))
+INSTANCE_PORT_MAX = int(os.environ.get("INSTANCE_PORT_MAX", "30999"))
+INSTANCE_PORT_HOST = os.environ.get("INSTANCE_PORT_HOST", "0.0.0.0")
+
+
+class PortAllocator:
+    def __init__(
+        self,
+        low: int = INSTANCE_PORT_MIN,
+        high: int = INSTANCE_PORT_MAX,
+        host: str = INSTANCE_PORT_HOST,
+    ) -> None:
+        self.low = low
+        self.high = max(high, low)
+        self.host = host
+        self._assigned = bytearray(self.high - self.low + 1)
+        self._free: deque[int] = deque(range(self.low, self.high + 1))
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        db = SessionLocal()
+        try:
+            ports = [port for (port,) in db.query(Instance.port).filter(Instance.port.isnot(None))]
+        finally:
+            db.close()
+        with self._lock:
+            self._assigned = bytearray(self.high - self.low + 1)
+            for port in ports:
+                if self._in_range(port):
+                    self._assigned[port - self.low] = 1
+            self._free = deque(port for port in range(self.low, self.high + 1) if not self._assigned[port - self.low])
+
+    def allocate(self) -> int:
+        with self._lock:
+            for _ in range(len(self._free)):
+                port = self._free.popleft()
+                if self._assigned[port - self.low]:
+                    continue
+                if not self._bindable(port):
+                    self._free.append(port)
+                    continue
+                self._assigned[port - self.low] = 1
+                return port
+        raise RuntimeError(f"No free port in {self.low}-{self.high}")
+
+    def reserve(self, port: int) -> None:
+        with self._lock:
+            if self._in_range(port) and self._assigned[port - self.low]:
+                raise ValueError(f"Port {port} is already assigned")
+            if not self._bindable(port):
+                raise ValueError(f"Port {port} is in use")
+            if self._in_range(port):
+                self._assigned[port - self.low] = 1
+
+    def release(self, port: int | None) -> None:
+        if port is None or not self._in_range(port):
+            return
+        with self._lock:
+            if self._assigned[port - self.low]:
+                self._assigned[port - self.low] = 0
+                self._free.append(port)
+
+    def stats(self) -> dict:
+        with self._lock:
+            assigned = sum(self._assigned)
+            return {
+                "range": [self.low, self.high],
+                "assigned": assigned,
+                "free": len(self._assigned) - assigned,
+            }
+
+    def _in_range(self, port: int) -> bool:
+        return self.low <= port <= self.high
+
+    def _bindable(self, port: int) -> bool:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+            probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                probe.bind((self.host, port))
+            except OSError:
+                return False
+        return True
+
+
+port_allocator = PortAllocator()
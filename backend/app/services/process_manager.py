@@ -1,6 +1,23 @@
+from dataclasses import dataclass
 import os
+import select
+import signal
 import subprocess
+import time
 from pathlib import Path
+from typing import Callable
+
+PROC_DIR = Path("/proc")
+STOP_GRACE_SECONDS = float(os.environ.get("INSTANCE_STOP_GRACE_SECONDS", "10"))
+STOP_POLL_INTERVAL = 0.05
+
+
+@dataclass(frozen=True)
+class ProcessFingerprint:
+    pid: int
+    start_time: int
+    cmdline: str
+    cwd: str
 
 
 class ProcessManager:
@@ -13,24 +30,168 @@ class ProcessManager:
         cwd: Path,
         env_path: Path,
         env_overrides: dict[str, str] | None = None,
+        capture_output: bool = False,
+        preexec_fn: Callable[[], None] | None = None,
     ) -> subprocess.Popen:
         env = os.environ.copy()
         env.update(self.base_env)
         env["ENV_PATH"] = str(env_path)
         env["INSTANCE_PATH"] = str(cwd)
         env["QR_PATH"] = str(cwd / "qr.txt")
+        env["AUTH_PATH"] = str(cwd / "auth_info")
+        env["WA_INFO_PATH"] = str(cwd / "wa_info.json")
+        env["HEARTBEAT_PATH"] = str(cwd / "heartbeat")
         if env_overrides:
             env.update(env_overrides)
-        process = subprocess.Popen(command, cwd=str(cwd), env=env)
+        stdout = subprocess.PIPE if capture_output else None
+        stderr = subprocess.STDOUT if capture_output else None
+        process = subprocess.Popen(
+            command,
+            cwd=str(cwd),
+            env=env,
+            stdout=stdout,
+            stderr=stderr,
+            start_new_session=True,
+            preexec_fn=preexec_fn,
+        )
         return process
 
-    def stop_process(self, pid: int) -> None:
+    def stop_process(self, pid: int, start_time: int | None = None, grace: float = STOP_GRACE_SECONDS) -> bool:
+        if start_time is not None and not self.is_running(pid, start_time):
+            return True
+        return not self.stop_many([pid], time.monotonic() + grace)
+
+    def stop_many(self, pids: list[int], deadline: float) -> list[int]:
+        groups = {pid: _own_group(pid) for pid in pids}
+        for pid, group in groups.items():
+            _signal(pid, group, signal.SIGTERM)
+        remaining = _wait_exit(list(groups), deadline)
+        for pid in remaining:
+            _signal(pid, groups[pid], signal.SIGKILL)
+        if remaining:
+            _wait_exit(remaining, time.monotonic() + 1)
+        for pid, group in groups.items():
+            if group and pid not in remaining:
+                _signal(pid, group, signal.SIGKILL)
+        return remaining
+
+    def is_running(self, pid: int, start_time: int | None = None) -> bool:
+        if start_time is not None and PROC_DIR.exists():
+            fingerprint = self.fingerprint(pid)
+            return fingerprint is not None and fingerprint.start_time == start_time
         try:
-            os.kill(pid, 15)
+            os.kill(pid, 0)
         except ProcessLookupError:
-            return
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def fingerprint(self, pid: int, settle_timeout: float = 0.0) -> ProcessFingerprint | None:
+        deadline = time.monotonic() + settle_timeout
+        fingerprint = self._read_fingerprint(pid)
+        while fingerprint is not None and not fingerprint.cmdline and time.monotonic() < deadline:
+            time.sleep(0.01)
+            fingerprint = self._read_fingerprint(pid)
+        return fingerprint
+
+    def _read_fingerprint(self, pid: int) -> ProcessFingerprint | None:
+        proc_path = PROC_DIR / str(pid)
+        try:
+            stat = (proc_path / "stat").read_text(encoding="utf-8")
+            cmdline = (proc_path / "cmdline").read_bytes()
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            return None
+        fields = stat[stat.rfind(")") + 2 :].split()
+        if len(fields) < 20 or fields[0] in ("Z", "X"):
+            return None
+        try:
+            cwd = os.readlink(proc_path / "cwd")
+        except OSError:
+            cwd = ""
+        return ProcessFingerprint(
+            pid=pid,
+            start_time=int(fields[19]),
+            cmdline=" ".join(part.decode("utf-8", "replace") for part in cmdline.split(b"\0") if part),
+            cwd=cwd,
+        )
+
+    def matches(
+        self,
+        pid: int,
+        start_time: int | None = None,
+        cmdline: str | None = None,
+        cwd: str | None = None,
+    ) -> bool:
+        if not PROC_DIR.exists():
+            return self.is_running(pid)
+        fingerprint = self.fingerprint(pid)
+        if fingerprint is None:
+            return False
+        if start_time is not None and fingerprint.start_time != start_time:
+            return False
+        if cmdline is not None and fingerprint.cmdline != cmdline:
+            return False
+        if cwd is not None and fingerprint.cwd and Path(fingerprint.cwd) != Path(cwd):
+            return False
+        return True
+
+
+def _own_group(pid: int) -> bool:
+    try:
+        return os.getpgid(pid) == pid
+    except ProcessLookupError:
+        return False
+
+
+def _signal(pid: int, group: bool, signum: int) -> None:
+    try:
+        if group:
+            os.killpg(pid, signum)
+        else:
+            os.kill(pid, signum)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _wait_exit(pids: list[int], deadline: float) -> list[int]:
+    poller = select.poll() if hasattr(os, "pidfd_open") else None
+    fds: dict[int, int] = {}
+    pending = set()
+    for pid in pids:
+        if poller is None:
+            pending.add(pid)
+            continue
+        try:
+            fd = os.pidfd_open(pid)
+        except ProcessLookupError:
+            continue
+        fds[fd] = pid
+        poller.register(fd, select.POLLIN)
+    try:
+        while fds or pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if poller is not None:
+                for fd, _ in poller.poll(remaining * 1000):
+                    poller.unregister(fd)
+                    os.close(fd)
+                    fds.pop(fd)
+            else:
+                pending = {pid for pid in pending if _alive(pid)}
+                if pending:
+                    time.sleep(min(STOP_POLL_INTERVAL, remaining))
+        return sorted([*fds.values(), *pending])
+    finally:
+        for fd in fds:
+            os.close(fd)
+
 
-    def is_running(self, pid: int) -> bool:
+def _alive(pid: int) -> bool:
+    try:
+        stat = (PROC_DIR / str(pid) / "stat").read_text(encoding="utf-8")
+    except OSError:
         try:
             os.kill(pid, 0)
         except ProcessLookupError:
@@ -38,3 +199,4 @@ class ProcessManager:
         except PermissionError:
             return True
         return True
+    return stat[stat.rfind(")") + 2 :][:1] not in ("Z", "X")
@@ -0,0 +1,217 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import os
+import random
+import threading
+import time
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models import Instance
+from .instance_manager import InstanceManager
+from .live_updates import publish_instance_delta
+
+RECONCILE_CONCURRENCY = int(os.environ.get("RECONCILE_CONCURRENCY", "4"))
+RECONCILE_START_RATE = float(os.environ.get("RECONCILE_START_RATE", "2"))
+RECONCILE_START_BURST = int(os.environ.get("RECONCILE_START_BURST", "4"))
+RECONCILE_JITTER_SECONDS = float(os.environ.get("RECONCILE_JITTER_SECONDS", "1.0"))
+
+DESIRED_RUNNING = Instance.desired_status == "running"
+_CLEARED = {"status": "stopped", "pid": None, "pid_start_time": None, "pid_cmdline": None, "pid_cwd": None}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = max(rate, 0.001)
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class StartupReconciler:
+    def __init__(
+        self,
+        concurrency: int = RECONCILE_CONCURRENCY,
+        start_rate: float = RECONCILE_START_RATE,
+        start_burst: int = RECONCILE_START_BURST,
+        jitter_seconds: float = RECONCILE_JITTER_SECONDS,
+    ) -> None:
+        self.concurrency = max(concurrency, 1)
+        self.start_rate = start_rate
+        self.start_burst = start_burst
+        self.jitter_seconds = jitter_seconds
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._progress = self._empty_progress("idle")
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._progress = self._empty_progress("pending")
+            self._thread = threading.Thread(target=self._run, name="reconciler", daemon=True)
+            self._thread.start()
+
+    def progress(self) -> dict:
+        with self._lock:
+            return {**self._progress, "errors": dict(self._progress["errors"])}
+
+    def _run(self) -> None:
+        try:
+            db = SessionLocal()
+            try:
+                rows = db.query(Instance.id, Instance.desired_status, Instance.status).all()
+            finally:
+                db.close()
+            desired = [row.id for row in rows if row.desired_status == "running"]
+            stale = [row.id for row in rows if row.desired_status != "running" and row.status == "running"]
+            with self._lock:
+                self._progress.update(
+                    state="running",
+                    total=len(desired),
+                    pending=len(desired),
+                    started_at=datetime.utcnow(),
+                )
+
+            bucket = TokenBucket(self.start_rate, self.start_burst)
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="reconcile") as executor:
+                list(executor.map(lambda instance_id: self._reconcile_one(bucket, instance_id), desired))
+            for instance_id in stale:
+                self._clear_stale(instance_id)
+        finally:
+            with self._lock:
+                self._progress.update(state="done", finished_at=datetime.utcnow())
+
+    def _reconcile_one(self, bucket: TokenBucket, instance_id: int) -> None:
+        db = SessionLocal()
+        manager = InstanceManager(db)
+        owner_id = observed_pid = pid = None
+        try:
+            instance = db.get(Instance, instance_id)
+            if instance is None or instance.desired_status != "running":
+                self._record(instance_id, "skipped")
+                return
+            owner_id, observed_pid = instance.owner_id, instance.pid
+            if manager.owns_process(instance):
+                manager.adopt(instance)
+                values = {"status": "running", "updated_at": datetime.utcnow()}
+                if instance.pid_start_time is None:
+                    values.update(manager.process_fields(observed_pid))
+                adopted = _write(db, instance_id, owner_id, observed_pid, values, DESIRED_RUNNING)
+                self._record(instance_id, "adopted" if adopted else "skipped")
+                return
+            bucket.acquire()
+            if self.jitter_seconds > 0:
+                time.sleep(random.uniform(0, self.jitter_seconds))
+            db.refresh(instance)
+            if (
+                instance.desired_status != "running"
+                or instance.pid != observed_pid
+                or manager.supervisor.pid(instance_id) is not None
+            ):
+                self._record(instance_id, "skipped")
+                return
+            pid = manager.launch(instance)
+            now = datetime.utcnow()
+            values = {"status": "running", "last_started_at": now, "updated_at": now}
+            values.update(manager.process_fields(pid))
+            if _write(db, instance_id, owner_id, observed_pid, values, DESIRED_RUNNING):
+                self._record(instance_id, "started")
+                return
+            self._discard(manager, instance_id, pid)
+            self._record(instance_id, "skipped")
+        except Exception as exc:
+            db.rollback()
+            if pid is not None:
+                self._discard(manager, instance_id, pid)
+            try:
+                values = {**_CLEARED, "updated_at": datetime.utcnow()}
+                _write(db, instance_id, owner_id, observed_pid, values, DESIRED_RUNNING)
+            except Exception:
+                db.rollback()
+            self._record(instance_id, "failed", str(exc))
+        finally:
+            db.close()
+
+    def _discard(self, manager: InstanceManager, instance_id: int, pid: int) -> None:
+        manager.supervisor.expect_exit(instance_id)
+        manager.process_manager.stop_process(pid)
+
+    def _clear_stale(self, instance_id: int) -> None:
+        db = SessionLocal()
+        try:
+            instance = db.get(Instance, instance_id)
+            if instance is None or InstanceManager(db).owns_process(instance):
+                return
+            values = {**_CLEARED, "updated_at": datetime.utcnow()}
+            _write(
+                db,
+                instance_id,
+                instance.owner_id,
+                instance.pid,
+                values,
+                Instance.desired_status != "running",
+                Instance.status == "running",
+            )
+        except Exception:
+            db.rollback()
+        finally:
+            db.close()
+
+    def _record(self, instance_id: int, outcome: str, error: str | None = None) -> None:
+        with self._lock:
+            self._progress[outcome] += 1
+            self._progress["pending"] -= 1
+            if error:
+                self._progress["errors"][instance_id] = error
+
+    def _empty_progress(self, state: str) -> dict:
+        return {
+            "state": state,
+            "total": 0,
+            "pending": 0,
+            "started": 0,
+            "adopted": 0,
+            "failed": 0,
+            "skipped": 0,
+            "errors": {},
+            "started_at": None,
+            "finished_at": None,
+        }
+
+
+def _write(
+    db: Session,
+    instance_id: int,
+    owner_id: int | None,
+    observed_pid: int | None,
+    values: dict,
+    *conditions,
+) -> bool:
+    pid_matches = Instance.pid.is_(None) if observed_pid is None else Instance.pid == observed_pid
+    result = db.execute(
+        update(Instance).where(Instance.id == instance_id, pid_matches, *conditions).values(**values)
+    )
+    db.commit()
+    if result.rowcount != 1:
+        return False
+    publish_instance_delta(instance_id, owner_id, values)
+    return True
+
+
+reconciler = StartupReconciler()
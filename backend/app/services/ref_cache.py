@@ -0,0 +1,126 @@
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable
+
+from .git_manager import list_remote_refs
+
+REF_CACHE_TTL = float(os.environ.get("REF_CACHE_TTL", "60"))
+REF_CACHE_STALE_TTL = float(os.environ.get("REF_CACHE_STALE_TTL", "3600"))
+REF_CACHE_WAIT_TIMEOUT = float(os.environ.get("REF_CACHE_WAIT_TIMEOUT", "30"))
+
+RefLoader = Callable[[str], tuple[list[str], list[str]]]
+
+
+@dataclass(frozen=True)
+class RefSnapshot:
+    branches: list[str]
+    tags: list[str]
+    etag: str
+    fetched_at: float
+
+
+class RefCache:
+    def __init__(
+        self,
+        loader: RefLoader = list_remote_refs,
+        ttl: float = REF_CACHE_TTL,
+        stale_ttl: float = REF_CACHE_STALE_TTL,
+        wait_timeout: float = REF_CACHE_WAIT_TIMEOUT,
+    ) -> None:
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.wait_timeout = wait_timeout
+        self._snapshots: dict[str, RefSnapshot] = {}
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._counters = {"fresh": 0, "stale": 0, "refreshes": 0, "coalesced": 0, "errors": 0}
+
+    def get(self, repo_url: str) -> RefSnapshot:
+        with self._lock:
+            snapshot = self._snapshots.get(repo_url)
+            age = time.monotonic() - snapshot.fetched_at if snapshot else None
+            if snapshot and age < self.ttl:
+                self._counters["fresh"] += 1
+                return snapshot
+            if snapshot and age < self.stale_ttl:
+                self._counters["stale"] += 1
+                future, owner = self._claim(repo_url)
+                if owner:
+                    threading.Thread(
+                        target=self._load,
+                        args=(repo_url, future),
+                        name="ref-refresh",
+                        daemon=True,
+                    ).start()
+                return snapshot
+            future, owner = self._claim(repo_url)
+        if owner:
+            self._load(repo_url, future)
+        try:
+            return future.result(timeout=self.wait_timeout)
+        except FutureTimeout as exc:
+            with self._lock:
+                snapshot = self._snapshots.get(repo_url)
+            if snapshot is None:
+                raise RuntimeError(f"Timed out listing refs: {repo_url}") from exc
+            return snapshot
+        except RuntimeError:
+            with self._lock:
+                snapshot = self._snapshots.get(repo_url)
+            if snapshot is None:
+                raise
+            return snapshot
+
+    def invalidate(self, repo_url: str) -> None:
+        with self._lock:
+            self._snapshots.pop(repo_url, None)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._counters, "entries": len(self._snapshots)}
+
+    def _claim(self, repo_url: str) -> tuple[Future, bool]:
+        future = self._inflight.get(repo_url)
+        if future is not None:
+            self._counters["coalesced"] += 1
+            return future, False
+        future = Future()
+        self._inflight[repo_url] = future
+        self._counters["refreshes"] += 1
+        return future, True
+
+    def _load(self, repo_url: str, future: Future) -> None:
+        try:
+            branches, tags = self.loader(repo_url)
+            payload = json.dumps({"branches": branches, "tags": tags}, sort_keys=True)
+            snapshot = RefSnapshot(
+                branches=branches,
+                tags=tags,
+                etag='"' + hashlib.sha1(payload.encode("utf-8")).hexdigest() + '"',
+                fetched_at=time.monotonic(),
+            )
+        except Exception as exc:
+            error = exc
+            if not isinstance(exc, RuntimeError):
+                error = RuntimeError(f"Failed to list refs: {repo_url}")
+                error.__cause__ = exc
+            with self._lock:
+                self._counters["errors"] += 1
+            future.set_exception(error)
+        else:
+            with self._lock:
+                self._snapshots[repo_url] = snapshot
+            future.set_result(snapshot)
+        finally:
+            with self._lock:
+                if self._inflight.get(repo_url) is future:
+                    del self._inflight[repo_url]
+
+
+ref_cache = RefCache()
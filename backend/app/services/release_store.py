@@ -0,0 +1,137 @@
+import os
+from pathlib import Path
+import shutil
+import stat
+import subprocess
+import threading
+import time
+import uuid
+from typing import Callable, Iterable
+
+from ..database import DATA_DIR
+from .dependency_store import dependency_store
+from .git_manager import clone_repo, resolve_commit, worktree_digest
+
+RELEASES_DIR = DATA_DIR / "releases"
+RELEASE_GC_GRACE = int(os.environ.get("RELEASE_GC_GRACE", "3600"))
+RELEASE_ENTRYPOINT = "index.js"
+WRITE_BITS = stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+
+
+class ReleaseStore:
+    def __init__(self, root: Path = RELEASES_DIR) -> None:
+        self.root = root
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._counters = {"hits": 0, "builds": 0, "collected": 0}
+
+    def path(self, key: str) -> Path:
+        return self.root / key
+
+    def resolve(self, repo_url: str, version: str | None = None) -> str:
+        sha = resolve_commit(repo_url, version)
+        digest = None if version else worktree_digest(repo_url)
+        return f"{sha}-{digest}" if digest else sha
+
+    def ensure(
+        self,
+        repo_url: str,
+        version: str | None = None,
+        report: Callable[[str, int], None] | None = None,
+    ) -> tuple[str, bool]:
+        key = self.resolve(repo_url, version)
+        release = self.path(key)
+        with self._lock_for(key):
+            built = not release.is_dir()
+            if built:
+                if report:
+                    report("release", 30)
+                self._build(repo_url, key, release)
+            os.utime(release)
+        self._count("builds" if built else "hits")
+        return key, built
+
+    def validate(self, key: str) -> None:
+        entrypoint = self.path(key) / RELEASE_ENTRYPOINT
+        if not entrypoint.is_file():
+            raise RuntimeError(f"Release {key} has no {RELEASE_ENTRYPOINT}")
+        result = subprocess.run(["node", "--check", str(entrypoint)], capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Release {key} failed validation: {result.stderr.strip()[-500:]}")
+
+    def collect(self, referenced: Iterable[str]) -> int:
+        if not self.root.exists():
+            return 0
+        referenced = set(referenced)
+        removed = 0
+        for release in self.root.iterdir():
+            if release.name in referenced or not _expired(release):
+                continue
+            with self._lock_for(release.name):
+                if not _expired(release):
+                    continue
+                _remove(release)
+            removed += 1
+        self._count("collected", removed)
+        return removed
+
+    def releases(self) -> list[Path]:
+        if not self.root.exists():
+            return []
+        return [release for release in self.root.iterdir() if not release.name.endswith(".tmp")]
+
+    def stats(self) -> dict:
+        return {"releases": len(self.releases()), **self._counters}
+
+    def _build(self, repo_url: str, key: str, release: Path) -> None:
+        sha, _, digest = key.partition("-")
+        staging = self.root / f"{key}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            clone_repo(repo_url, staging, None if digest else sha)
+            shutil.rmtree(staging / ".git")
+            dependency_store.provision(staging)
+            _make_read_only(staging)
+            os.rename(staging, release)
+        except (OSError, RuntimeError, ValueError):
+            _remove(staging)
+            raise
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[key] = lock
+            return lock
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._locks_guard:
+            self._counters[name] += amount
+
+
+def _make_read_only(root: Path) -> None:
+    for directory, dirnames, filenames in os.walk(root, topdown=False):
+        for name in [*filenames, *dirnames]:
+            path = os.path.join(directory, name)
+            if not os.path.islink(path):
+                os.chmod(path, os.stat(path).st_mode & ~WRITE_BITS)
+    os.chmod(root, os.stat(root).st_mode & ~WRITE_BITS)
+
+
+def _remove(root: Path) -> None:
+    if not root.exists():
+        return
+    for directory, dirnames, _ in os.walk(root):
+        os.chmod(directory, os.stat(directory).st_mode | stat.S_IWUSR)
+        dirnames[:] = [name for name in dirnames if not os.path.islink(os.path.join(directory, name))]
+    shutil.rmtree(root, ignore_errors=True)
+
+
+def _expired(release: Path) -> bool:
+    try:
+        return time.time() - release.stat().st_mtime >= RELEASE_GC_GRACE
+    except FileNotFoundError:
+        return False
+
+
+release_store = ReleaseStore()
@@ -0,0 +1,317 @@
+import ctypes
+from dataclasses import dataclass, fields
+from functools import partial
+import logging
+import os
+from pathlib import Path
+import platform
+import resource
+from typing import Callable
+
+CGROUP_MOUNT = Path("/sys/fs/cgroup")
+INSTANCE_CGROUP_ROOT = os.environ.get("INSTANCE_CGROUP_ROOT", "")
+CGROUP_CONTROLLERS = ("memory", "cpu", "pids")
+BACKEND_LEAF_CGROUP = "backend"
+RLIMIT_CPU_WINDOW_SECONDS = int(os.environ.get("RLIMIT_CPU_WINDOW_SECONDS", "3600"))
+CPU_PERIOD_US = 100_000
+NODE_HEAP_RATIO = 0.75
+
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_BE = 2
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_SYSCALLS = {"x86_64": 251, "aarch64": 30, "armv7l": 314, "i686": 289}
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ResourceLimits:
+    memory_max_mb: int | None = None
+    cpu_weight: int | None = None
+    cpu_quota_percent: int | None = None
+    pids_max: int | None = None
+    nice: int | None = None
+    ionice_level: int | None = None
+
+    @classmethod
+    def from_instance(cls, instance) -> "ResourceLimits":
+        return cls(**{field.name: getattr(instance, field.name, None) for field in fields(cls)})
+
+    @property
+    def needs_cgroup(self) -> bool:
+        return any(
+            value is not None
+            for value in (self.memory_max_mb, self.cpu_weight, self.cpu_quota_percent, self.pids_max)
+        )
+
+
+LIMIT_FIELDS = tuple(field.name for field in fields(ResourceLimits))
+
+
+class ResourceLimiter:
+    def __init__(self, root: str = INSTANCE_CGROUP_ROOT) -> None:
+        self.delegated = bool(root)
+        self.root = Path(root) if root else _own_cgroup()
+        self.fallback_reason: str | None = "cgroup setup has not run"
+        self._available = False
+        self._ioprio_set = _load_ioprio_set()
+
+    @property
+    def mode(self) -> str:
+        return "cgroup" if self._available else "rlimit"
+
+    def available(self) -> bool:
+        return self._available
+
+    def setup(self) -> None:
+        self.fallback_reason = self._enable_controllers()
+        self._available = self.fallback_reason is None
+        if not self._available:
+            logger.warning(
+                "Per-instance cgroup limits unavailable under %s (%s); falling back to "
+                "--max-old-space-size, RLIMIT_NPROC and RLIMIT_CPU",
+                self.root,
+                self.fallback_reason,
+            )
+
+    def spawn_env(self, limits: ResourceLimits) -> dict[str, str]:
+        if limits.memory_max_mb is None or self._available:
+            return {}
+        heap_mb = max(int(limits.memory_max_mb * NODE_HEAP_RATIO), 16)
+        node_options = os.environ.get("NODE_OPTIONS", "")
+        return {"NODE_OPTIONS": f"{node_options} --max-old-space-size={heap_mb}".strip()}
+
+    def spawn_hook(self, key, limits: ResourceLimits) -> Callable[[], None] | None:
+        procs_path = None
+        if limits.needs_cgroup and self._available:
+            group = self._group(key)
+            try:
+                group.mkdir(exist_ok=True)
+                self._write_limits(group, limits)
+                procs_path = str(group / "cgroup.procs")
+            except OSError as exc:
+                logger.warning("Could not prepare %s: %s", group, exc)
+        rlimits = self._rlimits(limits) if limits.needs_cgroup and not self._available else []
+        ioprio = None
+        if limits.ionice_level is not None and self._ioprio_set is not None:
+            ioprio = (IOPRIO_CLASS_BE << IOPRIO_CLASS_SHIFT) | limits.ionice_level
+        if procs_path is None and not rlimits and limits.nice is None and ioprio is None:
+            return None
+        return partial(_enter_limits, procs_path, rlimits, limits.nice, self._ioprio_set, ioprio)
+
+    def confirm(self, key, pid: int, limits: ResourceLimits) -> None:
+        if not (limits.needs_cgroup and self._available):
+            return
+        group = self._group(key)
+        try:
+            if str(pid) in _read_procs(group):
+                return
+            (group / "cgroup.procs").write_text(str(pid))
+            logger.warning("Placed pid %s in %s after exec", pid, group)
+        except OSError as exc:
+            logger.warning("Could not place pid %s in %s: %s", pid, group, exc)
+
+    def update(self, key, pid: int | None, limits: ResourceLimits) -> None:
+        group = self._group(key)
+        if self._available and group.is_dir():
+            try:
+                self._write_limits(group, limits)
+            except OSError:
+                pass
+        elif not self._available and pid is not None:
+            self._apply_rlimits(pid, limits)
+        if pid is None:
+            return
+        if limits.nice is not None:
+            try:
+                os.setpriority(os.PRIO_PROCESS, pid, limits.nice)
+            except OSError:
+                pass
+        if limits.ionice_level is not None and self._ioprio_set is not None:
+            value = (IOPRIO_CLASS_BE << IOPRIO_CLASS_SHIFT) | limits.ionice_level
+            self._ioprio_set(IOPRIO_WHO_PROCESS, pid, value)
+
+    def remove(self, key) -> None:
+        if not self._available:
+            return
+        try:
+            self._group(key).rmdir()
+        except OSError:
+            pass
+
+    def counters(self, key) -> dict | None:
+        if not self._available:
+            return None
+        group = self._group(key)
+        if not group.is_dir():
+            return None
+        memory = _read_flat(group / "memory.events")
+        cpu = _read_flat(group / "cpu.stat")
+        pids = _read_flat(group / "pids.events")
+        return {
+            "memory_current": _read_int(group / "memory.current"),
+            "oom": memory.get("oom", 0),
+            "oom_kill": memory.get("oom_kill", 0),
+            "memory_high_events": memory.get("high", 0),
+            "memory_max_events": memory.get("max", 0),
+            "nr_throttled": cpu.get("nr_throttled", 0),
+            "throttled_usec": cpu.get("throttled_usec", 0),
+            "pids_current": _read_int(group / "pids.current"),
+            "pids_max_events": pids.get("max", 0),
+        }
+
+    def _group(self, key) -> Path:
+        return self.root / f"instance-{key}"
+
+    def _write_limits(self, group: Path, limits: ResourceLimits) -> None:
+        memory = "max" if limits.memory_max_mb is None else str(limits.memory_max_mb * 1024 * 1024)
+        quota = "max" if limits.cpu_quota_percent is None else str(limits.cpu_quota_percent * CPU_PERIOD_US // 100)
+        (group / "memory.max").write_text(memory)
+        (group / "cpu.max").write_text(f"{quota} {CPU_PERIOD_US}")
+        (group / "cpu.weight").write_text(str(limits.cpu_weight or 100))
+        (group / "pids.max").write_text("max" if limits.pids_max is None else str(limits.pids_max))
+
+    def _apply_rlimits(self, pid: int, limits: ResourceLimits) -> None:
+        for name, value in self._rlimits(limits):
+            try:
+                resource.prlimit(pid, name, value)
+            except (OSError, ValueError) as exc:
+                logger.warning("Could not set rlimit %s on pid %s: %s", name, pid, exc)
+
+    def _rlimits(self, limits: ResourceLimits) -> list[tuple[int, tuple[int, int]]]:
+        nproc = None if limits.pids_max is None else _user_tasks(os.getuid()) + limits.pids_max
+        cpu = None
+        if limits.cpu_quota_percent is not None:
+            cpu = max(limits.cpu_quota_percent * RLIMIT_CPU_WINDOW_SECONDS // 100, 1)
+        values = []
+        for name, soft in ((resource.RLIMIT_NPROC, nproc), (resource.RLIMIT_CPU, cpu)):
+            _, hard = resource.getrlimit(name)
+            if soft is None:
+                soft = hard
+            elif hard != resource.RLIM_INFINITY:
+                soft = min(soft, hard)
+            values.append((name, (soft, hard)))
+        return values
+
+    def _enable_controllers(self) -> str | None:
+        controllers_path = self.root / "cgroup.controllers"
+        try:
+            available = set(controllers_path.read_text().split())
+        except OSError:
+            return "cgroup v2 is not mounted there"
+        if not set(CGROUP_CONTROLLERS) <= available:
+            return f"controllers {' '.join(sorted(set(CGROUP_CONTROLLERS) - available))} are not delegated"
+        try:
+            if _read_procs(self.root):
+                if self.delegated:
+                    return "INSTANCE_CGROUP_ROOT still contains processes"
+                self._move_to_leaf()
+            enabled = set((self.root / "cgroup.subtree_control").read_text().split())
+            missing = [name for name in CGROUP_CONTROLLERS if name not in enabled]
+            if missing:
+                (self.root / "cgroup.subtree_control").write_text(" ".join(f"+{name}" for name in missing))
+        except OSError as exc:
+            return f"cannot enable controllers: {exc}"
+        return None
+
+    def _move_to_leaf(self) -> None:
+        leaf = self.root / BACKEND_LEAF_CGROUP
+        leaf.mkdir(exist_ok=True)
+        for pid in _read_procs(self.root):
+            try:
+                (leaf / "cgroup.procs").write_text(pid)
+            except ProcessLookupError:
+                continue
+
+
+def _enter_limits(
+    procs_path: str | None,
+    rlimits: list[tuple[int, tuple[int, int]]],
+    nice: int | None,
+    ioprio_set,
+    ioprio: int | None,
+) -> None:
+    # Runs in the forked child before exec, so keep it to plain syscalls.
+    if procs_path is not None:
+        try:
+            fd = os.open(procs_path, os.O_WRONLY)
+            try:
+                os.write(fd, b"0")
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+    for name, value in rlimits:
+        try:
+            resource.setrlimit(name, value)
+        except (OSError, ValueError):
+            pass
+    if nice is not None:
+        try:
+            os.setpriority(os.PRIO_PROCESS, 0, nice)
+        except OSError:
+            pass
+    if ioprio is not None:
+        ioprio_set(IOPRIO_WHO_PROCESS, 0, ioprio)
+
+
+def _own_cgroup() -> Path:
+    try:
+        for line in Path("/proc/self/cgroup").read_text().splitlines():
+            if line.startswith("0::"):
+                return CGROUP_MOUNT / line[3:].lstrip("/")
+    except OSError:
+        pass
+    return CGROUP_MOUNT
+
+
+def _read_procs(group: Path) -> list[str]:
+    return (group / "cgroup.procs").read_text().split()
+
+
+def _user_tasks(uid: int) -> int:
+    tasks = 0
+    for status_path in Path("/proc").glob("[0-9]*/status"):
+        try:
+            lines = status_path.read_text().splitlines()
+        except OSError:
+            continue
+        status = dict(line.split(":\t", 1) for line in lines if ":\t" in line)
+        if status.get("Uid", "").split()[:1] == [str(uid)]:
+            tasks += int(status.get("Threads", "1"))
+    return tasks
+
+
+def _load_ioprio_set():
+    number = IOPRIO_SYSCALLS.get(platform.machine())
+    if number is None:
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+    except OSError:
+        return None
+    return lambda which, who, value: libc.syscall(number, which, who, value)
+
+
+def _read_flat(path: Path) -> dict[str, int]:
+    try:
+        lines = path.read_text().splitlines()
+    except OSError:
+        return {}
+    values = {}
+    for line in lines:
+        name, _, value = line.partition(" ")
+        if value.strip().isdigit():
+            values[name] = int(value)
+    return values
+
+
+def _read_int(path: Path) -> int | None:
+    try:
+        value = path.read_text().strip()
+    except OSError:
+        return None
+    return int(value) if value.isdigit() else None
+
+
+resource_limiter = ResourceLimiter()
@@ -0,0 +1,279 @@
+from collections import deque
+from dataclasses import dataclass, field
+import os
+import select
+import subprocess
+import threading
+import time
+from typing import Callable, Hashable
+
+SUPERVISOR_BACKOFF_BASE = float(os.environ.get("SUPERVISOR_BACKOFF_BASE", "1"))
+SUPERVISOR_BACKOFF_MAX = float(os.environ.get("SUPERVISOR_BACKOFF_MAX", "60"))
+SUPERVISOR_CRASH_LIMIT = int(os.environ.get("SUPERVISOR_CRASH_LIMIT", "5"))
+SUPERVISOR_CRASH_WINDOW = float(os.environ.get("SUPERVISOR_CRASH_WINDOW", "300"))
+SUPERVISOR_POLL_INTERVAL = 1.0
+
+ExitHandler = Callable[[Hashable, int | None, str], None]
+RestartHandler = Callable[[Hashable], None]
+
+
+@dataclass(eq=False)
+class SupervisedProcess:
+    key: Hashable
+    pid: int
+    popen: subprocess.Popen | None = None
+    pidfd: int | None = None
+    restart: bool = True
+    state: str = "running"
+    exit_code: int | None = None
+    stopping: bool = False
+    on_exit: Callable[[int | None], None] | None = None
+    started_at: float = field(default_factory=time.monotonic)
+
+
+class ProcessSupervisor:
+    def __init__(
+        self,
+        backoff_base: float = SUPERVISOR_BACKOFF_BASE,
+        backoff_max: float = SUPERVISOR_BACKOFF_MAX,
+        crash_limit: int = SUPERVISOR_CRASH_LIMIT,
+        crash_window: float = SUPERVISOR_CRASH_WINDOW,
+    ) -> None:
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.crash_limit = crash_limit
+        self.crash_window = crash_window
+        self.exit_handler: ExitHandler | None = None
+        self.restart_handler: RestartHandler | None = None
+        self._entries: dict[Hashable, SupervisedProcess] = {}
+        self._crashes: dict[Hashable, deque[float]] = {}
+        self._exited_at: dict[Hashable, float] = {}
+        self._restart_ms: dict[Hashable, float] = {}
+        self._lock = threading.RLock()
+        self._exited = threading.Condition(self._lock)
+        self._use_pidfd = hasattr(os, "pidfd_open")
+        self._live: set[SupervisedProcess] = set()
+        self._pending_fds: list[int] = []
+        self._fd_entries: dict[int, SupervisedProcess] = {}
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(
+        self,
+        exit_handler: ExitHandler | None = None,
+        restart_handler: RestartHandler | None = None,
+    ) -> None:
+        self.exit_handler = exit_handler
+        self.restart_handler = restart_handler
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="supervisor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake()
+
+    def watch(
+        self,
+        key: Hashable,
+        pid: int,
+        popen: subprocess.Popen | None = None,
+        restart: bool = True,
+        on_exit: Callable[[int | None], None] | None = None,
+    ) -> None:
+        entry = SupervisedProcess(key=key, pid=pid, popen=popen, restart=restart, on_exit=on_exit)
+        if self._use_pidfd:
+            try:
+                entry.pidfd = os.pidfd_open(pid)
+            except ProcessLookupError:
+                entry.pidfd = None
+            except OSError:
+                self._use_pidfd = False
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous and previous.pid != pid:
+                previous.stopping = True
+            exited_at = self._exited_at.pop(key, None)
+            if exited_at is not None:
+                self._restart_ms[key] = round((entry.started_at - exited_at) * 1000, 1)
+            self._entries[key] = entry
+            self._live.add(entry)
+            if entry.pidfd is not None:
+                self._fd_entries[entry.pidfd] = entry
+                self._pending_fds.append(entry.pidfd)
+        if self._use_pidfd and entry.pidfd is None:
+            self._handle_exit(entry)
+            return
+        self._wake()
+
+    def expect_exit(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.stopping = True
+            if entry.state != "running":
+                self._entries.pop(key, None)
+
+    def wait_exit(self, key: Hashable, timeout: float) -> bool:
+        with self._exited:
+            return self._exited.wait_for(
+                lambda: not any(entry.key == key for entry in self._live),
+                timeout,
+            )
+
+    def enable_restart(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.restart = True
+
+    def reset(self, key: Hashable) -> None:
+        with self._lock:
+            self._crashes.pop(key, None)
+            entry = self._entries.get(key)
+            if entry and entry.state != "running":
+                self._entries.pop(key, None)
+
+    def state(self, key: Hashable) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.state if entry else None
+
+    def pid(self, key: Hashable) -> int | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.state != "running":
+                return None
+            return entry.pid
+
+    def restart_ms(self, key: Hashable) -> float | None:
+        with self._lock:
+            return self._restart_ms.get(key)
+
+    def forget(self, key: Hashable) -> None:
+        with self._lock:
+            self._exited_at.pop(key, None)
+            self._restart_ms.pop(key, None)
+
+    def snapshot(self) -> dict[Hashable, dict]:
+        with self._lock:
+            return {
+                key: {
+                    "pid": entry.pid,
+                    "state": entry.state,
+                    "exit_code": entry.exit_code,
+                    "recent_crashes": len(self._crashes.get(key, ())),
+                    "restart_ms": self._restart_ms.get(key),
+                }
+                for key, entry in self._entries.items()
+            }
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wake_w, b"\0")
+        except BlockingIOError:
+            pass
+
+    def _run(self) -> None:
+        poller = select.poll()
+        poller.register(self._wake_r, select.POLLIN)
+        while not self._stop.is_set():
+            with self._lock:
+                for fd in self._pending_fds:
+                    poller.register(fd, select.POLLIN)
+                self._pending_fds.clear()
+            timeout = None if self._use_pidfd else SUPERVISOR_POLL_INTERVAL * 1000
+            for fd, _ in poller.poll(timeout):
+                if fd == self._wake_r:
+                    try:
+                        while os.read(self._wake_r, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                poller.unregister(fd)
+                with self._lock:
+                    entry = self._fd_entries.pop(fd, None)
+                os.close(fd)
+                if entry is not None:
+                    self._handle_exit(entry)
+            if not self._use_pidfd:
+                self._poll_entries()
+
+    def _poll_entries(self) -> None:
+        with self._lock:
+            entries = list(self._live)
+        for entry in entries:
+            if entry.popen is not None:
+                exited = entry.popen.poll() is not None
+            else:
+                try:
+                    os.kill(entry.pid, 0)
+                    exited = False
+                except ProcessLookupError:
+                    exited = True
+                except PermissionError:
+                    exited = False
+            if exited:
+                self._handle_exit(entry)
+
+    def _handle_exit(self, entry: SupervisedProcess) -> None:
+        exited_at = time.monotonic()
+        exit_code = entry.popen.poll() if entry.popen is not None else None
+        with self._lock:
+            self._live.discard(entry)
+            self._exited.notify_all()
+            if self._entries.get(entry.key) is not entry:
+                return
+            self._exited_at[entry.key] = exited_at
+            entry.exit_code = exit_code
+            crashed = entry.restart and not entry.stopping
+            if not crashed:
+                self._entries.pop(entry.key, None)
+        if entry.on_exit:
+            entry.on_exit(exit_code)
+        if crashed:
+            self._handle_crash(entry, exit_code)
+
+    def _handle_crash(self, entry: SupervisedProcess, exit_code: int | None) -> None:
+        with self._lock:
+            now = time.monotonic()
+            crashes = self._crashes.setdefault(entry.key, deque())
+            crashes.append(now)
+            while crashes and now - crashes[0] > self.crash_window:
+                crashes.popleft()
+            if len(crashes) >= self.crash_limit:
+                entry.state = "crashed"
+                delay = None
+            else:
+                entry.state = "backoff"
+                delay = min(self.backoff_base * (2 ** (len(crashes) - 1)), self.backoff_max)
+        if self.exit_handler:
+            self.exit_handler(entry.key, exit_code, "crashed" if delay is None else "restarting")
+        if delay is not None:
+            timer = threading.Timer(delay, self._restart, args=(entry,))
+            timer.daemon = True
+            timer.start()
+
+    def _restart(self, entry: SupervisedProcess) -> None:
+        with self._lock:
+            if self._entries.get(entry.key) is not entry or entry.stopping:
+                return
+        if self.restart_handler is None:
+            return
+        try:
+            self.restart_handler(entry.key)
+        except Exception:
+            with self._lock:
+                if self._entries.get(entry.key) is entry:
+                    entry.state = "crashed"
+            if self.exit_handler:
+                self.exit_handler(entry.key, entry.exit_code, "crashed")
+
+
+supervisor = ProcessSupervisor()
@@ -0,0 +1,110 @@
+from collections import deque
+import os
+import statistics
+import threading
+
+from .release_store import release_store
+
+WARM_POOL_ENABLED = os.environ.get("WARM_POOL_ENABLED", "0") == "1"
+WARM_POOL_VERSIONS = [version.strip() for version in os.environ.get("WARM_POOL_VERSIONS", "").split(",")]
+WARM_POOL_INTERVAL = int(os.environ.get("WARM_POOL_INTERVAL", "60"))
+CREATE_LATENCY_SAMPLES = 500
+DEFAULT_SLOT_KEY = "default"
+
+
+class WarmPool:
+    def __init__(
+        self,
+        enabled: bool = WARM_POOL_ENABLED,
+        versions: list[str] | None = None,
+        interval: int = WARM_POOL_INTERVAL,
+    ) -> None:
+        self.enabled = enabled
+        self.versions = [version or None for version in (versions if versions is not None else WARM_POOL_VERSIONS)]
+        self.interval = interval
+        self.repo_url: str | None = None
+        self._ready: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._counters = {"hits": 0, "misses": 0, "provisioned": 0, "failures": 0}
+        self._latencies = {True: deque(maxlen=CREATE_LATENCY_SAMPLES), False: deque(maxlen=CREATE_LATENCY_SAMPLES)}
+
+    def start(self, repo_url: str) -> None:
+        self.repo_url = repo_url
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="warm-pool", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def record_create(self, seconds: float, warm: bool) -> None:
+        with self._lock:
+            self._latencies[warm].append(seconds)
+            self._counters["hits" if warm else "misses"] += 1
+        if not warm:
+            self._wake.set()
+
+    def releases(self) -> list[str]:
+        with self._lock:
+            return list(self._ready.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "versions": [version or DEFAULT_SLOT_KEY for version in self.versions],
+                "ready": dict(self._ready),
+                **self._counters,
+                "create_seconds": {
+                    "warm": _summarize(self._latencies[True]),
+                    "cold": _summarize(self._latencies[False]),
+                },
+            }
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            for version in self.versions:
+                if self._stop.is_set():
+                    return
+                self._refill(version)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _refill(self, version: str | None) -> None:
+        try:
+            key, built = release_store.ensure(self.repo_url, version)
+        except (OSError, RuntimeError, ValueError):
+            with self._lock:
+                self._counters["failures"] += 1
+            return
+        with self._lock:
+            self._ready[_slot_key(version)] = key
+            if built:
+                self._counters["provisioned"] += 1
+
+
+def _slot_key(version: str | None) -> str:
+    if not version:
+        return DEFAULT_SLOT_KEY
+    return "".join(char if char.isalnum() or char in "._" else "_" for char in version)
+
+
+def _summarize(samples: deque) -> dict | None:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50": round(statistics.median(ordered), 3),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+warm_pool = WarmPool()
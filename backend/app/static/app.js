@@ -14,17 +14,33 @@ const mainQrRefresh = document.getElementById("main-qr-refresh");
 const mainStatusPill = document.getElementById("main-status-pill");
 const mainPidEl = document.getElementById("main-pid");
 const mainNumberEl = document.getElementById("main-number");
+const mainHealthEl = document.getElementById("main-health");
 const mainStartBtn = document.getElementById("main-start");
 const mainStopBtn = document.getElementById("main-stop");
 const mainResetBtn = document.getElementById("main-reset");
+const bulkSelectAll = document.getElementById("bulk-select-all");
+const bulkCountEl = document.getElementById("bulk-count");
+const bulkActionSelect = document.getElementById("bulk-action");
+const bulkVersionSelect = document.getElementById("bulk-version");
+const bulkApplyBtn = document.getElementById("bulk-apply");
 
 const QR_REFRESH_MS = 2500;
+const JOB_POLL_MS = 1000;
+const EVENTS_RETRY_MS = 3000;
 const DEFAULT_REPO_URL = "https://github.com/miangeldev/TestiBot.git";
 const MAIN_USERNAME = "miangeldev";
 const openQrPanels = new Set();
 const qrPollers = new Map();
+const qrValues = new Map();
+const instancesById = new Map();
+const selectedIds = new Set();
 let mainQrPoller = null;
 let mainRunning = false;
+let eventSource = null;
+let eventsConnecting = false;
+let eventsRetryTimer = null;
+let lastEventId = null;
+let liveUpdates = false;
 let authToken = localStorage.getItem("access_token");
 let currentUser = null;
 let branchesCache = [];
@@ -76,12 +92,49 @@ async function apiRequest(path, options = {}) {
   return response.json();
 }
 
+function newIdempotencyKey() {
+  if (window.crypto && typeof window.crypto.randomUUID === "function") {
+    return window.crypto.randomUUID();
+  }
+  return `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+}
+
+async function waitForJob(job, label) {
+  let current = job;
+  while (current && (current.status === "queued" || current.status === "running")) {
+    const phase = current.phase ? ` (${current.phase}, ${current.progress}%)` : "";
+    setStatus(`${label}${phase}...`);
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_MS));
+    current = await apiRequest(`/jobs/${current.id}`);
+  }
+  if (current && current.status === "failed") {
+    throw new Error(current.error || "Job failed");
+  }
+  return current;
+}
+
+function upsertInstance(instance) {
+  const id = String(instance.id);
+  instancesById.set(id, { ...(instancesById.get(id) || {}), ...instance });
+  renderInstances(Array.from(instancesById.values()));
+}
+
+function removeInstance(instanceId) {
+  instancesById.delete(String(instanceId));
+  qrValues.delete(String(instanceId));
+  renderInstances(Array.from(instancesById.values()));
+}
+
 function renderInstances(instances) {
   instanceCountEl.textContent = String(instances.length);
+  instancesById.clear();
+  instances.forEach((instance) => instancesById.set(String(instance.id), instance));
 
   if (!instances.length) {
     stopAllQrPolling();
     openQrPanels.clear();
+    selectedIds.clear();
+    updateBulkBar();
     instancesEl.innerHTML = '<div class="empty">No instances yet.</div>';
     return;
   }
@@ -92,6 +145,11 @@ function renderInstances(instances) {
       openQrPanels.delete(id);
     }
   });
+  selectedIds.forEach((id) => {
+    if (!availableIds.has(id)) {
+      selectedIds.delete(id);
+    }
+  });
   instances.forEach((instance) => {
     const id = String(instance.id);
     if (instance.status === "running" && !openQrPanels.has(id)) {
@@ -101,59 +159,91 @@ function renderInstances(instances) {
 
   stopAllQrPolling();
 
-  instancesEl.innerHTML = instances
-    .map((instance, index) => {
-      const statusClass =
-        instance.status === "running" ? "tag--running" : "tag--stopped";
-      const lastStarted = instance.last_started_at
-        ? new Date(instance.last_started_at).toLocaleString()
-        : "-";
-      const version = instance.version || "default";
-      const pid = instance.pid ?? "-";
-      const instanceId = String(instance.id);
-      const panelClass = openQrPanels.has(instanceId) ? "qr-panel is-open" : "qr-panel";
-      const versionOptions = buildUpdateVersionOptions(instance.version || "");
-
-      return `
-        <article class="instance-card" style="--i:${index}">
-          <div class="instance-meta">
-            <div>
-              <div class="instance-name">${escapeHtml(instance.name)}</div>
-              <div class="instance-details">
-                <span>Version: ${escapeHtml(version)}</span>
-                <span>PID: ${escapeHtml(pid)}</span>
-                <span>Last start: ${escapeHtml(lastStarted)}</span>
-                <span>WA: ${escapeHtml(instance.wa_number || "-")}</span>
-              </div>
+  const renderCard = (instance, index) => {
+    const statusClass = {
+      running: "tag--running",
+      hibernated: "tag--hibernated",
+    }[instance.status] || "tag--stopped";
+    const lastStarted = instance.last_started_at
+      ? new Date(instance.last_started_at).toLocaleString()
+      : "-";
+    const version = instance.version || "default";
+    const pid = instance.pid ?? "-";
+    const usage =
+      instance.cpu_percent == null
+        ? "-"
+        : `${instance.cpu_percent.toFixed(1)}% / ${Math.round((instance.memory_rss || 0) / 1048576)} MB`;
+    const health = instance.health ? instance.health.status : "-";
+    const connection = instance.connection || "-";
+    const messages = instance.counters
+      ? `${instance.counters.received || 0} in / ${instance.counters.sent || 0} out`
+      : "-";
+    const idle = instance.idle_timeout_minutes ? `${instance.idle_timeout_minutes} min` : "never";
+    const instanceId = String(instance.id);
+    const panelClass = openQrPanels.has(instanceId) ? "qr-panel is-open" : "qr-panel";
+    const versionOptions = buildUpdateVersionOptions(instance.version || "");
+
+    return `
+      <article class="instance-card" style="--i:${index}">
+        <div class="instance-meta">
+          <div>
+            <div class="instance-name">
+              <input
+                type="checkbox"
+                class="instance-select"
+                data-id="${instance.id}"
+                ${selectedIds.has(instanceId) ? "checked" : ""}
+              />${escapeHtml(instance.name)}
+            </div>
+            <div class="instance-details">
+              <span>Version: ${escapeHtml(version)}</span>
+              <span>PID: ${escapeHtml(pid)}</span>
+              <span>Last start: ${escapeHtml(lastStarted)}</span>
+              <span>WA: ${escapeHtml(instance.wa_number || "-")}</span>
+              <span>Health: ${escapeHtml(health)}</span>
+              <span>Connection: ${escapeHtml(connection)}</span>
+              <span>Messages: ${escapeHtml(messages)}</span>
+              <span>Hibernate after: ${escapeHtml(idle)}</span>
+              <span>CPU / RAM: ${escapeHtml(usage)}</span>
             </div>
-            <span class="tag ${statusClass}">${escapeHtml(instance.status)}</span>
           </div>
-          <div class="instance-actions">
-            ${
-              instance.status === "running"
-                ? `<button class="action action--danger" data-action="stop" data-id="${instance.id}">Stop</button>`
+          <span class="tag ${statusClass}">${escapeHtml(instance.status)}</span>
+        </div>
+        <div class="instance-actions">
+          ${
+            instance.status === "running"
+              ? `<button class="action action--danger" data-action="stop" data-id="${instance.id}">Stop</button>`
+              : instance.status === "hibernated"
+                ? `<button class="action action--primary" data-action="wake" data-id="${instance.id}">Wake</button>`
                 : `<button class="action action--primary" data-action="start" data-id="${instance.id}">Start</button>`
-            }
-            <button class="action" data-action="qr" data-id="${instance.id}">Show QR</button>
-            <button class="action" data-action="reset" data-id="${instance.id}">Reset session</button>
-            <button class="action action--danger" data-action="delete" data-id="${instance.id}">Delete</button>
+          }
+          <button class="action" data-action="qr" data-id="${instance.id}">Show QR</button>
+          <button class="action" data-action="reset" data-id="${instance.id}">Reset session</button>
+          <button class="action action--danger" data-action="delete" data-id="${instance.id}">Delete</button>
+        </div>
+        <div class="${panelClass}" id="qr-panel-${instance.id}">
+          <div class="qr-canvas" id="qr-${instance.id}"></div>
+          <div class="qr-note" id="qr-note-${instance.id}">
+            Click "Show QR" to load the latest code.
           </div>
-          <div class="${panelClass}" id="qr-panel-${instance.id}">
-            <div class="qr-canvas" id="qr-${instance.id}"></div>
-            <div class="qr-note" id="qr-note-${instance.id}">
-              Click "Show QR" to load the latest code.
-            </div>
-          </div>
-          <form class="update-form" data-id="${instance.id}" data-current-version="${escapeHtml(
-            instance.version || ""
-          )}">
-            <select name="version">${versionOptions}</select>
-            <button class="action" type="submit">Update</button>
-          </form>
-        </article>
-      `;
-    })
-    .join("");
+        </div>
+        <form class="update-form" data-id="${instance.id}" data-current-version="${escapeHtml(
+          instance.version || ""
+        )}">
+          <select name="version">${versionOptions}</select>
+          <button class="action" type="submit">Update</button>
+        </form>
+      </article>
+    `;
+  };
+  const active = instances.filter((instance) => instance.status !== "hibernated");
+  const hibernated = instances.filter((instance) => instance.status === "hibernated");
+  instancesEl.innerHTML =
+    active.map(renderCard).join("") +
+    (hibernated.length
+      ? `<h3 class="instances-section">Hibernated (${hibernated.length})</h3>` +
+        hibernated.map((instance, index) => renderCard(instance, active.length + index)).join("")
+      : "");
 
   instances.forEach((instance) => {
     const instanceId = String(instance.id);
@@ -161,6 +251,63 @@ function renderInstances(instances) {
       startQrPolling(instanceId);
     }
   });
+  updateBulkBar();
+}
+
+function updateBulkBar() {
+  const total = instancesById.size;
+  bulkCountEl.textContent = `${selectedIds.size} selected`;
+  bulkSelectAll.checked = total > 0 && selectedIds.size === total;
+  bulkSelectAll.indeterminate = selectedIds.size > 0 && selectedIds.size < total;
+  bulkVersionSelect.classList.toggle("is-hidden", bulkActionSelect.value !== "update-version");
+  bulkApplyBtn.disabled = selectedIds.size === 0;
+}
+
+async function runBulk(action, version) {
+  const payload = {
+    selector: { ids: Array.from(selectedIds, Number) },
+    action,
+  };
+  if (action === "update-version") payload.version = version;
+
+  const headers = { "Content-Type": "application/json" };
+  if (authToken) headers.Authorization = `Bearer ${authToken}`;
+  const response = await fetch("/instances/bulk", {
+    method: "POST",
+    headers,
+    body: JSON.stringify(payload),
+  });
+  if (response.status === 401) clearAuth();
+  if (!response.ok) {
+    throw new Error((await response.text()) || response.statusText);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  const failures = [];
+  let buffer = "";
+  let finished = 0;
+  let summary = null;
+  while (!summary) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    lines.filter(Boolean).forEach((line) => {
+      const item = JSON.parse(line);
+      if (item.done) {
+        summary = item;
+        return;
+      }
+      finished += 1;
+      if (!item.ok) failures.push(`${item.name}: ${item.error}`);
+      setStatus(`Bulk ${action}: ${finished}/${selectedIds.size} done...`);
+    });
+  }
+  if (!summary) throw new Error("Bulk request ended early");
+  if (summary.error) failures.push(summary.error);
+  return { summary, failures };
 }
 
 function hasMainAccess() {
@@ -223,6 +370,9 @@ function setVersionOptions(branches) {
     option.textContent = branch;
     versionSelect.appendChild(option);
   });
+
+  bulkVersionSelect.innerHTML = versionSelect.innerHTML;
+  bulkVersionSelect.remove(0);
 }
 
 function buildUpdateVersionOptions(currentVersion) {
@@ -249,7 +399,8 @@ async function loadBranches() {
   try {
     const data = await apiRequest("/instances/branches");
     const branches = Array.isArray(data?.branches) ? data.branches : [];
-    setVersionOptions(branches);
+    const tags = Array.isArray(data?.tags) ? data.tags : [];
+    setVersionOptions([...branches, ...tags.filter((tag) => !branches.includes(tag))]);
   } catch (error) {
     setVersionOptions([]);
     setStatus(`Error loading branches: ${error.message}`, true);
@@ -270,18 +421,28 @@ createForm.addEventListener("submit", async (event) => {
 
   if (version) payload.version = version;
 
+  const idleTimeout = Number(formData.get("idle_timeout_minutes"));
+  if (idleTimeout > 0) payload.idle_timeout_minutes = idleTimeout;
+
   if (!payload.name) {
     setStatus("Name is required.", true);
     return;
   }
 
+  if (!createForm.dataset.idempotencyKey) {
+    createForm.dataset.idempotencyKey = newIdempotencyKey();
+  }
+
   setStatus("Creating instance...");
   try {
-    await apiRequest("/instances/", {
+    const job = await apiRequest("/instances/", {
       method: "POST",
+      headers: { "Idempotency-Key": createForm.dataset.idempotencyKey },
       body: JSON.stringify(payload),
     });
     createForm.reset();
+    delete createForm.dataset.idempotencyKey;
+    await waitForJob(job, "Creating instance");
     await loadInstances();
     setStatus("Instance created.");
   } catch (error) {
@@ -314,7 +475,7 @@ instancesEl.addEventListener("click", async (event) => {
     setStatus("Deleting instance...");
     try {
       await apiRequest(`/instances/${id}`, { method: "DELETE" });
-      await loadInstances();
+      removeInstance(id);
       setStatus("Instance deleted.");
     } catch (error) {
       setStatus(`Error: ${error.message}`, true);
@@ -328,8 +489,9 @@ instancesEl.addEventListener("click", async (event) => {
     }
     setStatus("Resetting session...");
     try {
-      await apiRequest(`/instances/${id}/reset`, { method: "POST" });
-      await loadInstances();
+      qrValues.delete(String(id));
+      const instance = await apiRequest(`/instances/${id}/reset`, { method: "POST" });
+      upsertInstance(instance);
       setStatus("Session reset.");
     } catch (error) {
       setStatus(`Error: ${error.message}`, true);
@@ -337,13 +499,65 @@ instancesEl.addEventListener("click", async (event) => {
     return;
   }
 
-  setStatus(`${action === "start" ? "Starting" : "Stopping"} instance...`);
+  const [pending, done] = {
+    start: ["Starting", "started"],
+    stop: ["Stopping", "stopped"],
+    wake: ["Waking", "woken"],
+  }[action] || ["Updating", "updated"];
+  setStatus(`${pending} instance...`);
   try {
-    await apiRequest(`/instances/${id}/${action}`, { method: "POST" });
+    const instance = await apiRequest(`/instances/${id}/${action}`, { method: "POST" });
+    upsertInstance(instance);
+    setStatus(`Instance ${done}.`);
+  } catch (error) {
+    setStatus(`Error: ${error.message}`, true);
+  }
+});
+
+instancesEl.addEventListener("change", (event) => {
+  const checkbox = event.target.closest(".instance-select");
+  if (!checkbox) return;
+  if (checkbox.checked) {
+    selectedIds.add(checkbox.dataset.id);
+  } else {
+    selectedIds.delete(checkbox.dataset.id);
+  }
+  updateBulkBar();
+});
+
+bulkSelectAll.addEventListener("change", () => {
+  selectedIds.clear();
+  if (bulkSelectAll.checked) {
+    instancesById.forEach((_, id) => selectedIds.add(id));
+  }
+  instancesEl.querySelectorAll(".instance-select").forEach((checkbox) => {
+    checkbox.checked = selectedIds.has(checkbox.dataset.id);
+  });
+  updateBulkBar();
+});
+
+bulkActionSelect.addEventListener("change", updateBulkBar);
+
+bulkApplyBtn.addEventListener("click", async () => {
+  const action = bulkActionSelect.value;
+  const label = bulkActionSelect.options[bulkActionSelect.selectedIndex].textContent;
+  if (!confirm(`${label} ${selectedIds.size} instance(s)?`)) {
+    return;
+  }
+  bulkApplyBtn.disabled = true;
+  setStatus(`Bulk ${action}...`);
+  try {
+    const { summary, failures } = await runBulk(action, bulkVersionSelect.value);
     await loadInstances();
-    setStatus(`Instance ${action}ed.`);
+    if (failures.length) {
+      setStatus(`Bulk ${action}: ${summary.failed} failed. ${failures.join("; ")}`, true);
+    } else {
+      setStatus(`Bulk ${action}: ${summary.succeeded} succeeded.`);
+    }
   } catch (error) {
     setStatus(`Error: ${error.message}`, true);
+  } finally {
+    updateBulkBar();
   }
 });
 
@@ -368,10 +582,12 @@ instancesEl.addEventListener("submit", async (event) => {
 
   setStatus("Updating instance...");
   try {
-    await apiRequest(`/instances/${id}`, {
+    const job = await apiRequest(`/instances/${id}`, {
       method: "PATCH",
+      headers: { "Idempotency-Key": newIdempotencyKey() },
       body: JSON.stringify(payload),
     });
+    await waitForJob(job, "Updating instance");
     await loadInstances();
     setStatus("Instance updated.");
   } catch (error) {
@@ -408,6 +624,19 @@ function renderQr(container, value) {
   });
 }
 
+function applyQr(instanceId, value) {
+  const canvas = document.getElementById(`qr-${instanceId}`);
+  const note = document.getElementById(`qr-note-${instanceId}`);
+  if (!canvas || !note) return;
+  if (!value) {
+    canvas.innerHTML = "";
+    note.textContent = "No QR available yet. Start the instance first.";
+    return;
+  }
+  renderQr(canvas, value);
+  note.textContent = "Scan with WhatsApp within 30 seconds.";
+}
+
 async function loadQr(instanceId) {
   const canvas = document.getElementById(`qr-${instanceId}`);
   const note = document.getElementById(`qr-note-${instanceId}`);
@@ -416,13 +645,8 @@ async function loadQr(instanceId) {
   note.textContent = "Loading QR...";
   try {
     const data = await apiRequest(`/instances/${instanceId}/qr`);
-    if (!data || !data.qr) {
-      canvas.innerHTML = "";
-      note.textContent = "No QR available yet. Start the instance first.";
-      return;
-    }
-    renderQr(canvas, data.qr);
-    note.textContent = "Scan with WhatsApp within 30 seconds.";
+    qrValues.set(String(instanceId), data?.qr || null);
+    applyQr(instanceId, data?.qr || null);
   } catch (error) {
     canvas.innerHTML = "";
     note.textContent = `Error: ${error.message}`;
@@ -431,6 +655,14 @@ async function loadQr(instanceId) {
 
 function startQrPolling(instanceId) {
   const key = String(instanceId);
+  if (liveUpdates) {
+    if (qrValues.has(key)) {
+      applyQr(key, qrValues.get(key));
+    } else {
+      loadQr(key);
+    }
+    return;
+  }
   if (qrPollers.has(key)) return;
   loadQr(key);
   const handle = setInterval(() => loadQr(key), QR_REFRESH_MS);
@@ -467,41 +699,62 @@ async function loadMainQr() {
   }
   try {
     const data = await apiRequest("/instances/main/qr");
-    if (!data || !data.qr) {
-      mainQrCanvas.innerHTML = "";
-      mainQrNote.textContent = "Waiting for QR...";
-      return;
-    }
-    renderQr(mainQrCanvas, data.qr);
-    mainQrNote.textContent = "Scan with WhatsApp within 30 seconds.";
+    applyMainQr(data?.qr || null);
   } catch (error) {
     mainQrCanvas.innerHTML = "";
     mainQrNote.textContent = `Error: ${error.message}`;
   }
 }
 
-async function loadMainStatus() {
+function applyMainQr(value) {
+  if (!mainQrCanvas || !mainQrNote) return;
+  if (!mainRunning) {
+    mainQrCanvas.innerHTML = "";
+    mainQrNote.textContent = "Main is stopped. Click Start main.";
+    return;
+  }
+  if (!value) {
+    mainQrCanvas.innerHTML = "";
+    mainQrNote.textContent = "Waiting for QR...";
+    return;
+  }
+  renderQr(mainQrCanvas, value);
+  mainQrNote.textContent = "Scan with WhatsApp within 30 seconds.";
+}
+
+function applyMainStatus(data) {
   if (!mainStatusPill) return;
-  if (!authToken) return;
-  if (!hasMainAccess()) return;
-  try {
-    const data = await apiRequest("/instances/main/status");
-    mainRunning = Boolean(data?.running);
+  if ("running" in data) {
+    mainRunning = Boolean(data.running);
     mainStatusPill.textContent = mainRunning ? "running" : "stopped";
     mainStatusPill.classList.toggle("tag--running", mainRunning);
     mainStatusPill.classList.toggle("tag--stopped", !mainRunning);
     if (mainPidEl) {
-      mainPidEl.textContent = data?.pid ? `pid ${data.pid}` : "";
-    }
-    if (mainNumberEl) {
-      mainNumberEl.textContent = data?.wa_number ? `WA ${data.wa_number}` : "";
+      mainPidEl.textContent = data.pid ? `pid ${data.pid}` : "";
     }
     if (mainStartBtn) mainStartBtn.disabled = mainRunning;
     if (mainStopBtn) mainStopBtn.disabled = !mainRunning;
+  }
+  if ("wa_number" in data && mainNumberEl) {
+    mainNumberEl.textContent = data.wa_number ? `WA ${data.wa_number}` : "";
+  }
+  if ("health" in data && mainHealthEl) {
+    mainHealthEl.textContent = data.health ? `health ${data.health.status}` : "";
+  }
+}
+
+async function loadMainStatus() {
+  if (!mainStatusPill) return;
+  if (!authToken) return;
+  if (!hasMainAccess()) return;
+  try {
+    const data = await apiRequest("/instances/main/status");
+    applyMainStatus({ running: false, pid: null, wa_number: null, health: null, ...(data || {}) });
   } catch (error) {
     mainRunning = false;
     if (mainPidEl) mainPidEl.textContent = "";
     if (mainNumberEl) mainNumberEl.textContent = "";
+    if (mainHealthEl) mainHealthEl.textContent = "";
     mainStatusPill.textContent = "unknown";
     mainStatusPill.classList.remove("tag--running");
     mainStatusPill.classList.add("tag--stopped");
@@ -517,7 +770,121 @@ function startMainQrPolling() {
     await loadMainQr();
   };
   refreshMain();
-  mainQrPoller = setInterval(refreshMain, QR_REFRESH_MS);
+  if (!liveUpdates) {
+    mainQrPoller = setInterval(refreshMain, QR_REFRESH_MS);
+  }
+}
+
+function parseEventData(event) {
+  try {
+    return JSON.parse(event.data || "{}");
+  } catch {
+    return {};
+  }
+}
+
+function trackEventId(handler) {
+  return (event) => {
+    if (event.lastEventId) lastEventId = event.lastEventId;
+    handler(event);
+  };
+}
+
+async function connectEvents() {
+  if (typeof EventSource === "undefined" || !authToken || eventSource || eventsConnecting) return;
+  eventsConnecting = true;
+  let ticket;
+  try {
+    ticket = (await apiRequest("/events/ticket", { method: "POST" })).ticket;
+  } catch {
+    scheduleEventsReconnect();
+    return;
+  } finally {
+    eventsConnecting = false;
+  }
+  if (!authToken || eventSource) return;
+  const params = new URLSearchParams({ ticket });
+  if (lastEventId) params.set("since", lastEventId);
+  eventSource = new EventSource(`/events/?${params}`);
+
+  eventSource.addEventListener("open", () => {
+    if (liveUpdates) return;
+    liveUpdates = true;
+    stopAllQrPolling();
+    stopMainQrPolling();
+  });
+
+  eventSource.addEventListener("error", () => {
+    if (!eventSource) return;
+    eventSource.close();
+    eventSource = null;
+    liveUpdates = false;
+    openQrPanels.forEach((id) => startQrPolling(id));
+    startMainQrPolling();
+    scheduleEventsReconnect();
+  });
+
+  eventSource.addEventListener("reset", trackEventId(() => {
+    qrValues.clear();
+    loadInstances();
+    loadMainStatus().then(loadMainQr);
+  }));
+
+  eventSource.addEventListener("instance", trackEventId((event) => {
+    const data = parseEventData(event);
+    if (!instancesById.has(String(data.id))) {
+      loadInstances();
+      return;
+    }
+    upsertInstance(data);
+  }));
+
+  eventSource.addEventListener("instance_created", trackEventId(() => loadInstances()));
+
+  eventSource.addEventListener("instance_deleted", trackEventId((event) => {
+    removeInstance(parseEventData(event).id);
+  }));
+
+  eventSource.addEventListener("qr", trackEventId((event) => {
+    const data = parseEventData(event);
+    const key = String(data.id);
+    qrValues.set(key, data.qr || null);
+    if (openQrPanels.has(key)) {
+      applyQr(key, data.qr || null);
+    }
+  }));
+
+  eventSource.addEventListener("main_status", trackEventId((event) => {
+    if (!hasMainAccess()) return;
+    applyMainStatus(parseEventData(event));
+    if (!mainRunning) applyMainQr(null);
+  }));
+
+  eventSource.addEventListener("main_qr", trackEventId((event) => {
+    if (!hasMainAccess()) return;
+    applyMainQr(parseEventData(event).qr || null);
+  }));
+}
+
+function scheduleEventsReconnect() {
+  if (eventsRetryTimer || !authToken) return;
+  eventsRetryTimer = setTimeout(() => {
+    eventsRetryTimer = null;
+    connectEvents();
+  }, EVENTS_RETRY_MS);
+}
+
+function disconnectEvents() {
+  if (eventsRetryTimer) {
+    clearTimeout(eventsRetryTimer);
+    eventsRetryTimer = null;
+  }
+  lastEventId = null;
+  if (eventSource) {
+    eventSource.close();
+    eventSource = null;
+  }
+  liveUpdates = false;
 }
 
 if (mainQrRefresh) {
@@ -632,6 +999,7 @@ function clearAuth() {
   currentUser = null;
   mainRunning = false;
   localStorage.removeItem("access_token");
+  disconnectEvents();
   stopAllQrPolling();
   stopMainQrPolling();
   updateAuthUI();
@@ -646,6 +1014,7 @@ async function bootstrap() {
   }
   try {
     await fetchMe();
+    connectEvents();
     startMainQrPolling();
     await loadBranches();
     await loadInstances();
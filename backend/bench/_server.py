@@ -0,0 +1,95 @@
+from contextlib import contextmanager
+import os
+from pathlib import Path
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Iterator
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+SERVER_START_TIMEOUT = 60.0
+
+
+@contextmanager
+def isolated_backend(source: Path = BACKEND_DIR) -> Iterator[Path]:
+    with tempfile.TemporaryDirectory(prefix="bench-") as root:
+        target = Path(root) / "backend"
+        shutil.copytree(
+            Path(source) / "app",
+            target / "app",
+            ignore=shutil.ignore_patterns("data", "__pycache__"),
+        )
+        yield target
+
+
+@contextmanager
+def serve(source: Path = BACKEND_DIR, env: dict[str, str] | None = None) -> Iterator[str]:
+    with isolated_backend(source) as backend:
+        port = _free_port()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=backend,
+            env={**os.environ, **(env or {})},
+            start_new_session=True,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            _wait_ready(base_url, process)
+            yield base_url
+        finally:
+            os.killpg(process.pid, signal.SIGTERM)
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait()
+
+
+def login(client: httpx.Client, username: str, password: str) -> dict[str, str]:
+    client.post("/auth/register", json={"username": username, "password": password})
+    response = client.post("/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(results: list[tuple[float, bool]]) -> str:
+    values = [latency for latency, _ in results]
+    failed = sum(1 for _, ok in results if not ok)
+    return (
+        f"n={len(values):<6} p50={percentile(values, 0.5) * 1000:8.1f}ms "
+        f"p99={percentile(values, 0.99) * 1000:8.1f}ms max={max(values, default=0.0) * 1000:8.1f}ms "
+        f"failed={failed}"
+    )
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(base_url: str, process: subprocess.Popen) -> None:
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            httpx.get(base_url + "/openapi.json", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not start within {SERVER_START_TIMEOUT:.0f}s")
@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+from pathlib import Path
+import time
+
+import httpx
+
+from ._server import BACKEND_DIR, login, serve, summarize
+
+JOB_WAIT_SECONDS = 120
+
+
+async def _client(client: httpx.AsyncClient, routes: list, index: int, deadline: float, samples: list) -> None:
+    while time.perf_counter() < deadline:
+        method, path = routes[index % len(routes)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path)
+            ok = response.is_success
+        except httpx.HTTPError:
+            ok = False
+        samples.append((method, path, time.perf_counter() - started, ok))
+
+
+async def _measure(base_url: str, headers: dict, routes: list, concurrency: int, duration: float) -> list:
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        samples: list[tuple[str, str, float, bool]] = []
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(_client(client, routes, index, deadline, samples) for index in range(concurrency)))
+    return samples
+
+
+def _prepare(client: httpx.Client, headers: dict) -> list:
+    payload = {"name": "bench-instance", "version": "main", "repo_url": ""}
+    response = client.post("/instances/", json=payload, headers=headers)
+    response.raise_for_status()
+    job = response.json()
+    deadline = time.monotonic() + JOB_WAIT_SECONDS
+    while job["status"] not in ("succeeded", "failed") and time.monotonic() < deadline:
+        time.sleep(0.5)
+        job = client.get(f"/jobs/{job['id']}", headers=headers).json()
+    routes = [("GET", "/auth/me"), ("GET", f"/jobs/{job['id']}")]
+    if job["status"] == "succeeded" and job.get("instance_id"):
+        routes.append(("POST", f"/instances/{job['instance_id']}/stop"))
+    return routes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Throughput of the auth, job and lifecycle routes under concurrency")
+    parser.add_argument("--backend", type=Path, default=BACKEND_DIR, help="backend directory to benchmark")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with serve(args.backend) as base_url:
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            headers = login(client, "bench-user", "bench-password")
+            routes = _prepare(client, headers)
+        for concurrency in args.concurrency:
+            samples = asyncio.run(_measure(base_url, headers, routes, concurrency, args.duration))
+            rate = len(samples) / args.duration
+            print(f"concurrency={concurrency:<4} {rate:7.0f} req/s")
+            for method, path in routes:
+                results = [(latency, ok) for *route, latency, ok in samples if route == [method, path]]
+                print(f"  {method:<4} {path:<24} {summarize(results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+from pathlib import Path
+import time
+
+import httpx
+
+from ._server import BACKEND_DIR, login, serve, summarize
+
+PASSWORD = "bench-password"
+
+
+async def _poll(client: httpx.AsyncClient, headers: dict, stop: asyncio.Event, samples: list) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        ok = await _request(client.get("/instances/", headers=headers))
+        samples.append((started, time.perf_counter() - started, ok))
+
+
+async def _login(client: httpx.AsyncClient, username: str) -> tuple[float, bool]:
+    started = time.perf_counter()
+    ok = await _request(client.post("/auth/login", data={"username": username, "password": PASSWORD}))
+    return time.perf_counter() - started, ok
+
+
+async def _request(pending) -> bool:
+    try:
+        response = await pending
+    except httpx.HTTPError:
+        return False
+    return response.is_success
+
+
+async def _run(base_url: str, headers: dict, args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.logins + args.pollers)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        stop = asyncio.Event()
+        samples: list[tuple[float, float, bool]] = []
+        pollers = [asyncio.create_task(_poll(client, headers, stop, samples)) for _ in range(args.pollers)]
+        await asyncio.sleep(args.idle_seconds)
+        burst_started = time.perf_counter()
+        logins = await asyncio.gather(*(_login(client, "bench-login") for _ in range(args.logins)))
+        burst_ended = time.perf_counter()
+        stop.set()
+        await asyncio.gather(*pollers)
+
+    idle = [(latency, ok) for started, latency, ok in samples if started < burst_started]
+    burst = [(latency, ok) for started, latency, ok in samples if burst_started <= started < burst_ended]
+    print(f"GET /instances/ idle   {summarize(idle)}")
+    print(f"GET /instances/ burst  {summarize(burst)}")
+    print(f"POST /auth/login       {summarize(logins)}")
+    print(f"burst wall time        {(burst_ended - burst_started) * 1000:.0f}ms for {args.logins} logins")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="p99 of GET /instances/ while a burst of logins is in flight")
+    parser.add_argument("--backend", type=Path, default=BACKEND_DIR, help="backend directory to benchmark")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--pollers", type=int, default=4)
+    parser.add_argument("--idle-seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    with serve(args.backend) as base_url:
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            headers = login(client, "bench-poller", PASSWORD)
+            login(client, "bench-login", PASSWORD)
+        asyncio.run(_run(base_url, headers, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import subprocess
+import time
+
+from ._server import percentile
+
+
+class _StaticSupervisor:
+    def __init__(self, pids: dict[int, int]) -> None:
+        self._snapshot = {key: {"pid": pid, "state": "running"} for key, pid in pids.items()}
+
+    def snapshot(self) -> dict:
+        return self._snapshot
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cost of one metrics sampling pass over many live processes")
+    parser.add_argument("--processes", type=int, default=1000)
+    parser.add_argument("--passes", type=int, default=50)
+    args = parser.parse_args()
+
+    from app.services.metrics import METRICS_HISTORY, MetricsSampler
+
+    children = [subprocess.Popen(["sleep", "600"]) for _ in range(args.processes)]
+    try:
+        sampler = MetricsSampler(process_supervisor=_StaticSupervisor(dict(enumerate(child.pid for child in children))))
+        sampler.sample()
+        durations = []
+        for _ in range(args.passes):
+            started = time.perf_counter()
+            sampler.sample()
+            durations.append(time.perf_counter() - started)
+        for _ in range(METRICS_HISTORY):
+            sampler.sample()
+        started = time.perf_counter()
+        sampler.history(0)
+        export = time.perf_counter() - started
+        sampled = sampler.stats()["last_pass"]["processes"]
+    finally:
+        for child in children:
+            child.kill()
+        for child in children:
+            child.wait()
+
+    per_process = [duration / sampled * 1_000_000 for duration in durations]
+    print(f"processes sampled      {sampled}")
+    print(
+        f"pass duration          p50={percentile(durations, 0.5) * 1000:.1f}ms "
+        f"p99={percentile(durations, 0.99) * 1000:.1f}ms"
+    )
+    print(f"per process            p50={percentile(per_process, 0.5):.1f}us p99={percentile(per_process, 0.99):.1f}us")
+    print(f"history export         {export * 1000:.2f}ms for {METRICS_HISTORY} samples")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+from pathlib import Path
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from ._server import BACKEND_DIR, isolated_backend, summarize
+
+USERS = 10
+INSTANCES_PER_USER = 50
+
+
+def _worker(readers: int, writers: int, duration: float) -> None:
+    from sqlalchemy.exc import OperationalError
+
+    from app.database import Base, SessionLocal, engine
+    from app.migrations import run_migrations
+    from app.models import Instance, User
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations()
+    db = SessionLocal()
+    try:
+        for user_index in range(USERS):
+            user = User(username=f"bench-{user_index}", password_hash="x")
+            db.add(user)
+            db.flush()
+            for instance_index in range(INSTANCES_PER_USER):
+                name = f"bench-{user_index}-{instance_index}"
+                db.add(Instance(name=name, path=name, env_path=name, owner_id=user.id))
+        db.commit()
+        rows = [(row.id, row.owner_id) for row in db.query(Instance.id, Instance.owner_id)]
+    finally:
+        db.close()
+
+    results: dict[str, list[tuple[float, bool]]] = {"read": [], "write": []}
+    stop = threading.Event()
+
+    def read() -> None:
+        instance_id, owner_id = random.choice(rows)
+        db = SessionLocal()
+        try:
+            db.query(Instance).filter(Instance.id == instance_id, Instance.owner_id == owner_id).first()
+            db.query(Instance).filter(Instance.owner_id == owner_id).all()
+        finally:
+            db.close()
+
+    def write() -> None:
+        instance_id, _ = random.choice(rows)
+        db = SessionLocal()
+        try:
+            instance = db.get(Instance, instance_id)
+            instance.status = "starting"
+            db.commit()
+            instance.status = "running"
+            instance.pid = os.getpid()
+            db.commit()
+        finally:
+            db.close()
+
+    def loop(kind: str, operation) -> None:
+        samples = []
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                operation()
+                ok = True
+            except OperationalError:
+                ok = False
+            samples.append((time.perf_counter() - started, ok))
+        results[kind].extend(samples)
+
+    threads = [threading.Thread(target=loop, args=("read", read)) for _ in range(readers)]
+    threads += [threading.Thread(target=loop, args=("write", write)) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    json.dump(results, sys.stdout)
+
+
+def _run_mode(source: Path, production: bool, args: argparse.Namespace) -> dict:
+    with isolated_backend(source) as backend:
+        code = f"from bench.sqlite_mixed import _worker; _worker({args.readers}, {args.writers}, {args.duration})"
+        output = subprocess.check_output(
+            [sys.executable, "-c", code],
+            cwd=backend,
+            env={
+                **os.environ,
+                "PYTHONPATH": os.pathsep.join([str(backend), str(BACKEND_DIR)]),
+                "SQLITE_PRODUCTION": "1" if production else "0",
+            },
+        )
+    return json.loads(output)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mixed read/write SQLite throughput with and without production mode")
+    parser.add_argument("--backend", type=Path, default=BACKEND_DIR, help="backend directory to benchmark")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    for production in (False, True):
+        results = _run_mode(args.backend, production, args)
+        label = "SQLITE_PRODUCTION=1" if production else "SQLITE_PRODUCTION=0"
+        for kind in ("read", "write"):
+            samples = [tuple(sample) for sample in results[kind]]
+            rate = len(samples) / args.duration
+            print(f"{label} {kind:<5} {rate:8.0f}/s {summarize(samples)}")
+
+
+if __name__ == "__main__":
+    main()
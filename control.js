@@ -0,0 +1,87 @@
+const net = require('net');
+
+const RECONNECT_DELAY_MS = 1000;
+
+/**
+ * Connects to the backend's control socket and keeps the connection alive.
+ * State is sent as newline-delimited JSON; commands arrive the same way and
+ * are answered with a reply carrying the command id.
+ * @param {string} socketPath Unix socket path provided by the backend.
+ * @param {Object<string, Function>} handlers Command handlers keyed by name.
+ * @returns {{update: Function, close: Function}} Channel handle.
+ */
+function createControlChannel(socketPath, handlers) {
+    const state = {};
+    let client = null;
+    let buffer = '';
+    let retryTimer = null;
+    let closed = false;
+
+    function send(message) {
+        if (!client || client.connecting || client.destroyed) return;
+        client.write(`${JSON.stringify(message)}\n`);
+    }
+
+    async function handle(line) {
+        let message;
+        try {
+            message = JSON.parse(line);
+        } catch (error) {
+            return;
+        }
+        if (message.type !== 'command') return;
+        const handler = handlers[message.command];
+        if (!handler) {
+            send({ type: 'reply', id: message.id, ok: false, error: `Unknown command: ${message.command}` });
+            return;
+        }
+        try {
+            const result = await handler();
+            send({ type: 'reply', id: message.id, ok: true, result: result ?? null });
+        } catch (error) {
+            send({ type: 'reply', id: message.id, ok: false, error: error.message });
+        }
+    }
+
+    function connect() {
+        retryTimer = null;
+        client = net.createConnection(socketPath);
+        client.setEncoding('utf8');
+        client.on('connect', () => {
+            send({ type: 'hello', pid: process.pid, ...state });
+        });
+        client.on('data', (chunk) => {
+            buffer += chunk;
+            let index;
+            while ((index = buffer.indexOf('\n')) >= 0) {
+                const line = buffer.slice(0, index);
+                buffer = buffer.slice(index + 1);
+                if (line) handle(line);
+            }
+        });
+        client.on('error', () => {});
+        client.on('close', () => {
+            client = null;
+            buffer = '';
+            if (closed) return;
+            retryTimer = setTimeout(connect, RECONNECT_DELAY_MS);
+            retryTimer.unref();
+        });
+    }
+
+    connect();
+
+    return {
+        update(patch) {
+            Object.assign(state, patch);
+            send({ type: 'state', ...patch });
+        },
+        close() {
+            closed = true;
+            if (retryTimer) clearTimeout(retryTimer);
+            if (client) client.end();
+        }
+    };
+}
+
+module.exports = createControlChannel;
@@ -16,10 +16,18 @@ const args = parseArguments();
 const fs = require('fs');
 const path = require('path');
 const { spawn } = require('child_process');
+const net = require('net');
 const { DisconnectReason } = require('baileys');
 const createSocket = require('./sock');
+const { formatWaId } = require('./sock');
+const createControlChannel = require('./control');
 const dotenv = require('dotenv');
 
+// When the backend captures our output through a pipe and restarts, writes
+// fail with EPIPE; the bot must keep running with its output discarded.
+process.stdout.on('error', () => {});
+process.stderr.on('error', () => {});
+
 const envPath = process.env.ENV_PATH;
 if (envPath) {
     dotenv.config({ path: envPath });
@@ -43,6 +51,20 @@ let activeSocket = null;
 let reconnectTimer = null;
 let reconnectAttempts = 0;
 let isShuttingDown = false;
+let connectionState = 'connecting';
+let lastActivity = null;
+let heartbeatTimer = null;
+let healthServer = null;
+let control = null;
+let countersTimer = null;
+const counters = { received: 0, sent: 0 };
+
+const heartbeatPath = process.env.HEARTBEAT_PATH
+    ? path.resolve(process.env.HEARTBEAT_PATH)
+    : path.join(process.cwd(), 'heartbeat');
+const heartbeatInterval = Number(process.env.HEARTBEAT_INTERVAL_MS || 10000);
+const controlSocketPath = process.env.CONTROL_SOCKET
+    || (isMain ? path.join(__dirname, 'backend', 'app', 'data', 'control', 'main.sock') : null);
 
 function startBackend() {
     const backendHost = process.env.BACKEND_HOST || "0.0.0.0";
@@ -74,6 +96,77 @@ if (isMain && process.env.BACKEND_DISABLED !== "1") {
     backendProcess = startBackend();
 }
 
+function writeHeartbeat() {
+    const payload = { pid: process.pid, connection: connectionState, lastActivity };
+    fs.writeFile(heartbeatPath, JSON.stringify(payload), () => {});
+}
+
+function setConnectionState(state) {
+    if (state === connectionState) return;
+    connectionState = state;
+    writeHeartbeat();
+    publishState({ connection: state });
+}
+
+function publishState(patch) {
+    if (control) control.update(patch);
+}
+
+function countMessage(direction) {
+    counters[direction] += 1;
+    if (direction === 'received') lastActivity = Date.now();
+    if (countersTimer || !control) return;
+    // Counters change with every message; batch them so busy bots send at
+    // most one update per second.
+    countersTimer = setTimeout(() => {
+        countersTimer = null;
+        publishState({ counters: { ...counters }, lastActivity });
+    }, 1000);
+    countersTimer.unref();
+}
+
+const controlHandlers = {
+    ping: () => ({ pid: process.pid, uptime: process.uptime(), connection: connectionState }),
+    logout: async () => {
+        if (!activeSocket) throw new Error('Socket not started');
+        await activeSocket.logout();
+        return {};
+    },
+    shutdown: () => {
+        setTimeout(() => {
+            shutdown();
+            process.exit(0);
+        }, 100);
+        return {};
+    }
+};
+
+function startHealthServer(port) {
+    // Answers each connection with the socket state so the backend's prober
+    // sees a live event loop, not just a bound port.
+    const server = net.createServer((client) => {
+        client.on('error', () => {});
+        client.end(JSON.stringify({ connection: connectionState }));
+    });
+    server.on('error', (error) => {
+        console.error(`Health listener on port ${port} failed:`, error.message);
+    });
+    server.listen(port, '127.0.0.1');
+    return server;
+}
+
+if (controlSocketPath) {
+    control = createControlChannel(controlSocketPath, controlHandlers);
+    publishState({ instance: global.instance, connection: connectionState, qr: null, counters: { ...counters } });
+}
+
+writeHeartbeat();
+heartbeatTimer = setInterval(writeHeartbeat, heartbeatInterval);
+heartbeatTimer.unref();
+if (process.env.PORT) {
+    healthServer = startHealthServer(Number(process.env.PORT));
+}
+
 console.log(`Starting instance: ${global.instance}`);
 
 async function startBot() {
@@ -83,6 +176,7 @@ async function startBot() {
     socket.ev.on('messages.upsert', async (messageUpdate) => {
         const message = messageUpdate.messages?.[0];
         if (!message || message.key.fromMe) return;
+        countMessage('received');
 
         const text =
             message.message?.conversation ||
@@ -93,16 +187,31 @@ async function startBot() {
 
         const reply = `🤖 ${global.instance} recibió: ${text}`;
         await socket.sendMessage(message.key.remoteJid, { text: reply });
+        countMessage('sent');
     });
 
     socket.ev.on('connection.update', (update) => {
-        const { connection, lastDisconnect } = update;
+        const { connection, lastDisconnect, qr } = update;
+        if (connection) {
+            setConnectionState(connection);
+        }
+        if (qr) {
+            publishState({ qr });
+        } else if (connection === 'open' || connection === 'close') {
+            publishState({ qr: null });
+        }
+        if (socket.user?.id) {
+            publishState({ wa_number: formatWaId(socket.user.id) });
+        }
         if (connection === 'open') {
             reconnectAttempts = 0;
         }
         if (connection === 'close') {
             const statusCode = lastDisconnect?.error?.output?.statusCode;
             const shouldReconnect = statusCode !== DisconnectReason.loggedOut;
+            if (!shouldReconnect) {
+                publishState({ wa_number: null });
+            }
             if (shouldReconnect && !isShuttingDown) {
                 scheduleReconnect();
             } else {
@@ -137,6 +246,18 @@ function shutdown() {
         clearTimeout(reconnectTimer);
         reconnectTimer = null;
     }
+    if (heartbeatTimer) {
+        clearInterval(heartbeatTimer);
+        heartbeatTimer = null;
+    }
+    if (healthServer) {
+        healthServer.close();
+        healthServer = null;
+    }
+    if (control) {
+        control.close();
+        control = null;
+    }
     if (backendProcess) {
         backendProcess.kill("SIGTERM");
     }
@@ -4,11 +4,11 @@ const { default: makeWASocket, useMultiFileAuthState, DisconnectReason } = requi
 
 /**
  * Creates and returns a WhatsApp socket using Baileys.
- * @param {string} [statePath] Path where auth state will be stored.
+ * @param {string} [statePath] Path where auth state will be stored. Defaults to AUTH_PATH.
  * @returns {Promise<import('baileys').WASocket>} Socket instance.
  */
 async function createSocket(statePath) {
-    const authDir = path.resolve(statePath || path.join(__dirname, 'auth_info'));
+    const authDir = path.resolve(statePath || process.env.AUTH_PATH || path.join(__dirname, 'auth_info'));
     const { state, saveCreds } = await useMultiFileAuthState(authDir);
     const qrPath = process.env.QR_PATH
         ? path.resolve(process.env.QR_PATH)
@@ -70,3 +70,4 @@ function formatWaId(waId) {
 }
 
 module.exports = createSocket;
+module.exports.formatWaId = formatWaId;